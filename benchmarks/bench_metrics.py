@@ -0,0 +1,211 @@
+# -*- coding:utf-8 -*-
+'''
+Timing of every metric class, the 'label' and 'compute' commands
+and the evaluation of many topics, on synthetic ranked lists.
+
+The results (seconds per call) are written as JSON,
+and compared with the results of another version if --compare is given:
+the process exits with status 1 if a case is slower than
+<threshold> times the baseline.
+
+Usage:
+    python benchmarks/bench_metrics.py -o new.json [--compare old.json] [--threshold 1.5]
+    python benchmarks/bench_metrics.py --quick
+'''
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import timeit
+
+from click.testing import CliRunner
+
+from pyNTCIREVAL import Labeler
+from pyNTCIREVAL.main import cli
+from pyNTCIREVAL.evaluator import evaluate_run
+from pyNTCIREVAL.metrics import (RR, OMeasure, PMeasure, PPlusMeasure, AP,
+    QMeasure, NCUguP, NCUguBR, NCUrbP, NCUrbBR, RBP, ERR, nERR, nDCG, MSnDCG,
+    Precision, Hit)
+
+GRADE_SCHEMES = {
+    'binary': [1],
+    'linear': [1, 2, 3],
+    'exponential': [1, 3, 7, 15],
+}
+DEPTHS = [10, 100, 1000, 10000, 100000]
+TOPICS = [1, 100, 10000]
+TOPIC_DEPTH = 100
+QUICK_DEPTHS = [10, 100, 1000]
+QUICK_TOPICS = [1, 100]
+# the fraction of relevant documents in the qrels
+REL_RATIO = 0.2
+
+def metrics(xrelnum, grades, depth):
+    return [RR(), OMeasure(xrelnum, grades, 1.0),
+        PMeasure(xrelnum, grades, 1.0), PPlusMeasure(xrelnum, grades, 1.0),
+        AP(xrelnum, grades), QMeasure(xrelnum, grades, 1.0),
+        NCUguP(xrelnum, grades, grades), NCUguBR(xrelnum, grades, grades, 1.0),
+        NCUrbP(xrelnum, grades, 0.95), NCUrbBR(xrelnum, grades, 0.95, 1.0),
+        RBP(xrelnum, grades, 0.95), ERR(xrelnum, grades),
+        nERR(xrelnum, grades, None), nDCG(xrelnum, grades, 2.0, None),
+        MSnDCG(xrelnum, grades, None), Precision(depth), Hit(depth)]
+
+def generate_topic(rng, depth, levels):
+    '''
+    Generate qrels judging twice as many documents as the depth,
+    and a ranked list of the depth, half of which are judged.
+    The ranked list contains at least one relevant document (d0).
+    '''
+    qrels = {}
+    for i in range(depth * 2):
+        qrels["d%d" % i] = rng.randint(1, levels)\
+            if rng.random() < REL_RATIO else 0
+    qrels["d0"] = levels
+    sysdocs = ["d%d" % rng.randint(1, depth * 4) for _ in range(depth)]
+    sysdocs[rng.randint(0, depth - 1)] = "d0"
+    return qrels, sysdocs
+
+def measure(func, repeat):
+    '''
+    Return the minimum seconds per call of func.
+    '''
+    timer = timeit.Timer(func)
+    number, total = timer.autorange()
+    if total > 5.0:
+        return total / number
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+def bench_metrics(results, depths, repeat, rng):
+    for scheme, grades in sorted(GRADE_SCHEMES.items()):
+        for depth in depths:
+            qrels, sysdocs = generate_topic(rng, depth, len(grades))
+            labeler = Labeler(qrels)
+            xrelnum = labeler.compute_per_level_doc_num(len(grades) + 1)
+            ranked_list = labeler.label(sysdocs)
+            for metric in metrics(xrelnum, grades, depth):
+                name = "metric/%s/grades=%s/depth=%d"\
+                    % (metric.__class__.__name__, scheme, depth)
+                results[name] = measure(
+                    lambda: metric.compute(ranked_list), repeat)
+                report(name, results[name])
+
+def bench_commands(results, depths, repeat, rng, workdir):
+    runner = CliRunner()
+    grades = GRADE_SCHEMES['linear']
+    g = ':'.join([str(grade) for grade in grades])
+    for depth in depths:
+        qrels, sysdocs = generate_topic(rng, depth, len(grades))
+        rel = os.path.join(workdir, "%d.rel" % depth)
+        res = os.path.join(workdir, "%d.res" % depth)
+        lab = os.path.join(workdir, "%d.lab" % depth)
+        with open(rel, "w") as f:
+            f.write("".join(["%s L%d\n" % (did, level)
+                for did, level in qrels.items()]))
+        with open(res, "w") as f:
+            f.write("".join(["%s\n" % did for did in sysdocs]))
+        with open(lab, "w") as f:
+            f.write(runner.invoke(cli, ['label', '-r', rel, res]).output)
+        for command, args in [
+            ('label', ['label', '-r', rel, res]),
+            ('compute', ['compute', '-r', rel, '-g', g,
+                '--cutoffs', '10,100,1000', lab]),
+            ]:
+            name = "command/%s/depth=%d" % (command, depth)
+            results[name] = measure(lambda: check(runner.invoke(cli, args)),
+                repeat)
+            report(name, results[name])
+
+def bench_topics(results, topic_nums, repeat, rng):
+    grades = GRADE_SCHEMES['linear']
+    for topic_num in topic_nums:
+        qrels = {}
+        run = {}
+        for topic in range(topic_num):
+            qrels[topic], run[topic] = generate_topic(
+                rng, TOPIC_DEPTH, len(grades))
+        name = "topics/evaluate_run/topics=%d/depth=%d"\
+            % (topic_num, TOPIC_DEPTH)
+        results[name] = measure(
+            lambda: evaluate_run(run, qrels, grades, cutoffs=[10, 100]),
+            repeat)
+        report(name, results[name])
+
+def check(result):
+    if result.exit_code != 0:
+        raise Exception(result.output) from result.exception
+
+def report(name, sec):
+    sys.stderr.write("%-60s %12.6f s\n" % (name, sec))
+
+def compare(results, baseline, threshold):
+    '''
+    Return the cases slower than threshold times the baseline.
+    '''
+    slower = []
+    for name in sorted(results):
+        if not name in baseline:
+            continue
+        ratio = results[name] / baseline[name]
+        if ratio > threshold:
+            slower.append((name, baseline[name], results[name], ratio))
+    return slower
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-o', '--output', help='JSON file of the results')
+    parser.add_argument('--compare', help='JSON file of the baseline results')
+    parser.add_argument('--threshold', type=float, default=1.5,
+        help='the slowdown ratio regarded as a regression (default: 1.5)')
+    parser.add_argument('--quick', action='store_true',
+        help='depths up to %d and topics up to %d'
+        % (QUICK_DEPTHS[-1], QUICK_TOPICS[-1]))
+    parser.add_argument('--only', default='metric,command,topics',
+        help='comma-separated groups to run (default: metric,command,topics)')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    depths = QUICK_DEPTHS if args.quick else DEPTHS
+    topic_nums = QUICK_TOPICS if args.quick else TOPICS
+    groups = args.only.split(',')
+    results = {}
+    if 'metric' in groups:
+        bench_metrics(results, depths, args.repeat, random.Random(args.seed))
+    if 'command' in groups:
+        workdir = tempfile.mkdtemp()
+        try:
+            bench_commands(results, depths, args.repeat,
+                random.Random(args.seed), workdir)
+        finally:
+            shutil.rmtree(workdir)
+    if 'topics' in groups:
+        bench_topics(results, topic_nums, args.repeat,
+            random.Random(args.seed))
+
+    output = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': args.seed,
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(output, f, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        slower = compare(results, baseline, args.threshold)
+        for name, old, new, ratio in slower:
+            print("SLOWER %s: %.6f s -> %.6f s (x%.2f)"
+                % (name, old, new, ratio))
+        if len(slower) > 0:
+            sys.exit(1)
+        print("No case is slower than x%.2f of the baseline" % args.threshold)
+
+if __name__ == '__main__':
+    main()
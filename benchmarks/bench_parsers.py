@@ -0,0 +1,68 @@
+# -*- coding:utf-8 -*-
+'''
+Throughput of the rel file and labelled ranked list readers,
+compared with the line-by-line parsers (csv.reader and a regex per line).
+
+Usage: python benchmarks/bench_parsers.py [--lines N] [--repeat R]
+'''
+import argparse
+import csv
+import io
+import random
+import timeit
+
+from pyNTCIREVAL.utils import (read_rel_file, read_labelled_ranked_list,
+    _parse_rel_rows, _parse_level, SEP_LABELLED_RANKED_LIST)
+
+def line_by_line_rel_file(f, sep):
+    result = _parse_rel_rows(csv.reader(f, delimiter=sep))
+    f.close()
+    return result
+
+def line_by_line_labelled_ranked_list(f):
+    result = []
+    for idx, line in enumerate(f):
+        ls = line.strip().split(SEP_LABELLED_RANKED_LIST)
+        if len(ls) == 1:
+            ls.append(None)
+        did, level = ls[:2]
+        if level is not None:
+            level = _parse_level(level, idx)
+        result.append((did, level))
+    f.close()
+    return result
+
+def generate(lines, seed=0):
+    rng = random.Random(seed)
+    rel = "".join(["doc%08d L%d\n" % (i, rng.randint(0, 3))
+        for i in range(lines)])
+    lab = "".join(["doc%08d L%d\n" % (i, rng.randint(0, 3))
+        if rng.random() < 0.8 else "doc%08d\n" % i
+        for i in range(lines)])
+    return rel, lab
+
+def bench(func, data, repeat, *args):
+    assert func(io.StringIO(data), *args) is not None
+    sec = min(timeit.repeat(lambda: func(io.StringIO(data), *args),
+        number=1, repeat=repeat))
+    return data.count("\n") / sec
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--lines', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    rel, lab = generate(args.lines)
+    cases = [
+        ("rel file (bulk)", read_rel_file, rel, (' ',)),
+        ("rel file (line by line)", line_by_line_rel_file, rel, (' ',)),
+        ("labelled list (bulk)", read_labelled_ranked_list, lab, ()),
+        ("labelled list (line by line)", line_by_line_labelled_ranked_list,
+            lab, ()),
+    ]
+    for name, func, data, fargs in cases:
+        print("%-30s %12.0f lines/s" % (name,
+            bench(func, data, args.repeat, *fargs)))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+import asyncio
+import functools
+
+from .evaluator import TopicEvaluators
+
+async def compute_async(metric, ranked_list, executor=None, **kwargs):
+    '''
+    Compute a metric in an executor without blocking the event loop.
+
+    Args:
+        metric: Metric
+        ranked_list: a list of tuples of a document ID and a relevance level,
+            or LabelledList.
+        executor: concurrent.futures.Executor
+            (the default executor of the loop if None).
+        kwargs: the other parameters of Metric.compute.
+
+    Returns:
+        The effectiveness score.
+    '''
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(executor,
+        functools.partial(metric.compute, ranked_list, **kwargs))
+
+class AsyncEvaluator(object):
+    '''
+    An asyncio API of the evaluation of many topics.
+
+    Concurrent requests for the same topic are batched:
+    the first request of a topic waits for batch_delay seconds
+    (or the next iteration of the event loop if 0),
+    and all the requests of the topic until then are evaluated together.
+    A batch with offload_threshold documents or more is evaluated in
+    the executor, while a smaller batch is evaluated in the event loop,
+    where the overhead of the executor would exceed the computation.
+
+    The executor must be a thread pool (the default executor of the loop if None),
+    as the evaluators are shared with the event loop.
+
+    Args:
+        qrels: a dict of a topic ID and a dict of a document ID and a relevance level,
+            or a QrelsIndex.
+        grades: a list of the grade for each relevance level (except level 0).
+        executor: concurrent.futures.ThreadPoolExecutor, or None.
+        batch_delay: seconds to wait for other requests of the same topic.
+        max_batch: the maximum number of requests in a batch.
+        offload_threshold: the number of documents in a batch
+            above which the batch is evaluated in the executor.
+        is_condensed: if True, treat the input as a condensed list (unjudged docs removed)
+        kwargs: the other parameters of Evaluator.
+    '''
+
+    def __init__(self, qrels, grades, executor=None, batch_delay=0.0,
+        max_batch=64, offload_threshold=1000, is_condensed=False, **kwargs):
+        self.topics = TopicEvaluators(qrels, grades, is_condensed, **kwargs)
+        self.executor = executor
+        self.batch_delay = batch_delay
+        self.max_batch = max_batch
+        self.offload_threshold = offload_threshold
+        self._pending = {}
+
+    async def evaluate(self, topic, sysdoclab):
+        '''
+        Compute all the metrics of Evaluator for a labelled ranked list.
+
+        Args:
+            topic: a topic ID.
+            sysdoclab: a ranked list of tuples of a document ID and a relevance level,
+                or LabelledList.
+
+        Returns:
+            A list of tuples of a metric name and its score
+            (see Evaluator.evaluate).
+        '''
+        # raise an error for unknown topics before batching
+        self.topics.get_evaluator(topic)
+        loop = asyncio.get_event_loop()
+        future = loop.create_future()
+        batch = self._pending.get(topic)
+        if batch is None:
+            batch = self._pending[topic] = []
+            if self.batch_delay > 0:
+                loop.call_later(self.batch_delay, self._flush, topic, batch)
+            else:
+                loop.call_soon(self._flush, topic, batch)
+        batch.append((sysdoclab, future))
+        if len(batch) >= self.max_batch:
+            self._flush(topic, batch)
+        return await future
+
+    async def evaluate_docs(self, topic, sysdocs):
+        '''
+        Label a ranked list of documents and compute all the metrics.
+
+        Args:
+            topic: a topic ID.
+            sysdocs: a ranked list of document IDs.
+
+        Returns:
+            A list of tuples of a metric name and its score.
+        '''
+        return await self.evaluate(topic,
+            self.topics.get_labeler(topic).label(sysdocs))
+
+    def _flush(self, topic, batch):
+        '''
+        Evaluate a batch of a topic unless it has already been evaluated.
+        '''
+        if self._pending.get(topic) is not batch:
+            return
+        del self._pending[topic]
+        ranked_lists = [l for l, _ in batch]
+        futures = [f for _, f in batch]
+        if sum([len(l) for l in ranked_lists]) < self.offload_threshold:
+            self._resolve(futures, self._evaluate_batch(topic, ranked_lists))
+            return
+        loop = asyncio.get_event_loop()
+        task = loop.run_in_executor(self.executor,
+            self._evaluate_batch, topic, ranked_lists)
+        def done(task):
+            if task.exception() is not None:
+                self._resolve(futures, [(None, task.exception())] * len(futures))
+            else:
+                self._resolve(futures, task.result())
+        task.add_done_callback(done)
+
+    def _evaluate_batch(self, topic, ranked_lists):
+        '''
+        Returns:
+            A list of tuples of the results and the exception of each ranked list.
+        '''
+        evaluator = self.topics.get_evaluator(topic)
+        results = []
+        for ranked_list in ranked_lists:
+            try:
+                results.append((evaluator.evaluate(ranked_list), None))
+            except Exception as e:
+                results.append((None, e))
+        return results
+
+    def _resolve(self, futures, results):
+        for future, (result, exception) in zip(futures, results):
+            if future.cancelled():
+                continue
+            if exception is not None:
+                future.set_exception(exception)
+            else:
+                future.set_result(result)
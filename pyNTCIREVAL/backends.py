@@ -0,0 +1,4 @@
+# computation backends of metrics (see Metric.compute)
+PYTHON_BACKEND = 'python'
+NUMPY_BACKEND = 'numpy'
+BACKENDS = [PYTHON_BACKEND, NUMPY_BACKEND]
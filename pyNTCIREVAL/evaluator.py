@@ -0,0 +1,326 @@
+import threading
+from collections import OrderedDict
+from functools import partial
+
+from .labeler import Labeler
+from .plan import EvaluationPlan
+from .qrels_index import QrelsIndex
+from .utils import DEFAULT_CUTOFFS, DEFAULT_LOGB
+from .metrics import (PYTHON_BACKEND, NUMPY_BACKEND, RR, OMeasure,
+    PMeasure, PPlusMeasure, AP, QMeasure, NCUguP, NCUguBR, NCUrbP, NCUrbBR,
+    RBP, ERR, nERR, nDCG, MSnDCG, Precision, Hit)
+from .metrics.grade_metric import GradeMetric
+from .metrics.normalized_metric import NormalizedMetric
+
+class Evaluator(object):
+    '''
+    Compute all the metrics of the 'compute' command for a topic.
+
+    Args:
+        xrelnum: the number of judged X-rel docs (including 0-rel=judged nonrel).
+        grades: a list of the grade for each relevance level (except level 0).
+        stops: a list of the stop value for each relevance level
+            (default: same as grades).
+        beta: Q-measure's beta.
+        gamma: rank-biased NCU's gamma.
+        logb: log base for DCG.
+        rbp: persistence for RBP.
+        cutoffs: cutoffs for AP@n, Q@n, nDCG@n, MSnDCG@n, P@n, nERR@n and Hit@n.
+        backend: PYTHON_BACKEND or NUMPY_BACKEND.
+        precomputed: the ideal ranked list of grades and the ideal scores
+            of the topic (see QrelsIndex.get_precomputed).
+        profiler: Profiler that records the time of each metric
+            (see pyNTCIREVAL.profiling), or None.
+    '''
+
+    def __init__(self, xrelnum, grades, stops=None, beta=1.0, gamma=0.95,
+        logb=DEFAULT_LOGB, rbp=0.95, cutoffs=DEFAULT_CUTOFFS, backend=PYTHON_BACKEND,
+        precomputed=None, profiler=None):
+        stops = list(grades) if stops is None else stops
+        self.cutoffs = cutoffs
+        self.backend = backend
+        self.profiler = profiler
+
+        self.metrics = []
+        self.metrics.append(RR())
+        self.metrics.append(OMeasure(xrelnum, grades, beta))
+        self.metrics.append(PMeasure(xrelnum, grades, beta))
+        self.metrics.append(PPlusMeasure(xrelnum, grades, beta))
+        self.metrics.append(AP(xrelnum, grades))
+        self.metrics.append(QMeasure(xrelnum, grades, beta))
+        self.metrics.append(NCUguP(xrelnum, grades, stops))
+        self.metrics.append(NCUguBR(xrelnum, grades, stops, beta))
+        self.metrics.append(NCUrbP(xrelnum, grades, gamma))
+        self.metrics.append(NCUrbBR(xrelnum, grades, gamma, beta))
+        self.metrics.append(RBP(xrelnum, grades, rbp))
+        self.metrics.append(ERR(xrelnum, grades))
+
+        # each metric computes the scores at all the cutoffs in a single pass
+        self.cutoff_metrics = []
+        self.cutoff_metrics.append(AP(xrelnum, grades))
+        self.cutoff_metrics.append(QMeasure(xrelnum, grades, beta))
+        self.cutoff_metrics.append(nDCG(xrelnum, grades, logb, None))
+        self.cutoff_metrics.append(MSnDCG(xrelnum, grades, None))
+        self.cutoff_metrics.append(Precision(None))
+        self.cutoff_metrics.append(nERR(xrelnum, grades, None))
+        self.cutoff_metrics.append(Hit(None))
+
+        if precomputed is not None:
+            for metric in self.metrics + self.cutoff_metrics:
+                if isinstance(metric, GradeMetric):
+                    metric.ideal_grade_ranked_list =\
+                        precomputed['ideal_grade_ranked_list']
+                    metric.ideal_grade_prefix_sums =\
+                        precomputed['ideal_grade_prefix_sums']
+                if isinstance(metric, NormalizedMetric):
+                    metric.ideal_scores =\
+                        precomputed['ideal_scores'].get(str(metric))
+
+        # the profile records of a metric and a cutoff (None for self.metrics)
+        self.records = {}
+        if profiler is not None:
+            for metric in self.metrics:
+                self.records[(id(metric), None)] =\
+                    profiler.instrument(metric)[0]
+            for metric in self.cutoff_metrics:
+                for cutoff, record in zip(self.cutoffs,
+                    profiler.instrument(metric, self.cutoffs)):
+                    self.records[(id(metric), cutoff)] = record
+        self.plan = EvaluationPlan(self.metrics, self.cutoff_metrics,
+            self.cutoffs, self.backend)
+
+    def evaluate(self, sysdoclab):
+        '''
+        Compute all the metrics for a labelled ranked list.
+
+        Args:
+            sysdoclab: a ranked list of tuples of a document ID and a relevance level,
+                or LabelledList.
+
+        Returns:
+            A list of tuples of a metric name and its score
+            in the output order of the 'compute' command.
+        '''
+        return self.plan.evaluate(sysdoclab,
+            None if self.profiler is None else self._measure)
+
+    def _measure(self, metric, cutoff=None):
+        return self.profiler.measure(self.records[(id(metric), cutoff)])
+
+class TopicEvaluators(object):
+    '''
+    The Labeler of every topic and the Evaluator of each topic
+    with a judged relevant document, which is created on first use and reused.
+    Evaluators can be shared by threads.
+
+    Args:
+        qrels: a dict of a topic ID and a dict of a document ID and a relevance level,
+            or a QrelsIndex.
+        grades: a list of the grade for each relevance level (except level 0).
+        is_condensed: if True, treat the input as a condensed list (unjudged docs removed)
+        kwargs: the other parameters of Evaluator.
+    '''
+
+    def __init__(self, qrels, grades, is_condensed=False, **kwargs):
+        self.grades = grades
+        self.kwargs = kwargs
+        # topics with a judged relevant document can be evaluated
+        self.topics = _prepare_topics(qrels, grades, is_condensed, kwargs)
+        self.labelers = OrderedDict()
+        if isinstance(qrels, QrelsIndex):
+            qrels = OrderedDict([(topic, entry['qrels'])
+                for topic, entry in qrels.topics.items()])
+        for topic, topic_qrels in qrels.items():
+            if topic in self.topics:
+                self.labelers[topic] = self.topics[topic][0]
+            else:
+                self.labelers[topic] = Labeler(topic_qrels,
+                    is_condensed=is_condensed, keep_ids=False)
+        self.evaluators = {}
+        self._lock = threading.Lock()
+
+    def get_labeler(self, topic):
+        '''
+        Return the Labeler of a topic.
+
+        Args:
+            topic: a topic ID.
+
+        Returns:
+            Labeler
+        '''
+        if not topic in self.labelers:
+            raise ValueError("Unknown topic: %s" % topic)
+        return self.labelers[topic]
+
+    def get_evaluator(self, topic):
+        '''
+        Return the Evaluator of a topic.
+
+        Args:
+            topic: a topic ID.
+
+        Returns:
+            Evaluator
+        '''
+        if not topic in self.topics:
+            self.get_labeler(topic)
+            raise ValueError(
+                "No relevance document found for topic %s" % topic)
+        evaluator = self.evaluators.get(topic)
+        if evaluator is None:
+            with self._lock:
+                if not topic in self.evaluators:
+                    _, xrelnum, precomputed = self.topics[topic]
+                    self.evaluators[topic] = Evaluator(xrelnum, self.grades,
+                        precomputed=precomputed, **self.kwargs)
+                evaluator = self.evaluators[topic]
+        return evaluator
+
+def evaluate_run(run, qrels, grades, is_condensed=False, **kwargs):
+    '''
+    Evaluate a run for all the topics in a single process.
+    Topics without any judged relevant document are skipped,
+    as the 'compute' command does not accept such topics.
+
+    Args:
+        run: a dict of a topic ID and a ranked list of document IDs.
+        qrels: a dict of a topic ID and a dict of a document ID and a relevance level,
+            or a QrelsIndex.
+        grades: a list of the grade for each relevance level (except level 0).
+        is_condensed: if True, treat the input as a condensed list (unjudged docs removed)
+        kwargs: the other parameters of Evaluator.
+
+    Returns:
+        An OrderedDict of a topic ID and a list of tuples of a metric name and its score.
+        Topics are in the order of qrels.
+    '''
+    result = OrderedDict()
+    for topic, (labeler, xrelnum, precomputed) in\
+        _prepare_topics(qrels, grades, is_condensed, kwargs).items():
+        if not topic in run:
+            continue
+        evaluator = Evaluator(xrelnum, grades, precomputed=precomputed,
+            **kwargs)
+        result[topic] = evaluator.evaluate(labeler.label(run[topic]))
+    return result
+
+def evaluate_runs(runs, qrels, grades, is_condensed=False, workers=None,
+    **kwargs):
+    '''
+    Evaluate runs for all the topics, optionally distributing the topics
+    over a process pool. Each task is a topic with the ranked lists of
+    all the runs for it, so that the per-topic state is prepared once
+    and a single Evaluator of each topic scores all the runs,
+    in this process or in a worker. The results are in the same order
+    as evaluate_run.
+
+    Args:
+        runs: a dict of a run name and a run (see evaluate_run).
+        qrels: a dict of a topic ID and a dict of a document ID and a relevance level,
+            or a QrelsIndex.
+        grades: a list of the grade for each relevance level (except level 0).
+        is_condensed: if True, treat the input as a condensed list (unjudged docs removed)
+        workers: the number of worker processes.
+            Evaluate runs in this process if None or 1.
+        kwargs: the other parameters of Evaluator.
+
+    Returns:
+        An OrderedDict of a run name and the output of evaluate_run.
+    '''
+    topics = _prepare_topics(qrels, grades, is_condensed, kwargs)
+    tasks = []
+    for topic, state in topics.items():
+        names = [name for name, run in runs.items() if topic in run]
+        if len(names) > 0:
+            tasks.append((topic, state, names,
+                [runs[name][topic] for name in names]))
+    args = [(state, ranked_lists) for _, state, _, ranked_lists in tasks]
+    evaluate_topic = partial(_evaluate_topic, grades, kwargs)
+    if workers is None or workers <= 1:
+        scores = [evaluate_topic(arg) for arg in args]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        # the per-topic state is a part of each task
+        # (the initializer of ProcessPoolExecutor requires Python 3.7)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # executor.map returns the results in the order of the tasks
+            scores = list(executor.map(evaluate_topic, args,
+                chunksize=max(1, len(tasks) // (workers * 4))))
+    topic_results = dict([(topic, dict(zip(names, results)))
+        for (topic, _, names, _), results in zip(tasks, scores)])
+    result = OrderedDict()
+    # the topics of each run are in the order of qrels (see evaluate_run)
+    for name in runs:
+        result[name] = OrderedDict()
+        for topic in topics:
+            if name in topic_results.get(topic, {}):
+                result[name][topic] = topic_results[topic][name]
+    return result
+
+def _prepare_topics(qrels, grades, is_condensed, kwargs):
+    '''
+    Compute the per-topic state derived from qrels,
+    or take it from a QrelsIndex.
+
+    Returns:
+        An OrderedDict of a topic ID and a tuple of its Labeler, xrelnum
+        and the precomputation of QrelsIndex (None if not available).
+        Topics without any judged relevant document are excluded.
+    '''
+    rel_level_num = len(grades) + 1
+    result = OrderedDict()
+    if isinstance(qrels, QrelsIndex):
+        logb = kwargs.get('logb', DEFAULT_LOGB)
+        for topic, entry in qrels.topics.items():
+            if entry['jrelnum'] == 0:
+                continue
+            labeler = Labeler(entry['qrels'], is_condensed=is_condensed,
+                keep_ids=False)
+            result[topic] = (labeler, qrels.get_xrelnum(topic, rel_level_num),
+                qrels.get_precomputed(topic, grades, logb))
+        return result
+    for topic, topic_qrels in qrels.items():
+        labeler = Labeler(topic_qrels, is_condensed=is_condensed,
+            keep_ids=False)
+        if labeler.compute_rel_num() == 0:
+            continue
+        xrelnum = labeler.compute_per_level_doc_num(rel_level_num)
+        result[topic] = (labeler, xrelnum, None)
+    return result
+
+def _evaluate_topic(grades, kwargs, task):
+    '''
+    Evaluate the ranked lists of the runs for a topic,
+    in this process or in a worker process of evaluate_runs.
+
+    Args:
+        grades: a list of the grade for each relevance level (except level 0).
+        kwargs: the other parameters of Evaluator.
+        task: a tuple of the state of a topic (see _prepare_topics)
+            and a list of the ranked lists of the runs.
+
+    Returns:
+        A list of the results of Evaluator.evaluate for the ranked lists.
+    '''
+    (labeler, xrelnum, precomputed), ranked_lists = task
+    evaluator = Evaluator(xrelnum, grades, precomputed=precomputed, **kwargs)
+    return [evaluator.evaluate(labeler.label(sysdocs))
+        for sysdocs in ranked_lists]
+
+def mean_scores(topic_results):
+    '''
+    Average the scores over topics.
+
+    Args:
+        topic_results: a dict of a topic ID and a list of tuples of
+            a metric name and its score, e.g. the output of evaluate_run.
+
+    Returns:
+        A list of tuples of a metric name and its mean score.
+    '''
+    results = list(topic_results.values())
+    if len(results) == 0:
+        return []
+    return [(name, sum([r[i][1] for r in results]) / len(results))
+        for i, (name, _) in enumerate(results[0])]
@@ -1,3 +1,8 @@
+from array import array
+
+from .labelled_list import (LabelledList, DocIdDictionary, UNJUDGED,
+    level_typecode)
+
 class Labeler(dict):
     """
     Output a ranked list of documents with a relevance level
@@ -7,12 +12,22 @@ class Labeler(dict):
         qrels: a dict of a document ID and a relevance level
         is_condensed: if True, treat the input as a condensed list (unjudged docs removed)
         truncate: truncate a ranked list at <truncate> if specified
+        dictionary: DocIdDictionary shared by the labelled lists to intern
+            their document IDs. If not specified, each labelled list has
+            its own dictionary, which is released with the list, so that
+            a long-lived Labeler does not accumulate the document IDs of all the runs.
+        keep_ids: if False, labelled lists do not keep document IDs.
     """
 
-    def __init__(self, qrels, truncate=None, is_condensed=False):
+    def __init__(self, qrels, truncate=None, is_condensed=False,
+        dictionary=None, keep_ids=True):
         super(Labeler, self).__init__(qrels)
         self.truncate = truncate
         self.is_condensed = is_condensed
+        self.dictionary = dictionary
+        self.keep_ids = keep_ids
+        self.typecode = level_typecode(
+            max(self.values()) if len(self) > 0 else 0)
 
     def label(self, sysdocs):
         '''
@@ -23,18 +38,49 @@ class Labeler(dict):
             sysdocs: a ranked list of document IDs.
 
         Returns:
-            A ranked list of tuples of a document ID and a relevance level (int).
-        '''
-        result = []
-        for idx, did in enumerate(sysdocs):
-            grade = self.get(did, None)
-            if self.is_condensed and grade is None:
-                pass # do not output documents without rel judge
-            else:
-                result.append((did, grade))
-            if self.truncate is not None and len(result) >= self.truncate:
+            LabelledList, which compares equal to a ranked list of tuples of
+            a document ID and a relevance level (int).
+        '''
+        # the arrays are filled while labelling without intermediate tuples
+        levels = array(self.typecode)
+        append_level = levels.append
+        if not self.keep_ids:
+            for _, l in self.iter_label(sysdocs):
+                append_level(UNJUDGED if l is None else l)
+            return LabelledList(levels)
+        dictionary = self.dictionary if self.dictionary is not None\
+            else DocIdDictionary()
+        encode = dictionary.encode
+        ids = array('l')
+        append_id = ids.append
+        for did, l in self.iter_label(sysdocs):
+            append_level(UNJUDGED if l is None else l)
+            append_id(encode(did))
+        return LabelledList(levels, ids, dictionary)
+
+    def iter_label(self, sysdocs):
+        '''
+        Label a ranked list of documents lazily (see label).
+        sysdocs is not consumed beyond the truncation depth.
+
+        Args:
+            sysdocs: an iterable of document IDs.
+
+        Yields:
+            A tuple of a document ID and a relevance level (int).
+        '''
+        get = self.get
+        truncate = self.truncate
+        is_condensed = self.is_condensed
+        num = 0
+        for did in sysdocs:
+            grade = get(did, None)
+            if is_condensed and grade is None:
+                continue # do not output documents without rel judge
+            yield (did, grade)
+            num += 1
+            if truncate is not None and num >= truncate:
                 break
-        return result
 
     def compute_per_level_doc_num(self, rel_level_num):
         '''
@@ -0,0 +1,235 @@
+from array import array
+
+# the relevance level of unjudged documents in LabelledList.levels
+UNJUDGED = -1
+
+def level_typecode(maxlevel):
+    '''
+    Return the smallest array typecode that holds relevance levels.
+
+    Args:
+        maxlevel: the maximum relevance level.
+
+    Returns:
+        'b' (int8), 'h' (int16) or 'l'.
+    '''
+    if maxlevel <= 127:
+        return 'b'
+    elif maxlevel <= 32767:
+        return 'h'
+    else:
+        return 'l'
+
+def relevant_positions(levels):
+    '''
+    Return the indices of the relevant documents (level > 0) and their levels.
+
+    Args:
+        levels: a sequence of relevance levels.
+
+    Returns:
+        A tuple of a list of indices and a list of relevance levels.
+    '''
+    positions = [idx for idx, l in enumerate(levels) if l > 0]
+    return positions, [levels[idx] for idx in positions]
+
+def relevant_rank_stats(relevant):
+    '''
+    Return the rank statistics of a ranked list from its relevant documents.
+
+    Args:
+        relevant: a tuple of a list of the indices of the relevant documents
+            and a list of their levels (see relevant_positions).
+
+    Returns:
+        A tuple of the rank of the first relevant document,
+        the rank of the first document with the maximum relevance level,
+        and the number of relevant documents from the top to the latter
+        (each None if there is no relevant document).
+    '''
+    positions, levels = relevant
+    if len(positions) == 0:
+        return (None, None, None)
+    first_max = levels.index(max(levels))
+    # ranks are from 1
+    return (positions[0] + 1, positions[first_max] + 1, first_max + 1)
+
+class DocIdDictionary(object):
+    '''
+    An interned dictionary of document IDs,
+    which assigns consecutive integer codes to document IDs.
+    '''
+
+    def __init__(self):
+        self.codes = {}
+        self.doc_ids = []
+
+    def encode(self, doc_id):
+        '''
+        Return the code of a document ID, assigning a new one if not seen.
+
+        Args:
+            doc_id: a document ID.
+
+        Returns:
+            The code of the document ID.
+        '''
+        code = self.codes.get(doc_id)
+        if code is None:
+            code = len(self.doc_ids)
+            self.codes[doc_id] = code
+            self.doc_ids.append(doc_id)
+        return code
+
+    def decode(self, code):
+        '''
+        Return the document ID of a code.
+
+        Args:
+            code: the code of a document ID.
+
+        Returns:
+            The document ID.
+        '''
+        return self.doc_ids[code]
+
+    def __contains__(self, doc_id):
+        return doc_id in self.codes
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+class LabelledList(object):
+    '''
+    A compact ranked list of documents with a relevance level.
+    Relevance levels are kept in a contiguous array,
+    where unjudged documents have the level UNJUDGED,
+    and document IDs are optionally kept as the codes of a DocIdDictionary.
+
+    It behaves as a read-only sequence of tuples of a document ID
+    and a relevance level (None if unjudged), and compares equal to
+    a list of such tuples, while metrics read the level array directly.
+    The document ID is None if the IDs are not kept.
+
+    Args:
+        levels: an array of relevance levels.
+        ids: an array of the codes of document IDs, or None.
+        dictionary: DocIdDictionary that encodes ids.
+    '''
+
+    def __init__(self, levels, ids=None, dictionary=None):
+        self.levels = levels
+        self.ids = ids
+        self.dictionary = dictionary
+        self._judged_levels = None
+        self._relevant = None
+        self._rank_stats = None
+
+    @classmethod
+    def from_pairs(cls, ranked_list, dictionary=None, keep_ids=True):
+        '''
+        Convert a list of tuples into a LabelledList.
+
+        Args:
+            ranked_list: a list of tuples of a document ID and a relevance level,
+                i.e. [(doc_id, rel_level)].
+            dictionary: DocIdDictionary to encode document IDs
+                (a new one if not specified).
+            keep_ids: if False, document IDs are discarded.
+
+        Returns:
+            LabelledList
+        '''
+        levels = [UNJUDGED if l is None else l for _, l in ranked_list]
+        typecode = level_typecode(max(levels) if len(levels) > 0 else 0)
+        if not keep_ids:
+            return cls(array(typecode, levels))
+        if dictionary is None:
+            dictionary = DocIdDictionary()
+        ids = array('l', [dictionary.encode(did) for did, _ in ranked_list])
+        return cls(array(typecode, levels), ids, dictionary)
+
+    def judged_levels(self):
+        '''
+        Relevance levels where unjudged documents are regarded as level 0.
+        Computed once, as the list is not modified.
+
+        Returns:
+            An array of relevance levels.
+        '''
+        if self._judged_levels is None:
+            if UNJUDGED in self.levels:
+                self._judged_levels = array(self.levels.typecode,
+                    [l if l != UNJUDGED else 0 for l in self.levels])
+            else:
+                self._judged_levels = self.levels
+        return self._judged_levels
+
+    def relevant(self):
+        '''
+        The indices of the relevant documents and their levels,
+        which the sparse computation of metrics walks instead of the whole list
+        (see Metric.sparse). Computed once, as the list is not modified.
+
+        Returns:
+            A tuple of a list of indices and a list of relevance levels.
+        '''
+        if self._relevant is None:
+            self._relevant = relevant_positions(self.levels)
+        return self._relevant
+
+    def rank_stats(self):
+        '''
+        The rank statistics shared by all the metrics computed for the list
+        (see relevant_rank_stats). Computed once, as the list is not modified.
+
+        Returns:
+            A tuple of first_rel_rank, first_max_rank and first_max_relnum.
+        '''
+        if self._rank_stats is None:
+            self._rank_stats = relevant_rank_stats(self.relevant())
+        return self._rank_stats
+
+    def doc_id(self, idx):
+        '''
+        A document ID at idx.
+
+        Args:
+            idx: an index of the list
+
+        Returns:
+            The document ID, or None if the IDs are not kept.
+        '''
+        if self.ids is None:
+            return None
+        return self.dictionary.decode(self.ids[idx])
+
+    def __len__(self):
+        return len(self.levels)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return LabelledList(self.levels[idx],
+                self.ids[idx] if self.ids is not None else None,
+                self.dictionary)
+        level = self.levels[idx]
+        return (self.doc_id(idx), level if level != UNJUDGED else None)
+
+    def __iter__(self):
+        for idx in range(len(self.levels)):
+            yield self[idx]
+
+    def __eq__(self, other):
+        if isinstance(other, LabelledList) or isinstance(other, (list, tuple)):
+            return len(self) == len(other)\
+                and all([a == b for a, b in zip(self, other)])
+        return NotImplemented
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
+
+    def __repr__(self):
+        return "LabelledList(%s)" % list(self)
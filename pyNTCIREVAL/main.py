@@ -1,13 +1,17 @@
 import click
-import numpy as np
+import math
+from collections import OrderedDict
+from contextlib import contextmanager
 
 from .utils import (read_grades, read_stops, read_cutoffs, read_rel_file,
-    read_ranked_list, read_labelled_ranked_list, output_labelled_ranked_list,
-    compute_validation)
+    read_qrels_file, iter_ranked_list, read_run_file, RUN_ORDER_SCORE,
+    RUN_ORDERS, read_labelled_ranked_list, output_labelled_ranked_list,
+    compute_validation, parameter_validation)
 from .labeler import Labeler
-from .metrics import (Metric, RR, OMeasure, PMeasure, PPlusMeasure,
-    AP, QMeasure, NCUguP, NCUguBR, NCUrbP, NCUrbBR,
-    RBP, ERR, nERR, nDCG, MSnDCG, Precision, Hit)
+from .labelled_list import LabelledList
+from .backends import PYTHON_BACKEND, NUMPY_BACKEND, BACKENDS
+# the metrics, the evaluator and numpy are imported by the commands
+# that use them, so that the CLI starts quickly (e.g. for 'label')
 
 # Log settings
 from logging import getLogger, StreamHandler, DEBUG, INFO
@@ -37,7 +41,9 @@ def cli():
     help='''Input/output field separator (default: ' ').''')
 @click.option('--truncate', metavar='<rank>',
     help='''Truncate a ranked list at <rank> if specified.''')
-def label(ranked_list, r, j, ec, sep, truncate):
+@click.option('--profile', is_flag=True, default=False,
+    help='''Output the time of each stage as a JSON line to stderr.''')
+def label(ranked_list, r, j, ec, sep, truncate, profile):
     # parsing parameters
     try:
         truncate = int(truncate) if truncate is not None else None
@@ -47,21 +53,36 @@ def label(ranked_list, r, j, ec, sep, truncate):
         raise ValueError(
             "'%s' is an invalid option value for 'truncate'" % truncate)
 
+    # the time of each stage is measured only with --profile
+    if profile:
+        from .profiling import Profiler
+        profiler = Profiler()
+    else:
+        profiler = None
+    stage = profiler.stage if profiler is not None else _no_stage
+
     # processing the rel file
-    qrels = read_rel_file(r, sep)
+    with stage('parse_rel'):
+        qrels = read_rel_file(r, sep)
     # TODO: count_ec_judged
     if ec:
         raise Exception("EC has not been implemented yet")
     labeler = Labeler(qrels, truncate=truncate, is_condensed=j)
 
-    # processing a ranked list
-    sysdocs = read_ranked_list(ranked_list)
+    # processing a ranked list lazily,
+    # which stops reading the input at the truncation depth
+    sysdocs = iter_ranked_list(ranked_list)
 
     # label documents with their relevance level
-    sysdoclab = labeler.label(sysdocs)
+    sysdoclab = labeler.iter_label(sysdocs)
 
     # output the ranked list of documents with their relevance level
-    output_labelled_ranked_list(sysdoclab)
+    # (reading, labelling and writing are interleaved)
+    with stage('label'):
+        output_labelled_ranked_list(sysdoclab)
+
+    if profiler is not None:
+        click.echo("# profile %s" % profiler.to_json(), err=True)
 
 # compute command
 @cli.command()
@@ -101,8 +122,15 @@ def label(ranked_list, r, j, ec, sep, truncate):
 @click.option('-s', default='', metavar='<stopL1:stopL2...>',
     help='''Stop values for graded-uniform NCU '''\
     + '''(default: same as gain values).''')
+@click.option('--backend', default=PYTHON_BACKEND, type=click.Choice(BACKENDS),
+    help='''Computation backend: '%s' walks the list document by document, '''\
+    % PYTHON_BACKEND + '''while '%s' uses array operations ''' % NUMPY_BACKEND\
+    + '''(default: %s).''' % PYTHON_BACKEND)
+@click.option('--profile', is_flag=True, default=False,
+    help='''Output the time of each stage and metric as a JSON line '''\
+    + '''to stderr.''')
 def compute(labelled_ranked_list, r, g, verbose, j, ec, gap,
-    sep, out, beta, gamma, logb, rbp, cutoffs, s):
+    sep, out, beta, gamma, logb, rbp, cutoffs, s, backend, profile):
 
     # verbose?
     if verbose:
@@ -114,10 +142,19 @@ def compute(labelled_ranked_list, r, g, verbose, j, ec, gap,
     rel_level_num = len(grades) + 1 # the number of grades here does not include level 0.
     stops = read_stops(s) if len(s.strip()) > 0 else list(grades)
     cutoffs = read_cutoffs(cutoffs)
-    logb = np.exp(1) if logb == 0 else logb # if logb == 0, then e
+    logb = math.e if logb == 0 else logb # if logb == 0, then e
+
+    from .metrics import Metric
+    from .evaluator import Evaluator
+    from .profiling import Profiler
+
+    # the time of each stage and metric is reported with -v or --profile
+    profiler = Profiler() if profile or logger.isEnabledFor(DEBUG) else None
+    stage = profiler.stage if profiler is not None else _no_stage
 
     # processing the rel file
-    qrels = read_rel_file(r, sep)
+    with stage('parse_rel'):
+        qrels = read_rel_file(r, sep)
     labeler = Labeler(qrels, is_condensed=j)
     xrelnum = labeler.compute_per_level_doc_num(rel_level_num)
     jrelnum = labeler.compute_rel_num()
@@ -126,7 +163,10 @@ def compute(labelled_ranked_list, r, g, verbose, j, ec, gap,
         raise Exception("EC has not been implemented yet")
 
     # processing labelled ranked list
-    sysdoclab = read_labelled_ranked_list(labelled_ranked_list)
+    with stage('parse_ranked_list'):
+        sysdoclab = read_labelled_ranked_list(labelled_ranked_list)
+        # the rank statistics below are shared with the metrics
+        sysdoclab = LabelledList.from_pairs(sysdoclab, keep_ids=False)
     syslen = len(sysdoclab)
     maxlen = syslen if syslen > jrelnum else jrelnum
 
@@ -150,29 +190,240 @@ def compute(labelled_ranked_list, r, g, verbose, j, ec, gap,
             Metric.find_first_max_rank(sysdoclab)))
 
     # compute metrics
-    metrics = []
-    metrics.append(RR())
-    metrics.append(OMeasure(xrelnum, grades, beta))
-    metrics.append(PMeasure(xrelnum, grades, beta))
-    metrics.append(PPlusMeasure(xrelnum, grades, beta))
-    metrics.append(AP(xrelnum, grades))
-    metrics.append(QMeasure(xrelnum, grades, beta))
-    metrics.append(NCUguP(xrelnum, grades, stops))
-    metrics.append(NCUguBR(xrelnum, grades, stops, beta))
-    metrics.append(NCUrbP(xrelnum, grades, gamma))
-    metrics.append(NCUrbBR(xrelnum, grades, gamma, beta))
-    metrics.append(RBP(xrelnum, grades, rbp))
-    metrics.append(ERR(xrelnum, grades))
-    for cutoff in cutoffs:
-        metrics.append(AP(xrelnum, grades, cutoff))
-        metrics.append(QMeasure(xrelnum, grades, beta, cutoff))
-        metrics.append(nDCG(xrelnum, grades, logb, cutoff))
-        metrics.append(MSnDCG(xrelnum, grades, cutoff))
-        metrics.append(Precision(cutoff))
-        metrics.append(nERR(xrelnum, grades, cutoff))
-        metrics.append(Hit(cutoff))
-
-    for metric in metrics:
-        score = metric.compute(sysdoclab)
-        print(("%s " % out +"%s=" % metric).ljust(LEFT_PADDING)
+    evaluator = Evaluator(xrelnum, grades, stops, beta, gamma, logb, rbp,
+        cutoffs, backend, profiler=profiler)
+    with stage('evaluate'):
+        results = evaluator.evaluate(sysdoclab)
+    output_scores(out, results)
+
+    if profiler is not None:
+        profiler.log(logger, out)
+        if profile:
+            click.echo("%s # profile %s" % (out, profiler.to_json()), err=True)
+
+# batch command
+@cli.command()
+@click.argument('run_files', nargs=-1,
+    type=click.File('r'), metavar='[run file...]')
+@click.option('-r', type=click.File('r'), metavar='<relfile>',
+    help='''A multi-topic rel (relevance assessments) file: '''\
+    + '''<topicID> <docID> L<level> or <topicID> 0 <docID> <level> per line''')
+@click.option('--index', type=click.File('rb'), metavar='<index file>',
+    help='''A compiled qrels index (see 'compile'), used instead of -r''')
+@click.option('-g', metavar='<gainL1:gainL2...>', required=True,
+    help='''How many relevance levels there are (excluding L0) '''\
+    + '''and the gain value for each relevance level.''')
+@click.option('-j', is_flag=True, default=False,
+    help='''Treat the input as a condensed list (unjudged docs removed).''')
+@click.option('--sep', default=' ', metavar='<separator>',
+    help='''Field separator of the rel file (default: ' ').''')
+@click.option('--beta', default=1.0, metavar=' <positive value>',
+    help='''Q-measure's beta (default: 1.00).''')
+@click.option('--gamma', default=0.95, metavar='<positive value <=1 >',
+    help='''Gamma for rank-biased NCU (default: 0.95).''')
+@click.option('--logb', default=2.0, metavar='<value >=0 >',
+    help='''Log base for DCG (default: 2.00). '''\
+    + '''If you want natural log, set this value to zero.''')
+@click.option('--rbp', default=0.95, metavar='<positive value <=1 >',
+    help='''Persistence for RBP (default: 0.95).''')
+@click.option('--cutoffs', default='',
+    metavar='<document rank[,document rank,...]>',
+    help='''Cutoffs for P@n, Hit@n, nDCG@n... (default: 1000).''')
+@click.option('-s', default='', metavar='<stopL1:stopL2...>',
+    help='''Stop values for graded-uniform NCU '''\
+    + '''(default: same as gain values).''')
+@click.option('--backend', default=PYTHON_BACKEND, type=click.Choice(BACKENDS),
+    help='''Computation backend (default: %s).''' % PYTHON_BACKEND)
+@click.option('--workers', default=1, metavar='<number>',
+    help='''The number of worker processes (default: 1).''')
+@click.option('--test', type=click.Choice(['ttest', 'randomization',
+    'bootstrap', 'tukey']),
+    help='''Test the difference of every pair of the runs.''')
+@click.option('--test-metric', multiple=True, metavar='<metric name>',
+    help='''A metric to test, e.g. nDCG@10 (default: all the metrics).''')
+@click.option('--trials', default=10000, metavar='<number>',
+    help='''The number of resamples of the test (default: 10000).''')
+@click.option('--seed', default=None, type=int, metavar='<number>',
+    help='''The random seed of the test.''')
+@click.option('--store', metavar='<directory>',
+    help='''Also write the scores into a columnar score store (see ScoreStore).''')
+@click.option('--order', default=RUN_ORDER_SCORE, type=click.Choice(RUN_ORDERS),
+    help='''Rank the documents of each topic by <score> (descending, as trec_eval)
+    or by <rank> (ascending) (default: score).''')
+def batch(run_files, r, index, g, j, sep, beta, gamma, logb, rbp, cutoffs, s,
+    backend, workers, test, test_metric, trials, seed, store, order):
+    '''
+    Evaluate TREC-style run files for all the topics in the rel file.
+    Outputs the scores for each topic, followed by the mean scores (ALL).
+    Each line starts with the run file name if there are multiple run files.
+    With --test, the p-value of each pair of the runs follows for each metric.
+    '''
+    from .evaluator import evaluate_runs, mean_scores
+    from .qrels_index import QrelsIndex
+
+    # parsing parameters
+    grades = read_grades(g)
+    stops = read_stops(s) if len(s.strip()) > 0 else list(grades)
+    cutoffs = read_cutoffs(cutoffs)
+    logb = math.e if logb == 0 else logb # if logb == 0, then e
+    parameter_validation(grades, stops, beta, gamma, logb, rbp)
+
+    if index is not None:
+        qrels = QrelsIndex.load(index)
+    elif r is not None:
+        qrels = read_qrels_file(r, sep)
+    else:
+        raise click.UsageError("Either '-r' or '--index' is required")
+    runs = OrderedDict()
+    for f in run_files if len(run_files) > 0 else [None]:
+        name = f.name if f is not None else '-'
+        runs[name] = read_run_file(f, order)
+    run_results = evaluate_runs(runs, qrels, grades, is_condensed=j,
+        workers=workers, stops=stops, beta=beta, gamma=gamma, logb=logb,
+        rbp=rbp, cutoffs=cutoffs, backend=backend)
+    for name, topic_results in run_results.items():
+        prefix = "%s " % name if len(runs) > 1 else ""
+        for topic, results in topic_results.items():
+            output_scores(prefix + topic, results)
+        output_scores(prefix + "ALL", mean_scores(topic_results))
+    if store is not None:
+        from .score_store import ScoreStore
+        ScoreStore.write(store, run_results)
+
+    if test is not None:
+        from .significance import pairwise_tests
+        if len(runs) < 2:
+            raise click.UsageError("'--test' requires two or more run files")
+        results = [r for r in run_results.values() if len(r) > 0]
+        if len(test_metric) > 0:
+            names = test_metric
+        elif len(results) > 0:
+            # all the metrics of the first topic evaluated
+            names = [name for name, _ in list(results[0].values())[0]]
+        else:
+            names = []
+        for name in names:
+            try:
+                pvalues = pairwise_tests(run_results, name, test, trials,
+                    seed, max(1, workers))
+            except ValueError as e:
+                raise click.UsageError(str(e))
+            for p in pvalues:
+                print("%s %s %s %s diff=%0.4f p=%0.4f" % (test, name,
+                    p['run_a'], p['run_b'], p['diff'], p['p']))
+
+# serve command
+@cli.command()
+@click.option('-r', type=click.File('r'), metavar='<relfile>',
+    help='''A multi-topic rel (relevance assessments) file (see 'batch')''')
+@click.option('--index', type=click.File('rb'), metavar='<index file>',
+    help='''A compiled qrels index (see 'compile'), used instead of -r''')
+@click.option('-g', metavar='<gainL1:gainL2...>', required=True,
+    help='''How many relevance levels there are (excluding L0) '''\
+    + '''and the gain value for each relevance level.''')
+@click.option('-j', is_flag=True, default=False,
+    help='''Treat the input as a condensed list (unjudged docs removed).''')
+@click.option('--sep', default=' ', metavar='<separator>',
+    help='''Field separator of the rel file (default: ' ').''')
+@click.option('--beta', default=1.0, metavar=' <positive value>',
+    help='''Q-measure's beta (default: 1.00).''')
+@click.option('--gamma', default=0.95, metavar='<positive value <=1 >',
+    help='''Gamma for rank-biased NCU (default: 0.95).''')
+@click.option('--logb', default=2.0, metavar='<value >=0 >',
+    help='''Log base for DCG (default: 2.00). '''\
+    + '''If you want natural log, set this value to zero.''')
+@click.option('--rbp', default=0.95, metavar='<positive value <=1 >',
+    help='''Persistence for RBP (default: 0.95).''')
+@click.option('--cutoffs', default='',
+    metavar='<document rank[,document rank,...]>',
+    help='''Cutoffs for P@n, Hit@n, nDCG@n... (default: 1000).''')
+@click.option('-s', default='', metavar='<stopL1:stopL2...>',
+    help='''Stop values for graded-uniform NCU '''\
+    + '''(default: same as gain values).''')
+@click.option('--backend', default=PYTHON_BACKEND, type=click.Choice(BACKENDS),
+    help='''Computation backend (default: %s).''' % PYTHON_BACKEND)
+@click.option('--socket', metavar='<path>',
+    help='''Listen on a Unix socket instead of stdin/stdout.''')
+@click.option('--workers', default=1, metavar='<number>',
+    help='''The number of worker threads (default: 1).''')
+@click.option('--queue-size', default=64, metavar='<number>',
+    help='''The maximum number of pending requests (default: 64).''')
+def serve(r, index, g, j, sep, beta, gamma, logb, rbp, cutoffs, s,
+    backend, socket, workers, queue_size):
+    '''
+    Answer label/compute requests in JSON lines,
+    keeping the qrels and the metrics loaded (see EvaluationServer).
+    '''
+    from .qrels_index import QrelsIndex
+    from .server import EvaluationServer
+
+    # parsing parameters
+    grades = read_grades(g)
+    stops = read_stops(s) if len(s.strip()) > 0 else list(grades)
+    cutoffs = read_cutoffs(cutoffs)
+    logb = math.e if logb == 0 else logb # if logb == 0, then e
+    parameter_validation(grades, stops, beta, gamma, logb, rbp)
+    if queue_size < 1:
+        raise click.BadParameter("the value of '--queue-size' must be 1 or more")
+
+    if index is not None:
+        qrels = QrelsIndex.load(index)
+    elif r is not None:
+        qrels = read_qrels_file(r, sep)
+    else:
+        raise click.UsageError("Either '-r' or '--index' is required")
+    server = EvaluationServer(qrels, grades, is_condensed=j, workers=workers,
+        queue_size=queue_size, stops=stops, beta=beta, gamma=gamma, logb=logb,
+        rbp=rbp, cutoffs=cutoffs, backend=backend)
+    if socket is not None:
+        server.serve_unix(socket)
+    else:
+        import sys
+        server.serve_stream(sys.stdin, sys.stdout)
+
+# compile command
+@cli.command('compile')
+@click.option('-r', type=click.File('r'), metavar='<relfile>', required=True,
+    help='''A multi-topic rel (relevance assessments) file (see 'batch')''')
+@click.option('-g', metavar='<gainL1:gainL2...>', multiple=True,
+    help='''Gain values for which the ideal lists are precomputed. '''\
+    + '''Can be specified multiple times.''')
+@click.option('--sep', default=' ', metavar='<separator>',
+    help='''Field separator of the rel file (default: ' ').''')
+@click.option('--logb', default=2.0, metavar='<value >=0 >',
+    help='''Log base for DCG (default: 2.00). '''\
+    + '''If you want natural log, set this value to zero.''')
+@click.option('--cutoffs', default='',
+    metavar='<document rank[,document rank,...]>',
+    help='''Cutoffs for the ideal nDCG@n, MSnDCG@n and nERR@n '''\
+    + '''(default: 1000).''')
+@click.option('-o', type=click.File('wb'), metavar='<index file>',
+    required=True, help='''Output index file''')
+def compile_qrels(r, g, sep, logb, cutoffs, o):
+    '''
+    Compile a multi-topic rel file into an index for the 'batch' command.
+    '''
+    from .qrels_index import QrelsIndex
+
+    cutoffs = read_cutoffs(cutoffs)
+    logb = math.e if logb == 0 else logb # if logb == 0, then e
+    index = QrelsIndex(read_qrels_file(r, sep))
+    for grades in g:
+        index.precompute(read_grades(grades), logb, cutoffs)
+    index.save(o)
+
+@contextmanager
+def _no_stage(name):
+    yield
+
+def output_scores(out, results):
+    '''
+    Output the scores of metrics.
+
+    Args:
+        out: prefix string for each output line.
+        results: a list of tuples of a metric name and its score.
+    '''
+    for name, score in results:
+        print(("%s " % out +"%s=" % name).ljust(LEFT_PADDING)
             + "%0.4f" % score)
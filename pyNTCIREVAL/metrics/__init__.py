@@ -1,4 +1,5 @@
-from .metric import Metric
+from .metric import Metric, MetricState, PYTHON_BACKEND, NUMPY_BACKEND, BACKENDS
+from .incremental import IncrementalMetric
 from .rr import RR
 from .o_measure import OMeasure
 from .p_measure import PMeasure
@@ -1,4 +1,4 @@
-from .ncu import NCU, p_u
+from .ncu import NCU, p_u, p_u_jrelnum
 
 class AP(NCU):
     '''
@@ -18,3 +18,7 @@ class AP(NCU):
     def __init__(self, xrelnum, grades, cutoff=None):
         super(AP, self).__init__(xrelnum, grades, 0.0, p_u())
         self.cutoff = cutoff
+
+    def _cutoff_key(self, cutoff):
+        # the stop probability is 1 / p_u_jrelnum
+        return p_u_jrelnum(self, cutoff)
@@ -0,0 +1,124 @@
+import math
+import threading
+
+DCG_DISCOUNT = 'dcg'
+MS_DCG_DISCOUNT = 'msdcg'
+RBP_DISCOUNT = 'rbp'
+RANK_BIASED_STOP = 'rb'
+
+# the depth of a new table
+INITIAL_DEPTH = 128
+
+def orig_dcglog(rank, logb):
+    '''
+    This is for computing the ORIGINAL dcg [Jarvelin/Kekalainen TOIS02].
+    if i == 1:
+        return 1 (i.e. no discounting)
+    if i < b:
+        return 1 (i.e. no discounting)
+    else (Discounting is applied only if i >= b. )
+        return either logb(i)
+    '''
+    if rank == 1:
+        return 1.0
+    elif rank < logb:
+        return 1.0
+    else:
+        return math.log(rank, logb)
+
+# a function of a parameter that returns the function of a rank
+FAMILIES = {
+    # nDCG: 1 / logb(rank)
+    DCG_DISCOUNT: lambda logb: lambda rank: 1.0 / orig_dcglog(rank, logb),
+    # MSnDCG: 1 / log(rank + 1)
+    MS_DCG_DISCOUNT: lambda _: lambda rank: 1.0 / math.log(rank + 1),
+    # RBP: (1 - pr) * pr^(rank - 1)
+    RBP_DISCOUNT: lambda pr: lambda rank: (1 - pr) * pr ** (rank - 1),
+    # rank-biased NCU: gamma^(relnum - 1), where relnum is given as the rank
+    RANK_BIASED_STOP: lambda gamma: lambda rank: gamma ** (rank - 1),
+}
+
+_tables = {}
+# guards the registry and the growth of the tables
+_lock = threading.Lock()
+
+class DiscountTable(object):
+    '''
+    The discount values of ranks 1, 2, ..., which are computed once
+    and shared by all the metric instances with the same parameter
+    (see get_discount_table).
+
+    The table grows lazily, doubling its depth, when a deeper rank is looked up.
+    The values are kept in a tuple, which is replaced as a whole when the table
+    grows, so that threads can read the table without a lock.
+    A pickled table is restored from the registry.
+
+    Args:
+        family: DCG_DISCOUNT, MS_DCG_DISCOUNT, RBP_DISCOUNT or RANK_BIASED_STOP.
+        param: the parameter of the discount (logb, pr or gamma).
+    '''
+
+    def __init__(self, family, param=None):
+        if not family in FAMILIES:
+            raise ValueError("Unknown discount family: '%s'" % family)
+        self.family = family
+        self.param = param
+        self.func = FAMILIES[family](param)
+        self.values = ()
+
+    def get(self, rank):
+        '''
+        Return the discount value of a rank.
+
+        Args:
+            rank: a rank (from 1).
+
+        Returns:
+            The discount value.
+        '''
+        try:
+            return self.values[rank - 1]
+        except IndexError:
+            return self._grow(rank)[rank - 1]
+
+    def _grow(self, rank):
+        with _lock:
+            values = self.values
+            if len(values) < rank:
+                depth = max(rank, 2 * len(values), INITIAL_DEPTH)
+                self.values = values + tuple([self.func(r)
+                    for r in range(len(values) + 1, depth + 1)])
+            return self.values
+
+    def __len__(self):
+        return len(self.values)
+
+    def __reduce__(self):
+        return (get_discount_table, (self.family, self.param))
+
+def get_discount_table(family, param=None):
+    '''
+    Return the discount table of a metric family and its parameter
+    from the process-wide registry, creating it if not exists.
+
+    Args:
+        family: DCG_DISCOUNT, MS_DCG_DISCOUNT, RBP_DISCOUNT or RANK_BIASED_STOP.
+        param: the parameter of the discount (logb, pr or gamma).
+
+    Returns:
+        DiscountTable
+    '''
+    key = (family, param)
+    table = _tables.get(key)
+    if table is None:
+        table = DiscountTable(family, param)
+        with _lock:
+            table = _tables.setdefault(key, table)
+    return table
+
+def clear_discount_tables():
+    '''
+    Discard all the discount tables in the registry.
+    '''
+    with _lock:
+        _tables.clear()
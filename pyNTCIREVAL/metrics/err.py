@@ -1,5 +1,4 @@
 from .grade_metric import GradeMetric
-import numpy as np
 
 class ERR(GradeMetric):
     '''
@@ -10,10 +9,26 @@ class ERR(GradeMetric):
     Args:
         xrelnum: the number of judged X-rel docs (including 0-rel=judged nonrel).
         grades: a list of the grade for each relevance level (except level 0).
+        epsilon: stop the computation once the probability that the user
+            reaches the next rank drops below this value (0.0: never stop).
     '''
-    def gain(self, idx):
-        return self._err_grade(idx)
+    reach_probability = True
+    sparse = True
 
-    def discount(self, idx):
-        return 1.0 / self.rank(idx)\
-            * np.prod([1.0 - r for r in self.gains])
+    def __init__(self, xrelnum, grades, epsilon=0.0):
+        super(ERR, self).__init__(xrelnum, grades)
+        self.epsilon = epsilon
+
+    def gain(self, state, idx):
+        return self._err_grade(state, idx)
+
+    def discount(self, state, idx):
+        return 1.0 / self.rank(idx) * state.reach
+
+    def _array_score(self, levels, cutoff):
+        import numpy as np
+        levels = self._truncate_array(levels, cutoff)
+        g = self._grade_array(levels) / (self.maxgrade + 1.0)
+        reach = self._err_reach_array(g)
+        g = g[:len(reach)]
+        return float(np.sum(g * reach / self.rank_array(len(g))))
@@ -4,6 +4,10 @@ class GradeMetric(Metric):
     '''
     A metric class for all the metrics with graded relevance.
 
+    The ideal ranked list of grades (ideal_grade_ranked_list) and its prefix sums
+    (ideal_grade_prefix_sums) are computed when they are first used,
+    unless they are given in advance, e.g. by QrelsIndex.
+
     Args:
         xrelnum: the number of judged X-rel docs (including 0-rel=judged nonrel).
         grades: a list of the grade for each relevance level (except level 0).
@@ -16,45 +20,71 @@ class GradeMetric(Metric):
         self.maxgrade = self.grades[-1]
         self.cutoff = None
 
-    def _grade(self, idx):
+    def __getattr__(self, name):
+        '''
+        Compute the ideal ranked list of grades and its prefix sums lazily.
+        Called only if the attribute has not been set.
+        '''
+        if name == 'ideal_grade_ranked_list':
+            self.ideal_grade_ranked_list = self._get_ideal_grade_ranked_list()
+            return self.ideal_grade_ranked_list
+        elif name == 'ideal_grade_prefix_sums':
+            self.ideal_grade_prefix_sums = self._get_ideal_grade_prefix_sums()
+            return self.ideal_grade_prefix_sums
+        raise AttributeError(name)
+
+    def invalidate_ideal(self):
+        '''
+        Discard the ideal lists of this metric.
+        Must be called when xrelnum or grades are changed.
+        '''
+        self.jrelnum = sum(self.xrelnum[1:])
+        self.maxgrade = self.grades[-1]
+        self.__dict__.pop('ideal_grade_ranked_list', None)
+        self.__dict__.pop('ideal_grade_prefix_sums', None)
+
+    def _grade(self, state, idx):
         '''
         A grade at idx.
 
         Args:
+            state: MetricState
             idx: an index of a ranked list
 
         Returns:
             A grade at idx.
         '''
-        level = self._level(idx)
+        level = self._level(state, idx)
         if level == 0:
             return 0.0
         else:
             return self.grades[level-1]
 
-    def _err_grade(self, idx):
+    def _err_grade(self, state, idx):
         '''
         An ERR grade at idx.
 
         Args:
+            state: MetricState
             idx: an index of a ranked list
 
         Returns:
             An ERR grade at idx.
         '''
-        return self._grade(idx) / (self.maxgrade + 1.0)
+        return self._grade(state, idx) / (self.maxgrade + 1.0)
 
-    def _rbp_grade(self, idx):
+    def _rbp_grade(self, state, idx):
         '''
         A RBP grade at idx.
 
         Args:
+            state: MetricState
             idx: an index of a ranked list
 
         Returns:
             A RBP grade at idx.
         '''
-        return self._grade(idx) / self.maxgrade
+        return self._grade(state, idx) / self.maxgrade
 
     def _get_ideal_grade_ranked_list(self):
         '''
@@ -73,3 +103,119 @@ class GradeMetric(Metric):
         result = sorted(result, reverse=True)
         return result
 
+    def _get_ideal_grade_prefix_sums(self):
+        '''
+        Get the prefix sums of the ideal ranked list of grades.
+
+        Returns:
+            Returns a list whose i-th element is the sum of
+            the first i grades in the ideal ranked list.
+        '''
+        result = [0]
+        for grade in self.ideal_grade_ranked_list:
+            result.append(result[-1] + grade)
+        return result
+
+    def _ideal_cumulative_grade(self, rank):
+        '''
+        The cumulative grade of the ideal ranked list at rank.
+
+        Args:
+            rank: a rank of a ranked list
+
+        Returns:
+            The sum of the grades from the top to rank in the ideal ranked list.
+        '''
+        prefix_sums = self.ideal_grade_prefix_sums
+        if rank < len(prefix_sums):
+            return prefix_sums[rank]
+        else:
+            return prefix_sums[-1]
+
+    def _use_shared(self, state, shared):
+        if self.cumulative_gain:
+            state.cumgains = shared.cumgains(self)
+            state.blended_ratios = shared.blended_ratios(self)
+
+    def _blended_ratio(self, state, idx):
+        '''
+        Blended ratio at idx.
+        state.cumgain must be maintained by compute (see cumulative_gain).
+
+        Args:
+            state: MetricState
+            idx: an index of a ranked list
+
+        Returns:
+            Blended ratio at idx.
+        '''
+        if state.blended_ratios is not None:
+            return state.blended_ratios[state.relnum - 1]
+        rank = self.rank(idx)
+        ig = self._ideal_cumulative_grade(rank)
+        return (state.relnum + self.beta * state.cumgain)\
+            / (rank + self.beta * ig)
+
+    def _grade_array(self, levels):
+        '''
+        Grades for an array of relevance levels.
+
+        Args:
+            levels: an array of relevance levels.
+
+        Returns:
+            A float array of grades.
+        '''
+        import numpy as np
+        table = np.array([0.0] + list(self.grades), dtype=np.float64)
+        return table[levels]
+
+    def _ideal_cumulative_grade_array(self, length):
+        '''
+        The cumulative grades of the ideal ranked list from rank 1 to length.
+
+        Args:
+            length: the length of a ranked list
+
+        Returns:
+            A float array whose i-th element is _ideal_cumulative_grade(i+1).
+        '''
+        import numpy as np
+        prefix_sums = np.array(self.ideal_grade_prefix_sums, dtype=np.float64)
+        ranks = np.arange(1, length + 1)
+        return prefix_sums[np.minimum(ranks, len(prefix_sums) - 1)]
+
+    def _blended_ratio_array(self, levels):
+        '''
+        Blended ratio at every rank.
+
+        Args:
+            levels: an array of relevance levels.
+
+        Returns:
+            A float array of blended ratio.
+        '''
+        import numpy as np
+        relnum = np.cumsum(levels > 0)
+        cumgain = np.cumsum(self._grade_array(levels))
+        ig = self._ideal_cumulative_grade_array(len(levels))
+        return (relnum + self.beta * cumgain)\
+            / (self.rank_array(len(levels)) + self.beta * ig)
+
+    def _err_reach_array(self, g):
+        '''
+        The probability that the user reaches each rank in ERR,
+        truncated where the probability drops below self.epsilon.
+
+        Args:
+            g: a float array of ERR grades.
+
+        Returns:
+            A float array of the probability for each rank.
+        '''
+        import numpy as np
+        reach = np.cumprod(1.0 - g)
+        exhausted = np.flatnonzero(reach < self.epsilon)
+        if len(exhausted) > 0:
+            reach = reach[:exhausted[0]+1]
+        return np.concatenate(([1.0], reach))[:len(reach)]
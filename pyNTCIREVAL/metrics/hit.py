@@ -7,14 +7,23 @@ class Hit(Metric):
     Args:
         cutoff: the evaluation metric is computed for from the top to this rank if specified
     '''
+    sparse = True
+
     def __init__(self, cutoff):
         self.cutoff = cutoff
 
-    def gain(self, idx):
-        return 1.0 if self._is_relevant(idx) else 0.0
+    def gain(self, state, idx):
+        return 1.0 if self._is_relevant(state, idx) else 0.0
 
-    def discount(self, idx):
-        if all([g == 0 for g in self.gains]):
+    def discount(self, state, idx):
+        # no relevant document above idx
+        relnum = state.relnum - (1 if self._is_relevant(state, idx) else 0)
+        if relnum == 0:
             return 1.0
         else:
             return 0.0
+
+    def _array_score(self, levels, cutoff):
+        import numpy as np
+        levels = self._truncate_array(levels, cutoff)
+        return 1.0 if np.any(levels > 0) else 0.0
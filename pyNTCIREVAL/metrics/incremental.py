@@ -0,0 +1,83 @@
+from .metric import Metric, MetricState
+from .normalized_metric import NormalizedMetric
+
+class IncrementalMetric(object):
+    '''
+    The score of a metric for a ranked list that grows at its bottom,
+    e.g. a list being retrieved page by page.
+
+    extend() resumes the computation from the last rank, so that its cost is
+    proportional to the number of the appended documents.
+    The score is the same as that computed by Metric.compute for the whole list.
+    Only the metrics referring to state.first_max_rank (P-measure and P-plus)
+    are computed again from the top, when a document of a higher relevance level
+    than any above it is appended.
+
+    Args:
+        metric: Metric
+    '''
+
+    def __init__(self, metric):
+        self.metric = metric
+        self.state = MetricState([], metric.cutoff)
+        self.result = 0.0
+        self.maxlevel = 0
+        # the number of relevant documents in the list
+        self.relnum = 0
+        self.state.rank_stats = (None, None, None)
+
+    def extend(self, labelled_docs):
+        '''
+        Append documents to the bottom of the ranked list.
+
+        Args:
+            labelled_docs: a list of tuples of a document ID and a relevance level,
+                i.e. [(doc_id, rel_level)], or LabelledList.
+
+        Returns:
+            The effectiveness score of the whole ranked list.
+        '''
+        state = self.state
+        start = state.syslen
+        first_rel_rank, first_max_rank, first_max_relnum = state.rank_stats
+        for doc in labelled_docs:
+            level = doc[1] if doc[1] is not None else 0
+            if level > 0:
+                self.relnum += 1
+                if first_rel_rank is None:
+                    first_rel_rank = Metric.rank(state.syslen)
+            if level > self.maxlevel:
+                self.maxlevel = level
+                first_max_rank = Metric.rank(state.syslen)
+                first_max_relnum = self.relnum
+            state.ranked_list.append(doc)
+            state.levels.append(level)
+            state.syslen += 1
+
+        first_max_changed = state.first_max_rank != first_max_rank
+        state.rank_stats = (first_rel_rank, first_max_rank, first_max_relnum)
+        if self.metric.uses_first_max_rank and first_max_changed:
+            # the discount above the new first_max_rank has changed
+            state.relnum = 0
+            state.cumgain = 0
+            state.reach = 1.0
+            state.stopped = False
+            start = 0
+            self.result = 0.0
+        if not state.stopped:
+            for _, self.result in self.metric._accumulate_dense(
+                state, start, self.result):
+                pass
+        return self.score()
+
+    def score(self):
+        '''
+        Returns:
+            The effectiveness score of the ranked list so far.
+        '''
+        if isinstance(self.metric, NormalizedMetric):
+            return self.result / self.metric.compute_ideal()
+        return self.result
+
+    def __len__(self):
+        return self.state.syslen
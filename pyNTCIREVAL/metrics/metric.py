@@ -1,66 +1,338 @@
+from ..backends import PYTHON_BACKEND, NUMPY_BACKEND, BACKENDS
+from ..labelled_list import (LabelledList, relevant_positions,
+    relevant_rank_stats)
+
 class Metric(object):
     '''
     A base class for all the metrics.
+
+    A metric object keeps only its configuration, while the state of each
+    computation is kept in MetricState and passed to gain() and discount().
+    Thus, a metric object can be shared by threads.
     '''
+    # True if gain() refers to the cumulative grade state.cumgain
+    cumulative_gain = False
+    # True if discount() refers to state.reach, i.e. the probability
+    # that the user reaches the rank (the product of 1 - gain above it)
+    reach_probability = False
+    # stop the computation once state.reach drops below this value
+    epsilon = 0.0
+    # True if discount() refers to state.first_max_rank, which depends on
+    # the documents below the rank (see IncrementalMetric)
+    uses_first_max_rank = False
+    # True if gain() * discount() is 0 at non-relevant documents,
+    # and gain() and discount() refer to the state only through
+    # relnum, cumgain, reach, first_rel_rank and first_max_rank,
+    # so that compute() walks only the relevant documents
+    sparse = False
+
     def __init__(self):
         self.cutoff = None
 
-    def compute(self, ranked_list):
+    def compute(self, ranked_list, backend=PYTHON_BACKEND, shared=None):
         '''
         Compute the effectiveness score.
 
         Args:
             ranked_list: a list of tuples of a document ID and a relevance level,
                 i.e. [(doc_id, rel_level)].
+            backend: PYTHON_BACKEND walks the list with gain() and discount(),
+                while NUMPY_BACKEND computes the score with compute_array().
+            shared: the intermediates of the ranked list shared by the metrics
+                of an evaluation (see pyNTCIREVAL.plan.Intermediates), or None.
         Returns:
             The effectiveness score in terms of this evaluation metric.
         '''
+        if backend == NUMPY_BACKEND:
+            return self.compute_array(self.level_array(ranked_list))
+        elif backend != PYTHON_BACKEND:
+            raise ValueError("Unknown backend: '%s'" % backend)
         result = 0.0
-        # cache with MetricState for efficient computation
-        with MetricState(self, ranked_list):
-            for idx, _ in enumerate(ranked_list):
-                self.relnum += 1 if self._is_relevant(idx) else 0
-                g = self.gain(idx)
-                d = self.discount(idx)
-                result += g * d
-                self.gains.append(g)
-                self.discounts.append(d)
-
-                # cutoff
-                if self.cutoff and self.rank(idx) >= self.cutoff:
-                    break
+        state = MetricState(ranked_list, self.cutoff)
+        if shared is not None and self.sparse:
+            self._use_shared(state, shared)
+        walk = self._accumulate_sparse if self.sparse else self._accumulate_dense
+        for _, result in walk(state):
+            pass
         return result
 
-    def _level(self, idx):
+    def compute_cutoffs(self, ranked_list, cutoffs, backend=PYTHON_BACKEND,
+        shared=None):
+        '''
+        Compute the effectiveness score at each cutoff in a single pass.
+        The cutoff of this metric is ignored.
+
+        Args:
+            ranked_list: a list of tuples of a document ID and a relevance level,
+                i.e. [(doc_id, rel_level)].
+            cutoffs: a list of cutoff values.
+            backend: PYTHON_BACKEND or NUMPY_BACKEND (see compute).
+            shared: the intermediates of the ranked list (see compute).
+        Returns:
+            A list of the effectiveness scores at each of the cutoffs.
+        '''
+        if backend == NUMPY_BACKEND:
+            return self.compute_array_cutoffs(
+                self.level_array(ranked_list), cutoffs)
+        elif backend != PYTHON_BACKEND:
+            raise ValueError("Unknown backend: '%s'" % backend)
+        scores = [None] * len(cutoffs)
+        # the cutoffs at which the scores are the sums of the same terms
+        # are computed in a single pass
+        groups = {}
+        for i, cutoff in enumerate(cutoffs):
+            groups.setdefault(self._cutoff_key(cutoff), []).append(i)
+        for indices in groups.values():
+            group_scores = self._compute_cutoffs_pass(ranked_list,
+                [cutoffs[i] for i in indices], shared)
+            for i, score in zip(indices, group_scores):
+                scores[i] = score
+        return scores
+
+    def _compute_cutoffs_pass(self, ranked_list, cutoffs, shared):
+        '''
+        Compute the effectiveness score at each cutoff in a single pass,
+        where the score at each cutoff is the running score of the walk
+        with the largest cutoff (see _cutoff_key).
+        '''
+        order = sorted(range(len(cutoffs)), key=lambda i: cutoffs[i])
+        scores = [None] * len(cutoffs)
+        result = 0.0
+        pos = 0
+        state = MetricState(ranked_list, cutoffs[order[-1]])
+        if self.sparse:
+            if shared is not None:
+                self._use_shared(state, shared)
+            walk = self._accumulate_sparse(state)
+            positions = state.relevant[0]
+        else:
+            walk = self._accumulate_dense(state)
+            positions = range(state.syslen)
+        for idx in positions:
+            # the state holds for the cutoffs above the next document walked
+            while pos < len(order)\
+                and cutoffs[order[pos]] < self.rank(idx):
+                scores[order[pos]] = result
+                pos += 1
+            step = next(walk, None)
+            if step is None:
+                break
+            result = step[1]
+        # the list is shorter than the remaining cutoffs
+        for i in order[pos:]:
+            scores[i] = result
+        return scores
+
+    def _accumulate_dense(self, state, start=0, result=0.0):
+        '''
+        Walk every document of the ranked list of a state from the top,
+        or resume the walk.
+
+        Args:
+            state: MetricState
+            start: the index to resume from.
+            result: the score from the top to the rank before start.
+
+        Yields:
+            A tuple of the index and the effectiveness score
+            from the top to the rank.
+        '''
+        for idx in range(start, state.syslen):
+            state.relnum += 1 if self._is_relevant(state, idx) else 0
+            if self.cumulative_gain:
+                state.cumgain += self._grade(state, idx)
+            g = self.gain(state, idx)
+            d = self.discount(state, idx)
+            result += g * d
+            yield idx, result
+            if self._stops(state, idx, g):
+                break
+
+    def _accumulate_sparse(self, state):
+        '''
+        Walk only the relevant documents of the ranked list of a state,
+        which gives the same scores as _accumulate_dense
+        for metrics whose gain() * discount() is 0 at non-relevant documents
+        (see sparse).
+
+        Yields:
+            A tuple of the index of a relevant document
+            and the effectiveness score from the top to its rank.
+        '''
+        result = 0.0
+        for idx in state.relevant[0]:
+            if state.cutoff and self.rank(idx) > state.cutoff:
+                state.stopped = True
+                break
+            state.relnum += 1
+            if self.cumulative_gain:
+                if state.cumgains is None:
+                    state.cumgain += self._grade(state, idx)
+                else:
+                    state.cumgain = state.cumgains[state.relnum - 1]
+            g = self.gain(state, idx)
+            d = self.discount(state, idx)
+            result += g * d
+            yield idx, result
+            if self._stops(state, idx, g):
+                break
+
+    def _use_shared(self, state, shared):
+        '''
+        Take the intermediates that this metric refers to
+        from those shared by the metrics of an evaluation.
+        Called only before the walk of the relevant documents.
+
+        Args:
+            state: MetricState
+            shared: pyNTCIREVAL.plan.Intermediates
+        '''
+        pass
+
+    def _stops(self, state, idx, g):
+        '''
+        Update state.reach with the gain at idx, and return True
+        if the computation stops at idx.
+        '''
+        # the rest of the list contributes little
+        if self.reach_probability:
+            state.reach *= 1.0 - g
+            if state.reach < self.epsilon:
+                state.stopped = True
+                return True
+
+        # cutoff
+        if state.cutoff and self.rank(idx) >= state.cutoff:
+            state.stopped = True
+            return True
+        return False
+
+    def _cutoff_key(self, cutoff):
+        '''
+        The key of the terms gain() * discount() at a cutoff.
+        The scores at the cutoffs with the same key are computed
+        in a single pass of compute_cutoffs, so that a metric whose discount
+        depends on the cutoff (e.g. Precision) must return a different key
+        for each of the discounts, e.g. the divisor of the discount.
+
+        Args:
+            cutoff: a cutoff value.
+        Returns:
+            A hashable key (None if the terms do not depend on the cutoff).
+        '''
+        return None
+
+    def compute_array(self, levels):
+        '''
+        Compute the effectiveness score with array operations.
+
+        Args:
+            levels: an array of relevance levels, i.e. level_array(ranked_list).
+        Returns:
+            The effectiveness score in terms of this evaluation metric.
+        '''
+        return self._array_score(levels, self.cutoff)
+
+    def _array_score(self, levels, cutoff):
+        '''
+        Compute the effectiveness score at a cutoff with array operations.
+
+        Args:
+            levels: an array of relevance levels.
+            cutoff: a cutoff value (None if not specified).
+        Returns:
+            The effectiveness score in terms of this evaluation metric.
+        '''
+        raise NotImplementedError()
+
+    def compute_array_cutoffs(self, levels, cutoffs):
+        '''
+        Compute the effectiveness score at each cutoff with array operations.
+        The cutoff of this metric is ignored.
+
+        Args:
+            levels: an array of relevance levels, i.e. level_array(ranked_list).
+            cutoffs: a list of cutoff values.
+        Returns:
+            A list of the effectiveness scores at each of the cutoffs.
+        '''
+        return [self._array_score(levels, c) for c in cutoffs]
+
+    @classmethod
+    def level_array(cls, ranked_list):
+        '''
+        Convert a ranked list into an array of relevance levels,
+        where unjudged documents are regarded as level 0.
+
+        Args:
+            ranked_list: a list of tuples of a document ID and a relevance level,
+                i.e. [(doc_id, rel_level)].
+        Returns:
+            An int array of relevance levels.
+        '''
+        import numpy as np
+        if isinstance(ranked_list, LabelledList):
+            return np.asarray(ranked_list.judged_levels(), dtype=np.int64)
+        return np.array([l if l is not None else 0 for _, l in ranked_list],
+            dtype=np.int64)
+
+    @classmethod
+    def _truncate_array(cls, levels, cutoff):
+        '''
+        Truncate an array of relevance levels at a cutoff if specified.
+
+        Args:
+            levels: an array of relevance levels.
+            cutoff: a cutoff value (None if not specified).
+        Returns:
+            The levels from the top to the cutoff.
+        '''
+        if cutoff:
+            return levels[:cutoff]
+        else:
+            return levels
+
+    @classmethod
+    def rank_array(cls, length):
+        '''
+        Ranks from 1 to length.
+
+        Args:
+            length: the length of a ranked list
+
+        Returns:
+            A float array [1.0, 2.0, ..., length].
+        '''
+        import numpy as np
+        return np.arange(1, length + 1, dtype=np.float64)
+
+    def _level(self, state, idx):
         '''
         A relevance level at idx.
 
         Args:
+            state: MetricState
             idx: an index of a ranked list
 
         Returns:
-            A relevance level at idx.
+            A relevance level at idx (0 if unjudged).
         '''
-        _, g = self.ranked_list[idx]
-        if g is None:
-            return 0.0
-        else:
-            return g
+        return state.levels[idx]
 
-    def _is_relevant(self, idx):
+    def _is_relevant(self, state, idx):
         '''
         Returns True if the document at idx is relevant,
         i.e. the relevance level > 0
 
         Args:
+            state: MetricState
             idx: an index of a ranked list
 
         Returns:
             Returns True if the document at idx is relevant,
             i.e. the relevance level > 0
         '''
-        level = self._level(idx)
-        return level > 0
+        return state.levels[idx] > 0
 
     @classmethod
     def rank(cls, idx):
@@ -87,6 +359,8 @@ class Metric(object):
             The rank of the first relevant document.
             Note is returned if no relevant document.
         '''
+        if isinstance(ranked_list, LabelledList):
+            return ranked_list.rank_stats()[0]
         for idx, (_, g) in enumerate(ranked_list):
             if g is not None and g > 0:
                 return cls.rank(idx)
@@ -104,6 +378,8 @@ class Metric(object):
             The rank of the first document with the maximum relevance.
             Note is returned if no relevant document.
         '''
+        if isinstance(ranked_list, LabelledList):
+            return ranked_list.rank_stats()[1]
         levels = [l if l is not None else 0 for _, l in ranked_list]
         maxlevel = max(levels)
         if maxlevel > 0:
@@ -119,50 +395,105 @@ class Metric(object):
         Returns:
             The name of the class with the cutoff value.
         '''
-        if self.cutoff is None:
+        return self.format_name(self.cutoff)
+
+    def format_name(self, cutoff=None):
+        '''
+        Return the name of the class with a cutoff value.
+
+        Args:
+            cutoff: a cutoff value.
+        Returns:
+            The name of the class with the cutoff value.
+        '''
+        if cutoff is None:
             return self.__class__.__name__
         else:
-            return "%s@%04d" % (self.__class__.__name__, self.cutoff)
+            return "%s@%04d" % (self.__class__.__name__, cutoff)
 
 class MetricState(object):
     '''
-    This class provides a cache mechanism for evaluation metrics.
-    Initializes the cache when it is initialized,
-    and discards the cache when it exists.
-
-    Examples:
-        with MetricState(self, ranked_list):
-            # The cache is initialized.
-            # Do something with the cache.
-        # The cache is discarded here.
+    The state of the computation of a metric for a ranked list,
+    which is passed to gain() and discount() of the metric.
+    A new state is created for each computation, so that
+    a metric object itself is not modified during the computation.
+
+    The rank statistics (first_rel_rank, first_max_rank and first_max_relnum)
+    are computed when a metric first refers to them,
+    and shared by all the metrics if the ranked list is a LabelledList.
+
+    Args:
+        ranked_list: a list of tuples of a document ID and a relevance level,
+            i.e. [(doc_id, rel_level)], or LabelledList.
+        cutoff: the computation stops at this rank if specified.
     '''
+    __slots__ = ['ranked_list', 'levels', 'relevant', 'syslen', 'cutoff',
+        'relnum', 'cumgain', 'reach', 'stopped', 'cumgains', 'blended_ratios',
+        '_rank_stats']
 
-    def __init__(self, metric, ranked_list):
-        self.metric = metric
+    def __init__(self, ranked_list, cutoff=None):
         self.ranked_list = ranked_list
+        # relevance levels where unjudged documents are regarded as level 0,
+        # and the indices and levels of the relevant documents
+        if isinstance(ranked_list, LabelledList):
+            self.levels = ranked_list.judged_levels()
+            self.relevant = ranked_list.relevant()
+        else:
+            # a list of tuples is scanned for each computation
+            # (convert it into a LabelledList to share the scan)
+            self.levels = [l if l is not None else 0 for _, l in ranked_list]
+            self.relevant = relevant_positions(self.levels)
+        self.syslen = len(self.levels)
+        self.cutoff = cutoff
+        # the number of relevant documents from the top to the current rank
+        self.relnum = 0
+        # the sum of the grades from the top to the current rank
+        self.cumgain = 0
+        # the probability that the user reaches the current rank (ERR)
+        self.reach = 1.0
+        # True if the computation stopped at the cutoff or by epsilon
+        self.stopped = False
+        # the cumulative grades and the blended ratios at the relevant documents
+        # shared by the metrics of an evaluation (see Metric._use_shared)
+        self.cumgains = None
+        self.blended_ratios = None
+        self._rank_stats = None
+
+    @property
+    def rank_stats(self):
+        '''
+        A tuple of first_rel_rank, first_max_rank and first_max_relnum
+        (see labelled_list.relevant_rank_stats).
+        '''
+        if self._rank_stats is None:
+            if isinstance(self.ranked_list, LabelledList):
+                self._rank_stats = self.ranked_list.rank_stats()
+            else:
+                self._rank_stats = relevant_rank_stats(self.relevant)
+        return self._rank_stats
+
+    @rank_stats.setter
+    def rank_stats(self, stats):
+        self._rank_stats = stats
+
+    @property
+    def first_rel_rank(self):
+        '''
+        The rank of the first relevant document (None if not found).
+        '''
+        return self.rank_stats[0]
 
-    def __enter__(self):
+    @property
+    def first_max_rank(self):
         '''
-        Initializes all the caches.
+        The rank of the first document with the maximum relevance level
+        (None if no relevant document).
         '''
-        self.metric.gains = []
-        self.metric.discounts = []
-        self.metric.relnum = 0
-        self.metric.ranked_list = self.ranked_list
-        self.metric.syslen = len(self.ranked_list)
-        self.metric.first_rel_rank =\
-            Metric.find_first_rel_rank(self.ranked_list)
-        self.metric.first_max_rank =\
-            Metric.find_first_max_rank(self.ranked_list)
+        return self.rank_stats[1]
 
-    def __exit__(self, type, value, traceback):
+    @property
+    def first_max_relnum(self):
         '''
-        Discards all the caches.
+        The number of relevant documents from the top to first_max_rank.
         '''
-        del self.metric.gains
-        del self.metric.discounts
-        del self.metric.relnum
-        del self.metric.ranked_list
-        del self.metric.syslen
-        del self.metric.first_rel_rank
-        del self.metric.first_max_rank
+        return self.rank_stats[2]
@@ -1,5 +1,5 @@
-import math
 from .normalized_metric import NormalizedMetric
+from .discount_table import get_discount_table, MS_DCG_DISCOUNT
 
 class MSnDCG(NormalizedMetric):
     '''
@@ -12,12 +12,21 @@ class MSnDCG(NormalizedMetric):
         grades: a list of the grade for each relevance level (except level 0).
         cutoff: the evaluation metric is computed for from the top to this rank if specified
     '''
+    sparse = True
+
     def __init__(self, xrelnum, grades, cutoff):
         super(MSnDCG, self).__init__(xrelnum, grades)
         self.cutoff = cutoff
+        self.discount_table = get_discount_table(MS_DCG_DISCOUNT)
+
+    def gain(self, state, idx):
+        return self._grade(state, idx)
 
-    def gain(self, idx):
-        return self._grade(idx)
+    def discount(self, state, idx):
+        return self.discount_table.get(self.rank(idx))
 
-    def discount(self, idx):
-        return 1.0 / math.log(self.rank(idx) + 1)
+    def _unnormalized_array_score(self, levels, cutoff):
+        import numpy as np
+        levels = self._truncate_array(levels, cutoff)
+        ranks = self.rank_array(len(levels))
+        return float(np.sum(self._grade_array(levels) / np.log(ranks + 1)))
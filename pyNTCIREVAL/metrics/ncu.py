@@ -1,4 +1,5 @@
 from .grade_metric import GradeMetric
+from .discount_table import get_discount_table, RANK_BIASED_STOP
 import types
 
 class NCU(GradeMetric):
@@ -13,24 +14,48 @@ class NCU(GradeMetric):
         beta: a parameter for blended ratio
         sp: a stop probability function. There are three functions in our
             implementation, uniform (p_u), graded-uniform (p_gu), rank-biased (p_rb).
+        sp.array must be its vectorized version for compute_array,
+        and sp.normaliser must return the normalising constant of the stop
+        probabilities (or None), which is computed once as sp_normaliser.
     '''
+    cumulative_gain = True
+    sparse = True
+
     def __init__(self, xrelnum, grades, beta, sp):
         super(NCU, self).__init__(xrelnum, grades)
         self.beta = beta
         self.sp = types.MethodType(sp, self)
-        self.ideal_grade_ranked_list = self._get_ideal_grade_ranked_list()
+        self.sp_array = types.MethodType(sp.array, self)
+        self.compute_sp_normaliser = types.MethodType(sp.normaliser, self)
+
+    def __getattr__(self, name):
+        '''
+        Compute the normaliser of the stop probabilities lazily
+        (see GradeMetric.__getattr__).
+        '''
+        if name == 'sp_normaliser':
+            self.sp_normaliser = self.compute_sp_normaliser()
+            return self.sp_normaliser
+        return super(NCU, self).__getattr__(name)
+
+    def invalidate_ideal(self):
+        super(NCU, self).invalidate_ideal()
+        self.__dict__.pop('sp_normaliser', None)
 
-    def gain(self, idx):
+    def gain(self, state, idx):
         '''
         Blended ratio
         '''
-        rank = self.rank(idx)
-        g = sum([self._grade(i) for i in range(rank)])
-        ig = sum(self.ideal_grade_ranked_list[:rank])
-        return (self.relnum + self.beta * g) / (rank + self.beta * ig)
+        return self._blended_ratio(state, idx)
+
+    def discount(self, state, idx):
+        return self.sp(state, idx)
 
-    def discount(self, idx):
-        return self.sp(idx)
+    def _array_score(self, levels, cutoff):
+        import numpy as np
+        levels = self._truncate_array(levels, cutoff)
+        return float(np.sum(
+            self._blended_ratio_array(levels) * self.sp_array(levels, cutoff)))
 
 def p_u():
     '''
@@ -38,16 +63,34 @@ def p_u():
     where the stop probability is the same for all the relevant documents,
     i.e. 1/(# relevant documents).
     '''
-    def func(self, idx):
-        if self._is_relevant(idx):
-            jrelnum = self.jrelnum
-            if self.cutoff:
-                jrelnum = min([jrelnum, self.cutoff])
-            return 1.0 / jrelnum
+    def func(self, state, idx):
+        if self._is_relevant(state, idx):
+            return 1.0 / p_u_jrelnum(self, state.cutoff)
         else:
             return 0.0
+    def array_func(self, levels, cutoff):
+        return (levels > 0) / float(p_u_jrelnum(self, cutoff))
+    def normaliser(self):
+        # depends on the cutoff (see p_u_jrelnum)
+        return None
+    func.array = array_func
+    func.normaliser = normaliser
     return func
 
+def p_u_jrelnum(metric, cutoff):
+    '''
+    The number of relevant documents used by the uniform stop probability,
+    which is at most the cutoff.
+
+    Args:
+        metric: a metric with p_u.
+        cutoff: a cutoff value.
+    '''
+    if cutoff:
+        return min([metric.jrelnum, cutoff])
+    else:
+        return metric.jrelnum
+
 def p_gu(stops):
     '''
     Graded-uniform stop probability function
@@ -56,14 +99,22 @@ def p_gu(stops):
     Args:
         stops: a list of the stop probability for each relevance level (except 0 level).
     '''
-    def func(self, idx):
-        level = self._level(idx)
+    def func(self, state, idx):
+        level = self._level(state, idx)
         if level > 0:
-            return stops[level-1]\
-                / sum([num * stops[l-1]
-                    for l, num in enumerate(self.xrelnum) if l > 0])
+            return stops[level-1] / self.sp_normaliser
         else:
             return 0.0
+    def array_func(self, levels, cutoff):
+        import numpy as np
+        table = np.array([0.0] + list(stops), dtype=np.float64)
+        return table[levels] / self.sp_normaliser
+    def normaliser(self):
+        # the sum of the stop values of all the relevant documents
+        return sum([num * stops[l-1]
+            for l, num in enumerate(self.xrelnum) if l > 0])
+    func.array = array_func
+    func.normaliser = normaliser
     return func
 
 def p_rb(gamma):
@@ -76,12 +127,24 @@ def p_rb(gamma):
         gamma: a parameter that controls the gain of the stop probability
             when a relevant document is observed.
     '''
-    def func(self, idx):
-        if self._is_relevant(idx):
-            return gamma ** (self.relnum - 1)\
-                / sum([gamma ** i for i in range(self.jrelnum)])
+    table = get_discount_table(RANK_BIASED_STOP, gamma)
+    def func(self, state, idx):
+        if self._is_relevant(state, idx):
+            return table.get(state.relnum) / self.sp_normaliser
         else:
             return 0.0
+    def array_func(self, levels, cutoff):
+        import numpy as np
+        rels = levels > 0
+        relnum = np.cumsum(rels)
+        return np.where(rels, gamma ** (relnum - 1.0), 0.0)\
+            / self.sp_normaliser
+    def normaliser(self):
+        # the geometric series 1 + gamma + ... + gamma^(jrelnum-1),
+        # summed term by term for the same value as the former versions
+        return sum([gamma ** i for i in range(self.jrelnum)])
+    func.array = array_func
+    func.normaliser = normaliser
     return func
 
 class NCUguP(NCU):
@@ -1,5 +1,6 @@
 import math
 from .normalized_metric import NormalizedMetric
+from .discount_table import get_discount_table, orig_dcglog, DCG_DISCOUNT
 
 class nDCG(NormalizedMetric):
     '''
@@ -13,30 +14,35 @@ class nDCG(NormalizedMetric):
         logb: the base of log used for discount.
         cutoff: the evaluation metric is computed for from the top to this rank if specified
     '''
+    sparse = True
+
     def __init__(self, xrelnum, grades, logb, cutoff):
         super(nDCG, self).__init__(xrelnum, grades)
         self.logb = logb
         self.cutoff = cutoff
+        self.discount_table = get_discount_table(DCG_DISCOUNT, logb)
+
+    def ideal_parameters(self):
+        return (self.logb,)
 
-    def gain(self, idx):
-        return self._grade(idx)
+    def gain(self, state, idx):
+        return self._grade(state, idx)
 
-    def discount(self, idx):
-        return 1.0 / self._orig_dcglog(self.rank(idx))
+    def discount(self, state, idx):
+        return self.discount_table.get(self.rank(idx))
 
     def _orig_dcglog(self, rank):
         '''
-        This is for computing the ORIGINAL dcg [Jarvelin/Kekalainen TOIS02].
-        if i == 1:
-            return 1 (i.e. no discounting)
-        if i < b:
-            return 1 (i.e. no discounting)
-        else (Discounting is applied only if i >= b. )
-            return either logb(i)
+        logb(rank) for the ORIGINAL dcg [Jarvelin/Kekalainen TOIS02],
+        or 1 if rank == 1 or rank < logb (see discount_table.orig_dcglog).
         '''
-        if rank == 1:
-            return 1.0
-        elif rank < self.logb:
-            return 1.0
-        else:
-            return math.log(rank, self.logb)
+        return orig_dcglog(rank, self.logb)
+
+    def _unnormalized_array_score(self, levels, cutoff):
+        import numpy as np
+        levels = self._truncate_array(levels, cutoff)
+        ranks = self.rank_array(len(levels))
+        logs = np.ones(len(levels))
+        discounted = (ranks > 1) & (ranks >= self.logb)
+        logs[discounted] = np.log(ranks[discounted]) / math.log(self.logb)
+        return float(np.sum(self._grade_array(levels) / logs))
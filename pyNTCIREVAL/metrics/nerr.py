@@ -1,5 +1,4 @@
 from .normalized_metric import NormalizedMetric
-import numpy as np
 
 class nERR(NormalizedMetric):
     '''
@@ -12,14 +11,30 @@ class nERR(NormalizedMetric):
         xrelnum: the number of judged X-rel docs (including 0-rel=judged nonrel).
         grades: a list of the grade for each relevance level (except level 0).
         cutoff: the evaluation metric is computed for from the top to this rank if specified
+        epsilon: stop the computation once the probability that the user
+            reaches the next rank drops below this value (0.0: never stop).
     '''
-    def __init__(self, xrelnum, grades, cutoff):
+    reach_probability = True
+    sparse = True
+
+    def __init__(self, xrelnum, grades, cutoff, epsilon=0.0):
         super(nERR, self).__init__(xrelnum, grades)
         self.cutoff = cutoff
+        self.epsilon = epsilon
+
+    def ideal_parameters(self):
+        return (self.epsilon,)
+
+    def gain(self, state, idx):
+        return self._err_grade(state, idx)
 
-    def gain(self, idx):
-        return self._err_grade(idx)
+    def discount(self, state, idx):
+        return 1.0 / self.rank(idx) * state.reach
 
-    def discount(self, idx):
-        return 1.0 / self.rank(idx)\
-            * np.prod([1.0 - r for r in self.gains])
+    def _unnormalized_array_score(self, levels, cutoff):
+        import numpy as np
+        levels = self._truncate_array(levels, cutoff)
+        g = self._grade_array(levels) / (self.maxgrade + 1.0)
+        reach = self._err_reach_array(g)
+        g = g[:len(reach)]
+        return float(np.sum(g * reach / self.rank_array(len(g))))
@@ -1,12 +1,207 @@
+from collections import OrderedDict
+import threading
 from .grade_metric import GradeMetric
+from .metric import PYTHON_BACKEND, NUMPY_BACKEND
+
+class IdealScoreCache(object):
+    '''
+    A bounded LRU cache of the scores of ideal ranked lists,
+    which depend only on the metric configuration.
+
+    Args:
+        maxsize: the maximum number of scores kept in the cache.
+    '''
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._scores = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        '''
+        Return the cached score for a key, or None if not cached.
+        '''
+        with self._lock:
+            if key in self._scores:
+                self._scores.move_to_end(key)
+                self.hits += 1
+                return self._scores[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, score):
+        '''
+        Cache a score, discarding the least recently used one if full.
+        '''
+        with self._lock:
+            self._scores[key] = score
+            self._scores.move_to_end(key)
+            while len(self._scores) > self.maxsize:
+                self._scores.popitem(last=False)
+
+    def invalidate(self, config):
+        '''
+        Discard all the scores for a metric configuration (see NormalizedMetric.ideal_config).
+        '''
+        with self._lock:
+            for key in [k for k in self._scores if k[0] == config]:
+                del self._scores[key]
+
+    def clear(self):
+        '''
+        Discard all the scores and reset the counters.
+        '''
+        with self._lock:
+            self._scores.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def cache_info(self):
+        '''
+        Return the statistics of the cache.
+
+        Returns:
+            A dict of hits, misses, maxsize and currsize.
+        '''
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses,
+                'maxsize': self.maxsize, 'currsize': len(self._scores)}
+
+    def __len__(self):
+        return len(self._scores)
 
 class NormalizedMetric(GradeMetric):
-    def compute(self, ranked_list):
-        actual = super(NormalizedMetric, self).compute(ranked_list)
-        irl = self.get_ideal_ranked_list()
-        ideal = super(NormalizedMetric, self).compute(irl)
+    '''
+    A metric class for all the metrics normalized by the score of the ideal ranked list.
+
+    The ideal scores can be given in advance as ideal_scores,
+    a dict of a cutoff value and the ideal score at the cutoff (e.g. by QrelsIndex).
+    Otherwise, they are memoized in ideal_cache, which is shared by all the instances.
+    Call invalidate_ideal() after changing xrelnum or grades.
+    '''
+    ideal_scores = None
+    ideal_cache = IdealScoreCache()
+    _ideal_config = None
+
+    def compute(self, ranked_list, backend=PYTHON_BACKEND, shared=None):
+        if backend != PYTHON_BACKEND:
+            return super(NormalizedMetric, self).compute(ranked_list, backend)
+        actual = super(NormalizedMetric, self).compute(ranked_list,
+            shared=shared)
+        ideal = self.compute_ideal()
+        return actual / ideal
+
+    def compute_cutoffs(self, ranked_list, cutoffs, backend=PYTHON_BACKEND,
+        shared=None):
+        if backend != PYTHON_BACKEND:
+            return super(NormalizedMetric, self).compute_cutoffs(
+                ranked_list, cutoffs, backend)
+        actual = super(NormalizedMetric, self).compute_cutoffs(
+            ranked_list, cutoffs, shared=shared)
+        ideal = self.compute_ideal_cutoffs(cutoffs)
+        return [a / i for a, i in zip(actual, ideal)]
+
+    def _array_score(self, levels, cutoff):
+        actual = self._unnormalized_array_score(levels, cutoff)
+        if self._has_ideal_score(cutoff):
+            return actual / self.ideal_scores[cutoff]
+        key = (self.ideal_config, NUMPY_BACKEND, cutoff)
+        ideal = self.ideal_cache.get(key)
+        if ideal is None:
+            ideal = self._unnormalized_array_score(
+                self.level_array(self.get_ideal_ranked_list()), cutoff)
+            self.ideal_cache.put(key, ideal)
         return actual / ideal
 
+    def _unnormalized_array_score(self, levels, cutoff):
+        '''
+        Compute the unnormalized score at a cutoff with array operations.
+
+        Args:
+            levels: an array of relevance levels.
+            cutoff: a cutoff value (None if not specified).
+        Returns:
+            The unnormalized score.
+        '''
+        raise NotImplementedError()
+
+    def compute_ideal(self):
+        '''
+        Compute the unnormalized score of the ideal ranked list.
+
+        Returns:
+            The unnormalized score of the ideal ranked list.
+        '''
+        return self.compute_ideal_cutoffs([self.cutoff])[0]
+
+    def compute_ideal_cutoffs(self, cutoffs):
+        '''
+        Compute the unnormalized score of the ideal ranked list at each cutoff
+        in a single pass.
+
+        Args:
+            cutoffs: a list of cutoff values.
+        Returns:
+            A list of the unnormalized scores of the ideal ranked list.
+        '''
+        scores = {}
+        for c in cutoffs:
+            if self._has_ideal_score(c):
+                scores[c] = self.ideal_scores[c]
+            elif not c in scores:
+                scores[c] = self.ideal_cache.get(
+                    (self.ideal_config, PYTHON_BACKEND, c))
+        missing = [c for c in scores if scores[c] is None]
+        if len(missing) > 0:
+            irl = self.get_ideal_ranked_list()
+            computed = {}
+            if None in missing:
+                computed[None] = super(NormalizedMetric, self).compute(irl)
+            missing = [c for c in missing if c is not None]
+            if len(missing) > 0:
+                computed.update(zip(missing, super(NormalizedMetric, self)\
+                    .compute_cutoffs(irl, missing)))
+            for c, score in computed.items():
+                scores[c] = score
+                self.ideal_cache.put(
+                    (self.ideal_config, PYTHON_BACKEND, c), score)
+        return [scores[c] for c in cutoffs]
+
+    def _has_ideal_score(self, cutoff):
+        return self.ideal_scores is not None and cutoff in self.ideal_scores
+
+    def ideal_parameters(self):
+        '''
+        Parameters other than xrelnum, grades and cutoff
+        on which the ideal score depends.
+
+        Returns:
+            A tuple of parameters.
+        '''
+        return ()
+
+    @property
+    def ideal_config(self):
+        '''
+        The metric configuration on which the ideal score depends,
+        i.e. the key of ideal_cache without the backend and cutoff.
+        Computed once until invalidate_ideal() is called.
+        '''
+        if self._ideal_config is None:
+            self._ideal_config = (self.__class__.__name__,
+                tuple(self.xrelnum), tuple(self.grades))\
+                + self.ideal_parameters()
+        return self._ideal_config
+
+    def invalidate_ideal(self):
+        super(NormalizedMetric, self).invalidate_ideal()
+        if self._ideal_config is not None:
+            self.ideal_cache.invalidate(self._ideal_config)
+        self._ideal_config = None
+        self.ideal_scores = None
+
     def get_ideal_ranked_list(self):
         result = []
         for grade, num in enumerate(self.xrelnum):
@@ -13,19 +13,32 @@ class OMeasure(GradeMetric):
         beta: a parameter for blended ratio
     '''
 
+    sparse = True
+
     def __init__(self, xrelnum, grades, beta):
         super(OMeasure, self).__init__(xrelnum, grades)
         self.beta = beta
-        self.ideal_grade_ranked_list = self._get_ideal_grade_ranked_list()
 
-    def gain(self, idx):
+    def gain(self, state, idx):
         rank = self.rank(idx)
-        g = self._grade(idx)
-        ig = sum(self.ideal_grade_ranked_list[:rank])
+        g = self._grade(state, idx)
+        ig = self._ideal_cumulative_grade(rank)
         return (1 + self.beta * g) / (rank + self.beta * ig)
 
-    def discount(self, idx):
-        if self.rank(idx) == self.first_rel_rank:
+    def discount(self, state, idx):
+        if self.rank(idx) == state.first_rel_rank:
             return 1.0
         else:
             return 0.0
+
+    def _array_score(self, levels, cutoff):
+        import numpy as np
+        levels = self._truncate_array(levels, cutoff)
+        rels = np.flatnonzero(levels > 0)
+        if len(rels) > 0:
+            rank = self.rank(rels[0])
+            g = self._grade_array(levels[rels[0]])
+            ig = self._ideal_cumulative_grade(rank)
+            return float((1 + self.beta * g) / (rank + self.beta * ig))
+        else:
+            return 0.0
@@ -13,19 +13,29 @@ class PMeasure(GradeMetric):
         beta: a parameter for blended ratio
     '''
 
+    cumulative_gain = True
+    uses_first_max_rank = True
+    sparse = True
+
     def __init__(self, xrelnum, grades, beta):
         super(PMeasure, self).__init__(xrelnum, grades)
         self.beta = beta
-        self.ideal_grade_ranked_list = self._get_ideal_grade_ranked_list()
 
-    def gain(self, idx):
-        rank = self.rank(idx)
-        g = sum([self._grade(i) for i in range(rank)])
-        ig = sum(self.ideal_grade_ranked_list[:rank])
-        return (self.relnum + self.beta * g) / (rank + self.beta * ig)
+    def gain(self, state, idx):
+        return self._blended_ratio(state, idx)
 
-    def discount(self, idx):
-        if self.rank(idx) == self.first_max_rank:
+    def discount(self, state, idx):
+        if self.rank(idx) == state.first_max_rank:
             return 1.0
         else:
             return 0.0
+
+    def _array_score(self, levels, cutoff):
+        import numpy as np
+        if len(levels) == 0 or levels.max() <= 0:
+            return 0.0
+        first_max_idx = int(np.argmax(levels))
+        levels = self._truncate_array(levels, cutoff)
+        if first_max_idx >= len(levels):
+            return 0.0
+        return float(self._blended_ratio_array(levels)[first_max_idx])
@@ -13,22 +13,30 @@ class PPlusMeasure(GradeMetric):
         beta: a parameter for blended ratio
     '''
 
+    cumulative_gain = True
+    uses_first_max_rank = True
+    sparse = True
+
     def __init__(self, xrelnum, grades, beta):
         super(PPlusMeasure, self).__init__(xrelnum, grades)
         self.beta = beta
-        self.ideal_grade_ranked_list = self._get_ideal_grade_ranked_list()
-
-    def gain(self, idx):
-        rank = self.rank(idx)
-        g = sum([self._grade(i) for i in range(rank)])
-        ig = sum(self.ideal_grade_ranked_list[:rank])
-        return (self.relnum + self.beta * g) / (rank + self.beta * ig)
-
-    def discount(self, idx):
-        if self._is_relevant(idx)\
-            and self.rank(idx) <= self.first_max_rank:
-            return 1.0 / len([i for i in range(self.first_max_rank)
-                if self._is_relevant(i)])
+
+    def gain(self, state, idx):
+        return self._blended_ratio(state, idx)
+
+    def discount(self, state, idx):
+        if self._is_relevant(state, idx)\
+            and self.rank(idx) <= state.first_max_rank:
+            return 1.0 / state.first_max_relnum
         else:
             return 0.0
 
+    def _array_score(self, levels, cutoff):
+        import numpy as np
+        if len(levels) == 0 or levels.max() <= 0:
+            return 0.0
+        first_max_idx = int(np.argmax(levels))
+        relnum = np.count_nonzero(levels[:first_max_idx+1] > 0)
+        levels = self._truncate_array(levels, cutoff)[:first_max_idx+1]
+        br = self._blended_ratio_array(levels)
+        return float(br[levels > 0].sum() / relnum)
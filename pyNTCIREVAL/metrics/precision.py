@@ -8,11 +8,22 @@ class Precision(Metric):
         cutoff: the evaluation metric is computed for from the top to this rank if specified
     '''
 
+    sparse = True
+
     def __init__(self, cutoff):
         self.cutoff = cutoff
 
-    def gain(self, idx):
-        return 1.0 if self._is_relevant(idx) else 0.0
+    def gain(self, state, idx):
+        return 1.0 if self._is_relevant(state, idx) else 0.0
+
+    def discount(self, state, idx):
+        return 1.0 / state.cutoff
+
+    def _cutoff_key(self, cutoff):
+        # the discount is 1 / cutoff
+        return cutoff
 
-    def discount(self, idx):
-        return 1.0 / self.cutoff
+    def _array_score(self, levels, cutoff):
+        import numpy as np
+        levels = self._truncate_array(levels, cutoff)
+        return float(np.count_nonzero(levels > 0)) / cutoff
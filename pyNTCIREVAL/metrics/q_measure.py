@@ -1,4 +1,4 @@
-from .ncu import NCU, p_u
+from .ncu import NCU, p_u, p_u_jrelnum
 
 class QMeasure(NCU):
     '''
@@ -15,3 +15,7 @@ class QMeasure(NCU):
     def __init__(self, xrelnum, grades, beta, cutoff=None):
         super(QMeasure, self).__init__(xrelnum, grades, beta, p_u())
         self.cutoff = cutoff
+
+    def _cutoff_key(self, cutoff):
+        # the stop probability is 1 / p_u_jrelnum
+        return p_u_jrelnum(self, cutoff)
@@ -1,4 +1,5 @@
 from .grade_metric import GradeMetric
+from .discount_table import get_discount_table, RBP_DISCOUNT
 
 class RBP(GradeMetric):
     '''
@@ -12,12 +13,22 @@ class RBP(GradeMetric):
         pr: persistence parameter
     '''
 
+    sparse = True
+
     def __init__(self, xrelnum, grades, pr):
         super(RBP, self).__init__(xrelnum, grades)
         self.pr = pr
+        self.discount_table = get_discount_table(RBP_DISCOUNT, pr)
+
+    def gain(self, state, idx):
+        return self._rbp_grade(state, idx)
 
-    def gain(self, idx):
-        return self._rbp_grade(idx)
+    def discount(self, state, idx):
+        return self.discount_table.get(self.rank(idx))
 
-    def discount(self, idx):
-        return (1 - self.pr) * self.pr ** (self.rank(idx) - 1)
+    def _array_score(self, levels, cutoff):
+        import numpy as np
+        levels = self._truncate_array(levels, cutoff)
+        g = self._grade_array(levels) / self.maxgrade
+        ranks = self.rank_array(len(levels))
+        return float(np.sum(g * (1 - self.pr) * self.pr ** (ranks - 1)))
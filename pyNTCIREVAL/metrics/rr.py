@@ -4,11 +4,22 @@ class RR(Metric):
     '''
     Reciprocal rank
     '''
-    def gain(self, idx):
+    sparse = True
+
+    def gain(self, state, idx):
         return 1.0 / self.rank(idx)
 
-    def discount(self, idx):
-        if self.rank(idx) == self.first_rel_rank:
+    def discount(self, state, idx):
+        if self.rank(idx) == state.first_rel_rank:
             return 1.0
         else:
             return 0.0
+
+    def _array_score(self, levels, cutoff):
+        import numpy as np
+        levels = self._truncate_array(levels, cutoff)
+        rels = np.flatnonzero(levels > 0)
+        if len(rels) > 0:
+            return 1.0 / self.rank(rels[0])
+        else:
+            return 0.0
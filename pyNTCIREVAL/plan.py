@@ -0,0 +1,187 @@
+from .labelled_list import LabelledList
+from .metrics import Metric, MetricState, PYTHON_BACKEND, NUMPY_BACKEND
+from .metrics.grade_metric import GradeMetric
+
+class EvaluationPlan(object):
+    '''
+    A set of metrics compiled into a single evaluation of a ranked list,
+    which computes the intermediates shared by the metrics only once.
+
+    On compilation, the metrics with the same xrelnum and grades are given
+    a single ideal ranked list of grades and its prefix sums, and
+    the metrics sharing the cumulative grades and the blended ratio
+    (i.e. with the same grades, beta and ideal ranked list) are grouped.
+    For each ranked list, the level array (NUMPY_BACKEND) or
+    the intermediates at the relevant documents (see Intermediates)
+    are computed once, and every metric is computed from them.
+
+    A plan keeps no state of a ranked list, so that it can be reused
+    for any number of ranked lists of a topic and shared by threads.
+
+    Args:
+        metrics: a list of metrics computed at their own cutoffs.
+        cutoff_metrics: a list of metrics computed at each of the cutoffs.
+        cutoffs: a list of cutoff values.
+        backend: PYTHON_BACKEND or NUMPY_BACKEND.
+    '''
+
+    def __init__(self, metrics, cutoff_metrics=(), cutoffs=(),
+        backend=PYTHON_BACKEND):
+        self.metrics = list(metrics)
+        self.cutoff_metrics = list(cutoff_metrics)
+        self.cutoffs = list(cutoffs)
+        self.backend = backend
+        self.keys = {}
+        self._compile()
+
+    def _compile(self):
+        ideals = {}
+        for metric in self.metrics + self.cutoff_metrics:
+            if not isinstance(metric, GradeMetric):
+                continue
+            ideal_key = (tuple(metric.xrelnum), tuple(metric.grades))
+            if ideal_key in ideals:
+                metric.ideal_grade_ranked_list, \
+                    metric.ideal_grade_prefix_sums = ideals[ideal_key]
+            else:
+                ideals[ideal_key] = (metric.ideal_grade_ranked_list,
+                    metric.ideal_grade_prefix_sums)
+            if metric.sparse and metric.cumulative_gain:
+                # the cumulative grades depend only on the grades,
+                # while the blended ratio depends on beta and the ideal list
+                self.keys[id(metric)] = (ideal_key[1],
+                    (metric.beta,) + ideal_key)
+
+    def evaluate(self, sysdoclab, measure=None):
+        '''
+        Compute all the metrics for a labelled ranked list.
+
+        Args:
+            sysdoclab: a ranked list of tuples of a document ID and a relevance level,
+                or LabelledList.
+            measure: a function of a metric and a cutoff (None for the metrics)
+                that returns a context manager measuring the computation
+                (see Evaluator), or None. With measure, each cutoff of
+                the cutoff metrics is computed and measured separately,
+                which gives the same scores as the single pass.
+
+        Returns:
+            A list of tuples of a metric name and its score:
+            the scores of the metrics, followed by
+            those of the cutoff metrics at each of the cutoffs.
+        '''
+        if not isinstance(sysdoclab, LabelledList):
+            sysdoclab = LabelledList.from_pairs(sysdoclab, keep_ids=False)
+        # the cutoffs are computed in a single pass unless measured
+        single_pass = measure is None
+        if measure is None:
+            measure = _no_measure
+        results = []
+        levels, shared = None, None
+        if self.backend == NUMPY_BACKEND:
+            levels = Metric.level_array(sysdoclab)
+        else:
+            shared = Intermediates(sysdoclab, self.keys)
+        for metric in self.metrics:
+            with measure(metric):
+                if self.backend == NUMPY_BACKEND:
+                    score = metric.compute_array(levels)
+                else:
+                    score = metric.compute(sysdoclab, self.backend,
+                        shared=shared)
+            results.append((str(metric), score))
+        cutoff_scores = []
+        for metric in self.cutoff_metrics:
+            if single_pass:
+                scores = self._compute_cutoffs(metric, sysdoclab, levels,
+                    shared, self.cutoffs)
+            else:
+                scores = []
+                for cutoff in self.cutoffs:
+                    with measure(metric, cutoff):
+                        scores += self._compute_cutoffs(metric, sysdoclab,
+                            levels, shared, [cutoff])
+            cutoff_scores.append(scores)
+        for i, cutoff in enumerate(self.cutoffs):
+            for metric, scores in zip(self.cutoff_metrics, cutoff_scores):
+                results.append((metric.format_name(cutoff), scores[i]))
+        return results
+
+    def _compute_cutoffs(self, metric, sysdoclab, levels, shared, cutoffs):
+        if self.backend == NUMPY_BACKEND:
+            return metric.compute_array_cutoffs(levels, cutoffs)
+        return metric.compute_cutoffs(sysdoclab, cutoffs, self.backend,
+            shared=shared)
+
+class Intermediates(object):
+    '''
+    The intermediates of a ranked list shared by the metrics of a plan,
+    each of which is computed when a metric first refers to it:
+    the cumulative grade and the blended ratio at each relevant document.
+    The i-th value is that at the i-th relevant document,
+    i.e. where state.relnum == i + 1 in the walk of the relevant documents
+    (see Metric.sparse). The values are computed by the metric itself,
+    so that they are the same as those computed in its walk.
+
+    Args:
+        ranked_list: LabelledList
+        keys: a dict of id(metric) and a tuple of the keys of
+            its cumulative grades and blended ratio (see EvaluationPlan).
+    '''
+
+    def __init__(self, ranked_list, keys):
+        self.ranked_list = ranked_list
+        self.keys = keys
+        self._cumgains = {}
+        self._blended_ratios = {}
+
+    def cumgains(self, metric):
+        '''
+        The cumulative grades of a metric at the relevant documents
+        (None if not shared by the plan).
+        '''
+        if not id(metric) in self.keys:
+            return None
+        key = self.keys[id(metric)][0]
+        if not key in self._cumgains:
+            state = MetricState(self.ranked_list)
+            values = []
+            for idx in state.relevant[0]:
+                state.cumgain += metric._grade(state, idx)
+                values.append(state.cumgain)
+            self._cumgains[key] = values
+        return self._cumgains[key]
+
+    def blended_ratios(self, metric):
+        '''
+        The blended ratios of a metric at the relevant documents
+        (None if not shared by the plan).
+        '''
+        if not id(metric) in self.keys:
+            return None
+        key = self.keys[id(metric)][1]
+        if not key in self._blended_ratios:
+            cumgains = self.cumgains(metric)
+            state = MetricState(self.ranked_list)
+            values = []
+            for i, idx in enumerate(state.relevant[0]):
+                state.relnum = i + 1
+                state.cumgain = cumgains[i]
+                values.append(metric._blended_ratio(state, idx))
+            self._blended_ratios[key] = values
+        return self._blended_ratios[key]
+
+class _NoMeasure(object):
+    '''
+    A context manager that does nothing, used without a profiler.
+    '''
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+_NO_MEASURE = _NoMeasure()
+
+def _no_measure(metric, cutoff=None):
+    return _NO_MEASURE
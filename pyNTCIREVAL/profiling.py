@@ -0,0 +1,153 @@
+import json
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+class Profiler(object):
+    '''
+    Opt-in instrumentation of the evaluation, which records
+    the wall time of stages (e.g. parsing and labelling) and, for each metric,
+    the wall time, the number of gain() and discount() calls,
+    and the time to compute the ideal ranked list and its score.
+
+    Metrics are instrumented by instrument(), which wraps their methods
+    on the instance, so that metrics without a profiler are not affected.
+    A metric computed at several cutoffs has a record for each cutoff.
+    The gain() and discount() calls for the ideal ranked list
+    are counted as a part of the ideal computation.
+    '''
+
+    # methods that compute the ideal ranked list or its score
+    IDEAL_METHODS = ['compute_ideal_cutoffs', 'get_ideal_ranked_list',
+        '_get_ideal_grade_ranked_list', '_get_ideal_grade_prefix_sums']
+
+    def __init__(self):
+        self.stages = OrderedDict()
+        self.records = []
+        # the record being measured, to which the calls are counted
+        self._current = None
+
+    @contextmanager
+    def stage(self, name):
+        '''
+        Measure the wall time of a stage. The time is added up by name.
+
+        Args:
+            name: the name of the stage.
+        '''
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0)\
+                + time.perf_counter() - start
+
+    def instrument(self, metric, cutoffs=None):
+        '''
+        Wrap gain(), discount() and the ideal computation of a metric
+        to count the calls and measure the time.
+
+        Args:
+            metric: Metric
+            cutoffs: the cutoffs at which the metric is computed,
+                or None if the cutoff of the metric is used.
+
+        Returns:
+            A list of the records of the metric, one for each cutoff.
+        '''
+        records = [OrderedDict([
+            ('metric', metric.__class__.__name__),
+            ('cutoff', cutoff),
+            ('time', 0.0), ('calls', 0), ('gain_calls', 0),
+            ('discount_calls', 0), ('ideal_time', 0.0),
+            ('ideal_gain_calls', 0), ('ideal_discount_calls', 0),
+        ]) for cutoff in (cutoffs if cutoffs is not None else [metric.cutoff])]
+        # the depth of the nested ideal computation
+        ideal = [0]
+        profiler = self
+
+        def counter(func, name):
+            def wrapper(*args, **kwargs):
+                record = profiler._current
+                if record is not None:
+                    if ideal[0] > 0:
+                        record['ideal_' + name] += 1
+                    else:
+                        record[name] += 1
+                return func(*args, **kwargs)
+            return wrapper
+
+        def timer(func):
+            def wrapper(*args, **kwargs):
+                ideal[0] += 1
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    ideal[0] -= 1
+                    record = profiler._current
+                    if ideal[0] == 0 and record is not None:
+                        record['ideal_time'] += time.perf_counter() - start
+            return wrapper
+
+        metric.gain = counter(metric.gain, 'gain_calls')
+        metric.discount = counter(metric.discount, 'discount_calls')
+        for name in self.IDEAL_METHODS:
+            if hasattr(metric.__class__, name):
+                setattr(metric, name, timer(getattr(metric, name)))
+        self.records.extend(records)
+        return records
+
+    @contextmanager
+    def measure(self, record):
+        '''
+        Measure the wall time of a computation of an instrumented metric,
+        and count its calls to the record.
+
+        Args:
+            record: a dict returned by instrument().
+        '''
+        self._current = record
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            record['time'] += time.perf_counter() - start
+            record['calls'] += 1
+            self._current = None
+
+    def report(self):
+        '''
+        Return the recorded data.
+
+        Returns:
+            A dict of 'stages' (a dict of a stage name and its wall time)
+            and 'metrics' (a list of the records of the metrics).
+        '''
+        return OrderedDict([('stages', self.stages),
+            ('metrics', self.records)])
+
+    def to_json(self):
+        '''
+        Return the recorded data as a single-line JSON string.
+        '''
+        return json.dumps(self.report())
+
+    def log(self, logger, prefix=''):
+        '''
+        Output the recorded data through a logger at DEBUG level.
+
+        Args:
+            logger: logging.Logger
+            prefix: prefix string for each line.
+        '''
+        for name, sec in self.stages.items():
+            logger.debug("%s # Time %s\t%.6f s" % (prefix, name, sec))
+        for r in self.records:
+            name = r['metric']\
+                + ('@%s' % r['cutoff'] if r['cutoff'] is not None else '')
+            logger.debug(("%s # Time %s\t%.6f s, gain=%d, discount=%d, "
+                + "ideal %.6f s (gain=%d, discount=%d)")
+                % (prefix, name, r['time'], r['gain_calls'],
+                    r['discount_calls'], r['ideal_time'],
+                    r['ideal_gain_calls'], r['ideal_discount_calls']))
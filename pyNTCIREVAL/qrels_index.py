@@ -0,0 +1,137 @@
+from collections import OrderedDict
+
+from .labeler import Labeler
+
+MAGIC = b'pyNTCIREVAL-qrels-index\n'
+VERSION = 1
+
+class QrelsIndex(object):
+    '''
+    A compiled multi-topic qrels, which keeps for each topic
+    a dict of a document ID and a relevance level, xrelnum and jrelnum,
+    and the precomputed ideal ranked list of grades and ideal scores
+    (nDCG, MSnDCG and nERR) for each grade configuration.
+
+    An index is saved as a binary file with save() and read with load(),
+    so that evaluating many runs against the same qrels
+    skips parsing the rel file and computing the ideal lists.
+    Note that an index file is a pickle, and must not be loaded
+    from untrusted sources.
+
+    Args:
+        qrels: a dict of a topic ID and a dict of a document ID and a relevance level.
+    '''
+    def __init__(self, qrels):
+        self.topics = OrderedDict()
+        for topic, topic_qrels in qrels.items():
+            labeler = Labeler(topic_qrels)
+            maxlevel = max(topic_qrels.values()) if len(topic_qrels) > 0 else 0
+            self.topics[topic] = {
+                'qrels': dict(topic_qrels),
+                'xrelnum': labeler.compute_per_level_doc_num(maxlevel + 1),
+                'jrelnum': labeler.compute_rel_num(),
+            }
+        self.precomputed = {}
+
+    def get_xrelnum(self, topic, rel_level_num):
+        '''
+        Return the number of judged X-rel docs (including 0-rel=judged nonrel).
+
+        Args:
+            topic: a topic ID.
+            rel_level_num: the number of relevance levels
+
+        Returns:
+            The number of judged X-rel docs (including 0-rel=judged nonrel)
+        '''
+        xrelnum = self.topics[topic]['xrelnum']
+        if len(xrelnum) > rel_level_num:
+            raise Exception(
+                "Topic %s has a relevance level higher than the grades" % topic)
+        return xrelnum + [0] * (rel_level_num - len(xrelnum))
+
+    def precompute(self, grades, logb, cutoffs):
+        '''
+        Precompute the ideal ranked list of grades and the ideal scores
+        for a grade configuration.
+        The ideal list does not depend on beta, so beta is not a part of the key.
+
+        Args:
+            grades: a list of the grade for each relevance level (except level 0).
+            logb: log base for DCG.
+            cutoffs: a list of cutoff values.
+        '''
+        from .metrics import nDCG, MSnDCG, nERR
+        key = self._key(grades, logb)
+        precomputed = self.precomputed.setdefault(key, {})
+        cutoffs = sorted(set(cutoffs))
+        for topic in self.topics:
+            if self.topics[topic]['jrelnum'] == 0:
+                continue
+            xrelnum = self.get_xrelnum(topic, len(grades) + 1)
+            metrics = [nDCG(xrelnum, grades, logb, None),
+                MSnDCG(xrelnum, grades, None), nERR(xrelnum, grades, None)]
+            entry = precomputed.setdefault(topic, {
+                'ideal_grade_ranked_list': metrics[0].ideal_grade_ranked_list,
+                'ideal_grade_prefix_sums': metrics[0].ideal_grade_prefix_sums,
+                'ideal_scores': {},
+            })
+            for metric in metrics:
+                ideal_scores = entry['ideal_scores'].setdefault(str(metric), {})
+                ideal_scores.update(zip(cutoffs,
+                    metric.compute_ideal_cutoffs(cutoffs)))
+
+    def get_precomputed(self, topic, grades, logb):
+        '''
+        Return the precomputation for a topic and a grade configuration.
+
+        Args:
+            topic: a topic ID.
+            grades: a list of the grade for each relevance level (except level 0).
+            logb: log base for DCG.
+
+        Returns:
+            A dict with 'ideal_grade_ranked_list', 'ideal_grade_prefix_sums'
+            and 'ideal_scores' (a dict of a metric name and
+            a dict of a cutoff value and the ideal score),
+            or None if it has not been precomputed.
+        '''
+        return self.precomputed.get(self._key(grades, logb), {}).get(topic)
+
+    def save(self, f):
+        '''
+        Write the index to a binary file stream.
+
+        Args:
+            f: binary file stream
+        '''
+        import pickle
+        f.write(MAGIC)
+        pickle.dump((VERSION, self.topics, self.precomputed), f,
+            protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, f):
+        '''
+        Read an index from a binary file stream.
+
+        Args:
+            f: binary file stream
+
+        Returns:
+            QrelsIndex
+        '''
+        import pickle
+        if f.read(len(MAGIC)) != MAGIC:
+            raise Exception("Not a compiled qrels index")
+        version, topics, precomputed = pickle.load(f)
+        if version != VERSION:
+            raise Exception(
+                "Unsupported qrels index version: %s" % version)
+        result = cls({})
+        result.topics = topics
+        result.precomputed = precomputed
+        return result
+
+    def _key(self, grades, logb):
+        return (tuple(grades), float(logb))
@@ -0,0 +1,147 @@
+import json
+import os
+from collections import OrderedDict
+
+FORMAT = 'pyNTCIREVAL-score-store'
+VERSION = 1
+SCORES_FILE = 'scores.npy'
+INDEX_FILE = 'index.json'
+
+class ScoreStore(object):
+    '''
+    A columnar store of the scores of many runs, which keeps
+    a run x topic x metric matrix of float64 in a .npy file
+    and the names of the runs, topics and metrics in a JSON file
+    in a directory. Scores not computed (e.g. a topic missing from a run) are NaN.
+
+    The matrix is opened with numpy.memmap, so that
+    only the slices being used are read from the disk.
+
+    Args:
+        path: the directory of the store written by ScoreStore.write().
+        mmap: if False, read the whole matrix into memory.
+    '''
+
+    def __init__(self, path, mmap=True):
+        import numpy as np
+        with open(os.path.join(path, INDEX_FILE)) as f:
+            index = json.load(f)
+        if index.get('format') != FORMAT:
+            raise ValueError("Not a score store: %s" % path)
+        if index.get('version') != VERSION:
+            raise ValueError("Unsupported score store version: %s"
+                % index.get('version'))
+        self.path = path
+        self.runs = index['runs']
+        self.topics = index['topics']
+        self.metrics = index['metrics']
+        self._run_pos = {r: i for i, r in enumerate(self.runs)}
+        self._topic_pos = {t: i for i, t in enumerate(self.topics)}
+        self._metric_pos = {m: i for i, m in enumerate(self.metrics)}
+        self.scores = np.load(os.path.join(path, SCORES_FILE),
+            mmap_mode='r' if mmap else None)
+        if self.scores.shape != (len(self.runs), len(self.topics),
+            len(self.metrics)):
+            raise ValueError("The shape of the scores does not match the index")
+
+    @classmethod
+    def write(cls, path, run_results):
+        '''
+        Write the scores of runs into a directory (created if not exists).
+
+        Args:
+            path: the directory of the store.
+            run_results: a dict of a run name and a dict of a topic ID and a list of
+                tuples of a metric name and its score, e.g. the output of evaluate_runs.
+
+        Returns:
+            ScoreStore of the written directory.
+        '''
+        import numpy as np
+        runs = list(run_results)
+        topics = OrderedDict()
+        metrics = OrderedDict()
+        for topic_results in run_results.values():
+            for topic, results in topic_results.items():
+                topics.setdefault(topic, len(topics))
+                for name, _ in results:
+                    metrics.setdefault(name, len(metrics))
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        scores = np.lib.format.open_memmap(os.path.join(path, SCORES_FILE),
+            mode='w+', dtype=np.float64,
+            shape=(len(runs), len(topics), len(metrics)))
+        scores[:] = np.nan
+        for i, topic_results in enumerate(run_results.values()):
+            for topic, results in topic_results.items():
+                row = scores[i, topics[topic]]
+                for name, score in results:
+                    row[metrics[name]] = score
+        scores.flush()
+        del scores
+        # the index is written last, so that a store without it is incomplete
+        with open(os.path.join(path, INDEX_FILE), 'w') as f:
+            json.dump(OrderedDict([('format', FORMAT), ('version', VERSION),
+                ('runs', runs), ('topics', list(topics)),
+                ('metrics', list(metrics))]), f)
+        return cls(path)
+
+    def get(self, run=None, topic=None, metric=None):
+        '''
+        Return a slice of the scores. A dimension not specified is kept whole.
+
+        Args:
+            run: a run name.
+            topic: a topic ID.
+            metric: a metric name.
+
+        Returns:
+            An array of the scores (a float if all are specified).
+        '''
+        key = (self._pos(self._run_pos, run, 'run'),
+            self._pos(self._topic_pos, topic, 'topic'),
+            self._pos(self._metric_pos, metric, 'metric'))
+        return self.scores[key]
+
+    def mean_scores(self, run):
+        '''
+        Average the scores of a run over the topics evaluated for the run.
+
+        Args:
+            run: a run name.
+
+        Returns:
+            A list of tuples of a metric name and its mean score.
+        '''
+        import numpy as np
+        scores = self.get(run=run)
+        evaluated = ~np.isnan(scores).all(axis=1)
+        means = scores[evaluated].mean(axis=0) if evaluated.any()\
+            else [np.nan] * len(self.metrics)
+        return [(m, float(s)) for m, s in zip(self.metrics, means)]
+
+    def score_matrix(self, metric):
+        '''
+        Return the scores of a metric for the topics evaluated for all the runs
+        (see significance.score_matrix).
+
+        Returns:
+            A tuple of a list of the run names, a list of the topic IDs,
+            and an array of the scores (runs x topics).
+        '''
+        import numpy as np
+        if len(self.runs) == 0:
+            raise ValueError("No run to test")
+        scores = self.get(metric=metric)
+        evaluated = ~np.isnan(scores).any(axis=0)
+        if not evaluated.any():
+            raise ValueError("No topic evaluated for all the runs")
+        topics = [t for t, e in zip(self.topics, evaluated) if e]
+        return list(self.runs), topics, np.array(scores[:, evaluated])
+
+    def _pos(self, positions, key, name):
+        if key is None:
+            return slice(None)
+        if not key in positions:
+            raise ValueError("Unknown %s: %s" % (name, key))
+        return positions[key]
@@ -0,0 +1,232 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+from itertools import islice
+
+from .evaluator import TopicEvaluators
+
+# the operations of requests
+OPS = ['label', 'compute']
+
+class EvaluationServer(object):
+    '''
+    A long-running evaluator that keeps the qrels of all the topics
+    as Labeler objects and an Evaluator for each topic (see TopicEvaluators),
+    and answers JSON-lines requests.
+
+    Request (one JSON object per line):
+        {"id": <any>, "op": "label", "topic": <topic ID>, "docs": [<doc ID>, ...],
+            "truncate": <rank (optional)>}
+        {"id": <any>, "op": "compute", "topic": <topic ID>, "docs": [<doc ID>, ...]}
+        {"id": <any>, "op": "compute", "topic": <topic ID>,
+            "labelled": [[<doc ID>, <level or null>], ...]}
+    Response (one JSON object per line, with the id of the request):
+        {"id": <any>, "labelled": [[<doc ID>, <level or null>], ...]}
+        {"id": <any>, "scores": {<metric name>: <score>, ...}}
+        {"id": <any>, "error": <message>}
+
+    With more than one worker, requests are processed concurrently
+    and the responses are written in the order of completion.
+    At most queue_size requests are pending, and the input is not read
+    while the queue is full.
+
+    Args:
+        qrels: a dict of a topic ID and a dict of a document ID and a relevance level,
+            or a QrelsIndex.
+        grades: a list of the grade for each relevance level (except level 0).
+        is_condensed: if True, treat the input as a condensed list (unjudged docs removed)
+        workers: the number of worker threads.
+        queue_size: the maximum number of pending requests.
+        kwargs: the other parameters of Evaluator.
+    '''
+
+    def __init__(self, qrels, grades, is_condensed=False, workers=1,
+        queue_size=64, **kwargs):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.topics = TopicEvaluators(qrels, grades, is_condensed, **kwargs)
+
+    def handle(self, request):
+        '''
+        Answer a request.
+
+        Args:
+            request: a dict of a request.
+
+        Returns:
+            A dict of the response.
+        '''
+        response = OrderedDict([('id', request.get('id'))])
+        try:
+            op = request.get('op')
+            if not op in OPS:
+                raise ValueError("Unknown op: %s" % op)
+            topic = request.get('topic')
+            labeler = self.topics.get_labeler(topic)
+            if op == 'label':
+                labelled = labeler.iter_label(request['docs'])
+                if request.get('truncate') is not None:
+                    labelled = islice(labelled, int(request['truncate']))
+                response['labelled'] = [list(d) for d in labelled]
+            else:
+                if 'labelled' in request:
+                    sysdoclab = self._read_labelled(request['labelled'])
+                else:
+                    sysdoclab = labeler.label(request['docs'])
+                response['scores'] = OrderedDict(
+                    self.topics.get_evaluator(topic).evaluate(sysdoclab))
+        except Exception as e:
+            response['error'] = str(e)
+        return response
+
+    def _read_labelled(self, labelled):
+        '''
+        Validate a labelled ranked list of a request.
+
+        Args:
+            labelled: a list of pairs of a document ID and a relevance level.
+
+        Returns:
+            A list of tuples of a document ID and a relevance level.
+        '''
+        maxlevel = len(self.topics.grades)
+        result = []
+        for rank, d in enumerate(labelled, 1):
+            if not isinstance(d, (list, tuple)) or len(d) != 2:
+                raise ValueError(
+                    "Invalid labelled document at rank %d: %s" % (rank, d))
+            level = d[1]
+            if level is not None and (not isinstance(level, int)
+                or isinstance(level, bool) or level < 0 or level > maxlevel):
+                raise ValueError(
+                    "Invalid relevance level at rank %d: %s" % (rank, level)
+                    + " (must be null or an integer from 0 to %d)" % maxlevel)
+            result.append(tuple(d))
+        return result
+
+    def handle_line(self, line):
+        '''
+        Answer a request in a JSON line.
+
+        Args:
+            line: a JSON string of a request.
+
+        Returns:
+            A JSON string of the response.
+        '''
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("A request must be a JSON object")
+        except ValueError as e:
+            return json.dumps(OrderedDict([('id', None), ('error', str(e))]))
+        return json.dumps(self.handle(request))
+
+    def serve_stream(self, infile, outfile):
+        '''
+        Answer the requests from a text stream until its end.
+
+        Args:
+            infile: text stream of requests.
+            outfile: text stream of responses.
+        '''
+        if self.workers <= 1:
+            for line in infile:
+                if len(line.strip()) > 0:
+                    outfile.write(self.handle_line(line) + "\n")
+                    outfile.flush()
+            return
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            self._serve(infile, outfile, executor,
+                threading.BoundedSemaphore(self.queue_size))
+
+    def serve_unix(self, path):
+        '''
+        Answer the requests from the connections to a Unix socket,
+        each of which is a JSON-lines stream. Runs until interrupted.
+        A socket left at the path by a server that is no longer running
+        is removed before binding, and the socket is removed on shutdown.
+
+        Args:
+            path: the path of the Unix socket.
+        '''
+        import io
+        import socketserver
+        from concurrent.futures import ThreadPoolExecutor
+        _remove_stale_socket(path)
+        server = self
+        executor = ThreadPoolExecutor(max_workers=max(1, self.workers))
+        slots = threading.BoundedSemaphore(self.queue_size)
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                infile = io.TextIOWrapper(self.rfile, encoding='utf-8')
+                outfile = io.TextIOWrapper(self.wfile, encoding='utf-8',
+                    write_through=True)
+                server._serve(infile, outfile, executor, slots)
+
+        try:
+            with socketserver.ThreadingUnixStreamServer(path, Handler)\
+                as unix_server:
+                try:
+                    unix_server.serve_forever()
+                finally:
+                    os.unlink(path)
+        finally:
+            executor.shutdown(wait=True)
+
+    def _serve(self, infile, outfile, executor, slots):
+        '''
+        Submit the requests from a stream to an executor.
+        Blocks reading while all the slots are used (backpressure),
+        and returns after all the requests are answered.
+        '''
+        lock = threading.Lock()
+        done = threading.Condition(lock)
+        pending = [0]
+
+        def respond(line):
+            try:
+                response = self.handle_line(line)
+                with lock:
+                    outfile.write(response + "\n")
+                    outfile.flush()
+            finally:
+                slots.release()
+                with lock:
+                    pending[0] -= 1
+                    done.notify_all()
+
+        for line in infile:
+            if len(line.strip()) == 0:
+                continue
+            slots.acquire()
+            with lock:
+                pending[0] += 1
+            executor.submit(respond, line)
+        with lock:
+            while pending[0] > 0:
+                done.wait()
+
+def _remove_stale_socket(path):
+    '''
+    Remove a Unix socket at a path if no server is listening on it.
+    Raises an error if a server is listening or the path is not a socket.
+    '''
+    import socket
+    import stat
+    if not os.path.exists(path):
+        return
+    if not stat.S_ISSOCK(os.stat(path).st_mode):
+        raise ValueError("%s exists and is not a socket" % path)
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.connect(path)
+    except (ConnectionRefusedError, FileNotFoundError):
+        os.unlink(path)
+        return
+    finally:
+        client.close()
+    raise ValueError("%s is used by a running server" % path)
@@ -0,0 +1,267 @@
+import math
+from collections import OrderedDict
+from itertools import combinations
+
+import numpy as np
+
+T_TEST = 'ttest'
+RANDOMIZATION_TEST = 'randomization'
+BOOTSTRAP_TEST = 'bootstrap'
+TUKEY_HSD_TEST = 'tukey'
+TESTS = [T_TEST, RANDOMIZATION_TEST, BOOTSTRAP_TEST, TUKEY_HSD_TEST]
+
+# the maximum number of elements of a resampled matrix kept in memory at once
+CHUNK_ELEMENTS = 1 << 22
+# the tolerance for regarding a resampled statistic as extreme as the observed one
+TOLERANCE = 1e-10
+
+def score_matrix(run_results, metric):
+    '''
+    Arrange the per-topic scores of a metric into a matrix.
+
+    Args:
+        run_results: a dict of a run name and a dict of a topic ID and a list of
+            tuples of a metric name and its score, e.g. the output of evaluate_runs,
+            or a ScoreStore.
+        metric: a metric name, e.g. 'nDCG@10'.
+
+    Returns:
+        A tuple of a list of the run names, a list of the topic IDs evaluated
+        for all the runs, and an array of the scores (runs x topics).
+    '''
+    from .score_store import ScoreStore
+    if isinstance(run_results, ScoreStore):
+        return run_results.score_matrix(metric)
+    names = list(run_results)
+    if len(names) == 0:
+        raise ValueError("No run to test")
+    topics = [t for t in run_results[names[0]]
+        if all([t in run_results[name] for name in names])]
+    if len(topics) == 0:
+        raise ValueError("No topic evaluated for all the runs")
+    matrix = np.empty((len(names), len(topics)), dtype=np.float64)
+    for i, name in enumerate(names):
+        for j, topic in enumerate(topics):
+            scores = dict(run_results[name][topic])
+            if not metric in scores:
+                raise ValueError("Unknown metric: %s" % metric)
+            matrix[i, j] = scores[metric]
+    return names, topics, matrix
+
+def betainc(a, b, x):
+    '''
+    The regularized incomplete beta function I_x(a, b),
+    evaluated by the continued fraction (Numerical Recipes, 6.4).
+    '''
+    if x <= 0.0:
+        return 0.0
+    if x >= 1.0:
+        return 1.0
+    front = math.exp(math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b)
+        + a * math.log(x) + b * math.log(1.0 - x))
+    if x < (a + 1.0) / (a + b + 2.0):
+        return front * _betacf(a, b, x) / a
+    return 1.0 - front * _betacf(b, a, 1.0 - x) / b
+
+def _betacf(a, b, x, maxit=300, eps=3e-16, fpmin=1e-300):
+    qab = a + b
+    qap = a + 1.0
+    qam = a - 1.0
+    c = 1.0
+    d = 1.0 - qab * x / qap
+    d = 1.0 / (d if abs(d) >= fpmin else fpmin)
+    h = d
+    for m in range(1, maxit + 1):
+        m2 = 2 * m
+        for aa in (m * (b - m) * x / ((qam + m2) * (a + m2)),
+            -(a + m) * (qab + m) * x / ((a + m2) * (qap + m2))):
+            d = 1.0 + aa * d
+            d = 1.0 / (d if abs(d) >= fpmin else fpmin)
+            c = 1.0 + aa / c
+            c = c if abs(c) >= fpmin else fpmin
+            h *= d * c
+        if abs(d * c - 1.0) < eps:
+            break
+    return h
+
+def paired_t_test(x, y):
+    '''
+    Two-sided paired t-test.
+
+    Args:
+        x: the per-topic scores of a system.
+        y: the per-topic scores of another system for the same topics.
+
+    Returns:
+        A tuple of the t statistic and the p-value.
+    '''
+    d = np.asarray(x, dtype=np.float64) - np.asarray(y, dtype=np.float64)
+    n = len(d)
+    if n < 2:
+        raise ValueError("At least two topics are required")
+    mean = d.mean()
+    sd = d.std(ddof=1)
+    if sd == 0.0:
+        return (0.0, 1.0) if mean == 0.0\
+            else (math.copysign(math.inf, mean), 0.0)
+    t = float(mean / (sd / math.sqrt(n)))
+    df = n - 1
+    return t, betainc(0.5 * df, 0.5, df / (df + t * t))
+
+def randomization_test(x, y, trials=10000, rng=None):
+    '''
+    Two-sided paired randomization test, which flips the sign of
+    the per-topic differences at random.
+
+    Args:
+        x: the per-topic scores of a system.
+        y: the per-topic scores of another system for the same topics.
+        trials: the number of random permutations (B).
+        rng: numpy.random.Generator, or a seed.
+
+    Returns:
+        The p-value.
+    '''
+    rng = _as_rng(rng)
+    d = np.asarray(x, dtype=np.float64) - np.asarray(y, dtype=np.float64)
+    n = len(d)
+    observed = abs(d.sum()) - TOLERANCE * n
+    count = 0
+    for size in _chunks(trials, n):
+        signs = rng.integers(0, 2, size=(size, n), dtype=np.int8) * 2 - 1
+        count += int(np.count_nonzero(np.abs(signs @ d) >= observed))
+    return count / trials
+
+def bootstrap_test(x, y, trials=10000, rng=None):
+    '''
+    Two-sided paired bootstrap test, which resamples the per-topic differences
+    shifted to the mean 0 with replacement and compares the t statistics.
+
+    Args:
+        x: the per-topic scores of a system.
+        y: the per-topic scores of another system for the same topics.
+        trials: the number of bootstrap samples (B).
+        rng: numpy.random.Generator, or a seed.
+
+    Returns:
+        The p-value.
+    '''
+    rng = _as_rng(rng)
+    d = np.asarray(x, dtype=np.float64) - np.asarray(y, dtype=np.float64)
+    n = len(d)
+    if n < 2:
+        raise ValueError("At least two topics are required")
+    observed = abs(_t_statistics(d[np.newaxis, :])[0]) - TOLERANCE
+    z = d - d.mean()
+    count = 0
+    for size in _chunks(trials, n):
+        samples = z[rng.integers(0, n, size=(size, n))]
+        count += int(np.count_nonzero(np.abs(_t_statistics(samples))
+            >= observed))
+    return count / trials
+
+def _t_statistics(samples):
+    '''
+    The t statistic of each row (0 if the standard deviation is 0).
+    '''
+    n = samples.shape[1]
+    mean = samples.mean(axis=1)
+    se = samples.std(axis=1, ddof=1) / math.sqrt(n)
+    result = np.zeros(len(samples))
+    np.divide(mean, se, out=result, where=se > 0)
+    result[(se == 0) & (mean != 0)] = math.inf
+    return result
+
+def tukey_hsd_test(matrix, trials=10000, rng=None):
+    '''
+    Randomised Tukey HSD test for multiple systems, which permutes the scores
+    of the systems for each topic at random and compares the difference
+    of every pair of systems with the range of the permuted mean scores.
+
+    Args:
+        matrix: an array of the scores (systems x topics).
+        trials: the number of random permutations (B).
+        rng: numpy.random.Generator, or a seed.
+
+    Returns:
+        An array of the p-value of each pair of the systems (systems x systems).
+    '''
+    rng = _as_rng(rng)
+    matrix = np.asarray(matrix, dtype=np.float64)
+    m, n = matrix.shape
+    topics = matrix.T
+    ranges = []
+    for size in _chunks(trials, n * m):
+        perm = rng.random((size, n, m)).argsort(axis=2)
+        means = np.take_along_axis(topics[np.newaxis, :, :], perm, axis=2)\
+            .mean(axis=1)
+        ranges.append(means.max(axis=1) - means.min(axis=1))
+    ranges = np.sort(np.concatenate(ranges))
+    means = matrix.mean(axis=1)
+    observed = np.abs(means[:, np.newaxis] - means[np.newaxis, :]) - TOLERANCE
+    counts = trials - np.searchsorted(ranges, observed.ravel(), side='left')
+    return (counts / trials).reshape(m, m)
+
+def pairwise_tests(run_results, metric, test=RANDOMIZATION_TEST, trials=10000,
+    seed=None, workers=1):
+    '''
+    Test the difference of every pair of runs in a metric.
+
+    Each pair is tested with its own random generator derived from the seed,
+    so that the p-values do not depend on the number of workers.
+
+    Args:
+        run_results: a dict of a run name and a dict of a topic ID and a list of
+            tuples of a metric name and its score, e.g. the output of evaluate_runs,
+            or a ScoreStore.
+        metric: a metric name, e.g. 'nDCG@10'.
+        test: T_TEST, RANDOMIZATION_TEST, BOOTSTRAP_TEST or TUKEY_HSD_TEST.
+        trials: the number of resamples (B).
+        seed: the seed of the random generators (random if None).
+        workers: the number of threads testing pairs in parallel.
+
+    Returns:
+        A list of OrderedDicts of 'run_a', 'run_b',
+        'diff' (the mean score of run_a minus that of run_b) and 'p'.
+    '''
+    if not test in TESTS:
+        raise ValueError("Unknown test: '%s'" % test)
+    names, _, matrix = score_matrix(run_results, metric)
+    pairs = list(combinations(range(len(names)), 2))
+    if test == TUKEY_HSD_TEST:
+        pvalues = tukey_hsd_test(matrix, trials, np.random.default_rng(seed))
+        ps = [pvalues[i, j] for i, j in pairs]
+    else:
+        seeds = np.random.SeedSequence(seed).spawn(len(pairs))
+        def run(task):
+            (i, j), pair_seed = task
+            if test == T_TEST:
+                return paired_t_test(matrix[i], matrix[j])[1]
+            func = randomization_test if test == RANDOMIZATION_TEST\
+                else bootstrap_test
+            return func(matrix[i], matrix[j], trials,
+                np.random.default_rng(pair_seed))
+        tasks = list(zip(pairs, seeds))
+        if workers is None or workers <= 1:
+            ps = [run(task) for task in tasks]
+        else:
+            from concurrent.futures import ThreadPoolExecutor
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                ps = list(executor.map(run, tasks))
+    means = matrix.mean(axis=1)
+    return [OrderedDict([('run_a', names[i]), ('run_b', names[j]),
+        ('diff', float(means[i] - means[j])), ('p', float(p))])
+        for (i, j), p in zip(pairs, ps)]
+
+def _as_rng(rng):
+    if isinstance(rng, np.random.Generator):
+        return rng
+    return np.random.default_rng(rng)
+
+def _chunks(trials, width):
+    '''
+    Split the trials into chunks of at most CHUNK_ELEMENTS elements.
+    '''
+    size = max(1, CHUNK_ELEMENTS // max(1, width))
+    for start in range(0, trials, size):
+        yield min(size, trials - start)
@@ -1,10 +1,15 @@
 import click
 import csv
+import io
 import re
+from collections import OrderedDict
 
 LEVEL = re.compile("^L([0-9]+)$")
+REL_FILE_PATTERNS = {}
 SEP_LABELLED_RANKED_LIST = ' '
 DEFAULT_CUTOFFS = [1000]
+DEFAULT_LOGB = 2.0
+OUTPUT_BUFFER_LINES = 8192
 
 def read_grades(string):
     """
@@ -56,6 +61,10 @@ def read_rel_file(f, sep):
     LINE FORMAT: <document id><SEPARATOR><relevance level>
         where <relevance level> := L[0-9]+
 
+    The whole file is read at once and split in bulk.
+    Malformed files fall back to the line-by-line parser,
+    which reports the line of the error.
+
     Args:
         f: file stream
         sep: a string that separates the document ID and relevance level.
@@ -63,7 +72,65 @@ def read_rel_file(f, sep):
     Returns:
         A dict of a document ID and a relevance level (int)
     """
-    rows = csv.reader(f, delimiter=sep)
+    data = f.read()
+    f.close()
+    result = _parse_rel_bulk(data, sep)
+    if result is None:
+        result = _parse_rel_rows(csv.reader(io.StringIO(data), delimiter=sep))
+    return result
+
+def _parse_rel_bulk(data, sep):
+    '''
+    Parse the content of a relevance file with a single pattern scan.
+
+    Args:
+        data: the content of a relevance file.
+        sep: a string that separates the document ID and relevance level.
+
+    Returns:
+        A dict of a document ID and a relevance level (int),
+        or None if the content is not well-formed or needs csv quoting.
+    '''
+    if len(sep) != 1 or sep in '\r\n' or '"' in data or '\r' in data:
+        return None
+    if len(data) == 0:
+        return {}
+    if data.endswith('\n'):
+        data = data[:-1]
+    if _rel_file_pattern(sep).fullmatch(data) is None:
+        return None
+    fields = data.replace('\n', sep).split(sep)
+    dids = fields[0::2]
+    levels = fields[1::2]
+    parsed = dict([(level, int(level[1:])) for level in set(levels)])
+    result = dict(zip(dids, map(parsed.__getitem__, levels)))
+    if len(result) != len(dids):
+        return None
+    return result
+
+def _rel_file_pattern(sep):
+    '''
+    Return a compiled pattern that matches the content of a well-formed
+    relevance file without the last line break.
+
+    Args:
+        sep: a string that separates the document ID and relevance level.
+    '''
+    if not sep in REL_FILE_PATTERNS:
+        line = "[^%s\\n]*%sL[0-9]+" % (re.escape(sep), re.escape(sep))
+        REL_FILE_PATTERNS[sep] = re.compile("(?:%s\\n)*%s" % (line, line))
+    return REL_FILE_PATTERNS[sep]
+
+def _parse_rel_rows(rows):
+    '''
+    Parse the rows of a relevance file line by line.
+
+    Args:
+        rows: an iterable of the fields of each line.
+
+    Returns:
+        A dict of a document ID and a relevance level (int)
+    '''
     result = {}
     for idx, row in enumerate(rows):
         if len(row) != 2:
@@ -75,6 +142,46 @@ def read_rel_file(f, sep):
                 "The rel file contains different relevance levels for the same document.")
         level = _parse_level(level, idx)
         result[did] = level
+    return result
+
+def read_qrels_file(f, sep):
+    """
+    Read the content of a multi-topic relevance file.
+    LINE FORMAT: <topic id><SEPARATOR><document id><SEPARATOR><relevance level>
+        where <relevance level> := L[0-9]+ (NTCIR style), or
+    LINE FORMAT: <topic id><SEPARATOR><iteration><SEPARATOR><document id><SEPARATOR><relevance level>
+        where <relevance level> := [0-9]+ (TREC style)
+
+    Args:
+        f: file stream
+        sep: a string that separates the fields.
+
+    Returns:
+        An OrderedDict of a topic ID and
+        a dict of a document ID and a relevance level (int)
+    """
+    rows = csv.reader(f, delimiter=sep)
+    result = OrderedDict()
+    for idx, row in enumerate(rows):
+        if len(row) == 3:
+            topic, did, level = row
+            level = _parse_level(level, idx)
+        elif len(row) == 4:
+            topic, _, did, level = row
+            try:
+                level = int(level)
+                assert level >= 0
+            except (ValueError, AssertionError):
+                raise Exception(
+                    "An invalid relevance level at Line %s" % (idx+1))
+        else:
+            raise Exception(
+                "The rel file contains an invalid line at Line %s" % (idx+1))
+        qrels = result.setdefault(topic, {})
+        if did in qrels:
+            raise Exception(
+                "The rel file contains different relevance levels for the same document.")
+        qrels[did] = level
     f.close()
     return result
 
@@ -89,16 +196,92 @@ def read_ranked_list(f):
     Returns:
         A ranked list of document IDs.
     """
-    result = []
+    return list(iter_ranked_list(f))
+
+def iter_ranked_list(f):
+    """
+    Read the content of a ranked list file lazily, line by line.
+    The stream is closed when the generator is exhausted or closed,
+    so that a consumer can stop reading in the middle of a huge file.
+    LINE FORMAT: <document id>
+
+    Args:
+        f: file stream. If f is None, use stdin.
+
+    Yields:
+        A document ID.
+    """
+    if f:
+        stream = f
+    else:
+        import sys
+        stream = sys.stdin
+    try:
+        for line in stream:
+            yield line.strip()
+    finally:
+        stream.close()
+
+# the orders of the documents of a run file (see read_run_file)
+RUN_ORDER_SCORE = 'score'
+RUN_ORDER_RANK = 'rank'
+RUN_ORDERS = [RUN_ORDER_SCORE, RUN_ORDER_RANK]
+
+def read_run_file(f, order=RUN_ORDER_SCORE):
+    """
+    Read the content of a TREC-style multi-topic run file.
+    LINE FORMAT: <topic id> Q0 <document id> <rank> <score> <run tag>
+    Fields are separated by whitespace.
+    As trec_eval does, documents are ranked in the descending order of <score>
+    for each topic, and documents with the same score are ranked in the
+    descending order of their IDs, so that <rank> is ignored.
+
+    Args:
+        f: file stream. If f is None, use stdin.
+        order: RUN_ORDER_SCORE ranks documents as above, while
+            RUN_ORDER_RANK ranks them in the ascending order of <rank>
+            (in the order of the lines if tied).
+
+    Returns:
+        An OrderedDict of a topic ID and a ranked list of document IDs.
+        Topics are in the order of their first appearance.
+    """
+    if not order in RUN_ORDERS:
+        raise ValueError("Unknown order: '%s'" % order)
+    docs = OrderedDict()
     if f:
         stream = f
     else:
         import sys
         stream = sys.stdin
     for idx, line in enumerate(stream):
-        did = line.strip()
-        result.append(did)
+        ls = line.split()
+        if len(ls) == 0:
+            continue
+        if len(ls) != 6:
+            raise Exception(
+                "The run file contains an invalid line at Line %s" % (idx+1))
+        topic, _, did, rank, score = ls[:5]
+        try:
+            rank = int(rank)
+        except ValueError:
+            raise Exception(
+                "An invalid rank at Line %s" % (idx+1))
+        try:
+            score = float(score)
+        except ValueError:
+            raise Exception(
+                "An invalid score at Line %s" % (idx+1))
+        docs.setdefault(topic, []).append((rank, score, did))
     stream.close()
+    result = OrderedDict()
+    for topic, topic_docs in docs.items():
+        if order == RUN_ORDER_SCORE:
+            topic_docs = sorted(topic_docs, key=lambda x: (x[1], x[2]),
+                reverse=True)
+        else:
+            topic_docs = sorted(topic_docs, key=lambda x: x[0])
+        result[topic] = [did for _, _, did in topic_docs]
     return result
 
 def read_labelled_ranked_list(f):
@@ -107,39 +290,64 @@ def read_labelled_ranked_list(f):
     LINE FORMAT: <document id><SEP_LABELLED_RANKED_LIST><relevance level>
         where <relevance level> := L[0-9]+
 
+    The whole input is read at once, and each distinct relevance level
+    string is parsed only once.
+
     Args:
         f: file stream. If f is None, use stdin.
 
     Returns:
         A ranked list of tuples of a document ID and a relevance level (int).
     """
-    result = []
     if f:
         stream = f
     else:
         import sys
         stream = sys.stdin
-    for idx, line in enumerate(stream):
+    data = stream.read()
+    stream.close()
+    lines = data.split('\n')
+    if lines[-1] == '':
+        lines.pop()
+    result = []
+    parsed = {}
+    for idx, line in enumerate(lines):
         ls = line.strip().split(SEP_LABELLED_RANKED_LIST)
         if len(ls) == 1:
-            ls.append(None)
-        if len(ls) > 0:
+            result.append((ls[0], None))
+        else:
             did, level = ls[:2]
-            if level is not None:
-                level = _parse_level(level, idx)
-            result.append((did, level))
-    stream.close()
+            if not level in parsed:
+                parsed[level] = _parse_level(level, idx)
+            result.append((did, parsed[level]))
     return result
 
-def output_labelled_ranked_list(sysdoclab):
+def output_labelled_ranked_list(sysdoclab, out=None):
     """
     Output a ranked list of documents with a relevance level.
+    Lines are written in chunks of OUTPUT_BUFFER_LINES,
+    so that sysdoclab can be a generator over a huge ranked list.
 
     Args:
-        sysdoclab: a ranked list of tuples of a document ID and a relevance level.
+        sysdoclab: a ranked list (or an iterable) of tuples of
+            a document ID and a relevance level.
+        out: text stream. If out is None, use stdout.
     """
+    if out is None:
+        import sys
+        out = sys.stdout
+    buf = []
     for did, grade in sysdoclab:
-        print(did + (" L" + str(grade) if grade is not None else ""))
+        if grade is None:
+            buf.append(did + "\n")
+        else:
+            buf.append("%s L%d\n" % (did, grade))
+        if len(buf) >= OUTPUT_BUFFER_LINES:
+            out.write("".join(buf))
+            buf = []
+    if len(buf) > 0:
+        out.write("".join(buf))
+    out.flush()
 
 def compute_validation(j, grades, stops, beta, gamma, logb, rbp,
     xrelnum, jrelnum):
@@ -158,6 +366,27 @@ def compute_validation(j, grades, stops, beta, gamma, logb, rbp,
         jrelnum: the total number of judged rel docs
     '''
 
+    parameter_validation(grades, stops, beta, gamma, logb, rbp)
+    # TODO: bug report
+    # THIS EXCEPTION SHOULD NOT BE RAISED
+    #if j and xrelnum[0] == 0:
+    #    raise Exception("No judged nonrel: bpref etc. not computable")
+    if jrelnum == 0:
+        raise Exception(
+            "No relevance document found in the relevance assessment file")
+
+def parameter_validation(grades, stops, beta, gamma, logb, rbp):
+    '''
+    Validate the metric parameters for the 'compute' and 'batch' commands.
+
+    Args:
+        grades: a list of the gain value for each relevance level.
+        stops: a list of the stop value for each relevance level.
+        beta: Q-measure's beta.
+        gamma: rank-biased NCU's gamma.
+        logb: log base for DCG
+        rbp: persistence for RBP
+    '''
     if len(stops) != len(grades):
         raise click.BadParameter("the size of '-s' must be the same as '-g'")
     if beta < 0:
@@ -169,13 +398,6 @@ def compute_validation(j, grades, stops, beta, gamma, logb, rbp,
             "the value of '--logb' must be 0 (natural log) or more")
     if rbp < 0 or rbp > 1:
         raise click.BadParameter("the value of '--rbp' must range from 0 to 1")
-    # TODO: bug report
-    # THIS EXCEPTION SHOULD NOT BE RAISED
-    #if j and xrelnum[0] == 0:
-    #    raise Exception("No judged nonrel: bpref etc. not computable")
-    if jrelnum == 0:
-        raise Exception(
-            "No relevance document found in the relevance assessment file")
 
 def _read_ints(string, sep, name):
     '''
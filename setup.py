@@ -15,7 +15,7 @@ setup(
         pyNTCIREVAL=pyNTCIREVAL.main:cli
     ''',
     install_requires = [
-        'numpy',
+        'numpy>=1.17',
         'click'
     ],
     tests_require=['pytest'],
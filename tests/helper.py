@@ -13,3 +13,45 @@ def ntcireval_formatting(output):
     for old, new in OLD_NEWS:
         output = output.replace(old, new)
     return output
+
+from pyNTCIREVAL.metrics import (RR, OMeasure, PMeasure, PPlusMeasure, AP,
+    QMeasure, NCUguP, NCUguBR, NCUrbP, NCUrbBR, RBP, ERR, nERR, nDCG, MSnDCG,
+    Precision, Hit)
+
+XRELNUM = [20, 10, 5, 3]
+GRADES = [1, 2, 3]
+
+# functions of xrelnum, grades and a cutoff that return a metric,
+# for the tests of all the metrics (Precision and Hit require a cutoff)
+METRIC_FACTORIES = [
+    lambda x, g, c: RR(),
+    lambda x, g, c: OMeasure(x, g, 1.0),
+    lambda x, g, c: PMeasure(x, g, 1.0),
+    lambda x, g, c: PPlusMeasure(x, g, 1.0),
+    lambda x, g, c: AP(x, g, c),
+    lambda x, g, c: QMeasure(x, g, 1.0, c),
+    lambda x, g, c: NCUguP(x, g, g),
+    lambda x, g, c: NCUguBR(x, g, g, 1.0),
+    lambda x, g, c: NCUrbP(x, g, 0.95),
+    lambda x, g, c: NCUrbBR(x, g, 0.95, 1.0),
+    lambda x, g, c: RBP(x, g, 0.95),
+    lambda x, g, c: ERR(x, g),
+    lambda x, g, c: ERR(x, g, 0.3),
+    lambda x, g, c: nERR(x, g, c),
+    lambda x, g, c: nERR(x, g, c, 0.3),
+    lambda x, g, c: nDCG(x, g, 2.0, c),
+    lambda x, g, c: MSnDCG(x, g, c),
+    lambda x, g, c: Precision(c or 10),
+    lambda x, g, c: Hit(c or 10),
+]
+
+# the metrics computed at each of the cutoffs by the 'compute' command
+CUTOFF_METRIC_FACTORIES = [
+    lambda x, g, c: AP(x, g, c),
+    lambda x, g, c: QMeasure(x, g, 1.0, c),
+    lambda x, g, c: nDCG(x, g, 2.0, c),
+    lambda x, g, c: MSnDCG(x, g, c),
+    lambda x, g, c: Precision(c),
+    lambda x, g, c: nERR(x, g, c),
+    lambda x, g, c: Hit(c),
+]
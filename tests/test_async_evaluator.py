@@ -0,0 +1,66 @@
+# -*- coding:utf-8 -*-
+import asyncio
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from pyNTCIREVAL.async_evaluator import AsyncEvaluator, compute_async
+from pyNTCIREVAL.evaluator import evaluate_run
+from pyNTCIREVAL.metrics import nDCG
+
+def run_until_complete(coroutine):
+    # asyncio.run is not available in Python 3.6
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+class TestAsyncEvaluator(object):
+
+    @pytest.mark.parametrize("offload_threshold", [0, 1000])
+    def test_evaluate(self, qrels, run, offload_threshold):
+        expected = evaluate_run(run, qrels, [1, 2, 3], cutoffs=[1, 3])
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            evaluator = AsyncEvaluator(qrels, [1, 2, 3], executor=executor,
+                offload_threshold=offload_threshold, cutoffs=[1, 3])
+            batches = []
+            evaluate_batch = evaluator._evaluate_batch
+            def counter(topic, ranked_lists):
+                batches.append((topic, len(ranked_lists)))
+                return evaluate_batch(topic, ranked_lists)
+            evaluator._evaluate_batch = counter
+
+            async def main():
+                return await asyncio.gather(*[
+                    evaluator.evaluate_docs(topic, run[topic])
+                    for topic in ['T1', 'T2', 'T1', 'T1']])
+            results = run_until_complete(main())
+        assert results == [expected['T1'], expected['T2'],
+            expected['T1'], expected['T1']]
+        # concurrent requests of the same topic are batched
+        assert sorted(batches) == [('T1', 3), ('T2', 1)]
+
+    def test_errors(self, qrels):
+        evaluator = AsyncEvaluator(qrels, [1, 2, 3])
+        async def main(topic, sysdoclab):
+            return await evaluator.evaluate(topic, sysdoclab)
+        with pytest.raises(ValueError):
+            run_until_complete(main('T3', [('e', 0)]))
+        with pytest.raises(ValueError):
+            run_until_complete(main('T9', []))
+        with pytest.raises(Exception):
+            run_until_complete(main('T1', [('a', 9)]))
+
+    def test_compute_async(self, qrels):
+        metric = nDCG([1, 1, 1, 1], [1, 2, 3], 2.0, 3)
+        ranked_list = [('b', 0), ('c', 3), ('a', 1)]
+        result = run_until_complete(compute_async(metric, ranked_list))
+        assert result == metric.compute(ranked_list)
+
+    @pytest.fixture
+    def qrels(self):
+        return {'T1': {'a': 1, 'b': 0, 'c': 3, 'd': 2},
+            'T2': {'a': 0, 'b': 1}, 'T3': {'e': 0}}
+
+    @pytest.fixture
+    def run(self):
+        return {'T1': ['b', 'x', 'c', 'a'], 'T2': ['a', 'b'], 'T3': ['e']}
@@ -0,0 +1,13 @@
+# -*- coding:utf-8 -*-
+import pytest
+from pyNTCIREVAL.metrics import NUMPY_BACKEND
+from tests.helper import METRIC_FACTORIES, XRELNUM, GRADES
+
+@pytest.mark.parametrize('factory', METRIC_FACTORIES)
+@pytest.mark.parametrize('cutoff', [None, 1, 5])
+def test_numpy_backend(factory, cutoff):
+    metric = factory(XRELNUM, GRADES, cutoff)
+    ranked_list = [(1, 0), (2, None), (3, 2), (4, 1), (5, 3),
+        (6, 0), (7, 3), (8, None), (9, 2), (10, 1)]
+    assert abs(metric.compute(ranked_list)
+        - metric.compute(ranked_list, backend=NUMPY_BACKEND)) < 1e-12
@@ -0,0 +1,31 @@
+# -*- coding:utf-8 -*-
+import pytest
+from pyNTCIREVAL.metrics import NUMPY_BACKEND
+from tests.helper import CUTOFF_METRIC_FACTORIES, XRELNUM, GRADES
+
+CUTOFFS = [10, 1, 3, 5, 5, 100]
+
+@pytest.mark.parametrize('factory', CUTOFF_METRIC_FACTORIES)
+@pytest.mark.parametrize('backend', ['python', NUMPY_BACKEND])
+def test_compute_cutoffs(factory, backend):
+    ranked_list = [(1, 0), (2, None), (3, 2), (4, 1), (5, 3),
+        (6, 0), (7, 3), (8, None), (9, 2)]
+    metric = factory(XRELNUM, GRADES, None)
+    scores = metric.compute_cutoffs(ranked_list, CUTOFFS, backend=backend)
+    assert metric.cutoff is None
+    assert len(scores) == len(CUTOFFS)
+    for cutoff, score in zip(CUTOFFS, scores):
+        expected = factory(XRELNUM, GRADES, cutoff).compute(ranked_list,
+            backend=backend)
+        assert score == expected
+
+@pytest.mark.parametrize('factory', CUTOFF_METRIC_FACTORIES)
+def test_compute_cutoffs_divisors(factory):
+    # more relevant documents than the smaller cutoffs,
+    # where the discount differs at each cutoff
+    ranked_list = [(i, 1 if i < 23 else 0) for i in range(200)]
+    cutoffs = [5, 20, 50, 160]
+    xrelnum, grades = [200, 30], [1]
+    scores = factory(xrelnum, grades, None).compute_cutoffs(ranked_list, cutoffs)
+    assert scores == [factory(xrelnum, grades, c).compute(ranked_list)
+        for c in cutoffs]
@@ -0,0 +1,54 @@
+# -*- coding:utf-8 -*-
+import math
+import pickle
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from pyNTCIREVAL.metrics import nDCG, MSnDCG, RBP, NCUrbP
+from pyNTCIREVAL.metrics.discount_table import (DiscountTable,
+    get_discount_table, orig_dcglog, DCG_DISCOUNT, MS_DCG_DISCOUNT,
+    RBP_DISCOUNT, RANK_BIASED_STOP, INITIAL_DEPTH)
+
+class TestDiscountTable(object):
+
+    @pytest.mark.parametrize('family,param,func', [
+        (DCG_DISCOUNT, 2.0, lambda r: 1.0 / orig_dcglog(r, 2.0)),
+        (DCG_DISCOUNT, math.e, lambda r: 1.0 / orig_dcglog(r, math.e)),
+        (MS_DCG_DISCOUNT, None, lambda r: 1.0 / math.log(r + 1)),
+        (RBP_DISCOUNT, 0.8, lambda r: (1 - 0.8) * 0.8 ** (r - 1)),
+        (RANK_BIASED_STOP, 0.95, lambda r: 0.95 ** (r - 1)),
+    ])
+    def test_values(self, family, param, func):
+        table = DiscountTable(family, param)
+        assert len(table) == 0
+        assert table.get(3) == func(3)
+        assert len(table) == INITIAL_DEPTH
+        assert table.get(INITIAL_DEPTH + 1) == func(INITIAL_DEPTH + 1)
+        assert len(table) == 2 * INITIAL_DEPTH
+        assert list(table.values) == [func(r)
+            for r in range(1, len(table) + 1)]
+
+    def test_shared(self):
+        xrelnum = [3, 2, 1]
+        grades = [1, 2]
+        assert nDCG(xrelnum, grades, 2.0, 10).discount_table is\
+            nDCG([1, 1], [1], 2.0, None).discount_table
+        assert nDCG(xrelnum, grades, 2.0, 10).discount_table is not\
+            nDCG(xrelnum, grades, 10.0, 10).discount_table
+        assert MSnDCG(xrelnum, grades, 10).discount_table is\
+            get_discount_table(MS_DCG_DISCOUNT)
+        assert RBP(xrelnum, grades, 0.95).discount_table is\
+            get_discount_table(RBP_DISCOUNT, 0.95)
+        with pytest.raises(ValueError):
+            get_discount_table('unknown')
+
+    def test_pickle(self):
+        metric = nDCG([3, 2, 1], [1, 2], 2.0, 10)
+        restored = pickle.loads(pickle.dumps(metric))
+        assert restored.discount_table is metric.discount_table
+
+    def test_threads(self):
+        table = DiscountTable(DCG_DISCOUNT, 3.0)
+        ranks = list(range(1, 20000, 7)) * 4
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            values = list(executor.map(table.get, ranks))
+        assert values == [1.0 / orig_dcglog(r, 3.0) for r in ranks]
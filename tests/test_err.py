@@ -0,0 +1,21 @@
+# -*- coding:utf-8 -*-
+import pytest
+from pyNTCIREVAL.metrics import ERR
+
+class TestERR(object):
+
+    def test_err(self, ranked_list):
+        # ERR grade of L3 is 3/4 and the user reaches rank k with 0.25**(k-1)
+        metric = ERR([0, 0, 0, 10], [1, 2, 3])
+        expected = sum([0.75 * 0.25 ** k / (k + 1) for k in range(10)])
+        assert abs(metric.compute(ranked_list) - expected) < 1e-15
+
+    def test_epsilon(self, ranked_list):
+        # 0.25 ** 4 < 0.01 <= 0.25 ** 3
+        metric = ERR([0, 0, 0, 10], [1, 2, 3], epsilon=0.01)
+        expected = sum([0.75 * 0.25 ** k / (k + 1) for k in range(4)])
+        assert abs(metric.compute(ranked_list) - expected) < 1e-15
+
+    @pytest.fixture
+    def ranked_list(self):
+        return [(i, 3) for i in range(10)]
@@ -0,0 +1,49 @@
+# -*- coding:utf-8 -*-
+import pytest
+from pyNTCIREVAL.metrics import QMeasure, NCUguBR, NCUrbP
+
+class TestGradeMetric(object):
+
+    def test_ideal_cumulative_grade(self, metric):
+        # ideal grades: [3, 2, 2, 1]
+        assert [metric._ideal_cumulative_grade(r) for r in range(7)]\
+            == [0, 3, 5, 7, 8, 8, 8]
+
+    def test_blended_ratio(self, metric, ranked_list):
+        # the naive (quadratic) definition of Q-measure
+        ideal = metric.ideal_grade_ranked_list
+        expected, relnum = 0.0, 0
+        for idx, (_, level) in enumerate(ranked_list):
+            rank = idx + 1
+            relnum += 1 if level > 0 else 0
+            g = sum([metric.grades[l-1] if l > 0 else 0.0
+                for _, l in ranked_list[:rank]])
+            ig = sum(ideal[:rank])
+            if level > 0:
+                expected += (relnum + g) / (rank + ig) / metric.jrelnum
+        assert metric.compute(ranked_list) == expected
+
+    def test_sp_normaliser(self, ranked_list):
+        gu = NCUguBR([5, 1, 2, 1], [1, 2, 3], [1, 2, 3], 1.0)
+        rb = NCUrbP([5, 1, 2, 1], [1, 2, 3], 0.9)
+        scores = [gu.compute(ranked_list), rb.compute(ranked_list)]
+        assert gu.sp_normaliser == 1 * 1 + 2 * 2 + 1 * 3
+        assert rb.sp_normaliser == 1 + 0.9 + 0.9 ** 2 + 0.9 ** 3
+        # computed once per configuration
+        for m in [gu, rb]:
+            m.compute_sp_normaliser = None
+        assert [gu.compute(ranked_list), rb.compute(ranked_list)] == scores
+        # recomputed after xrelnum changes
+        rb = NCUrbP([5, 1, 2, 1], [1, 2, 3], 0.9)
+        rb.compute(ranked_list)
+        rb.xrelnum = [5, 1, 2, 2]
+        rb.invalidate_ideal()
+        assert rb.sp_normaliser == 1 + 0.9 + 0.9 ** 2 + 0.9 ** 3 + 0.9 ** 4
+
+    @pytest.fixture
+    def metric(self):
+        return QMeasure([5, 1, 2, 1], [1, 2, 3], 1.0)
+
+    @pytest.fixture
+    def ranked_list(self):
+        return [(1, 0), (2, 2), (3, 3), (4, 0), (5, 1), (6, 0), (7, 2)]
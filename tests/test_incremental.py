@@ -0,0 +1,33 @@
+# -*- coding:utf-8 -*-
+import pytest
+import random
+from pyNTCIREVAL import Labeler
+from pyNTCIREVAL.metrics import IncrementalMetric, PPlusMeasure
+from tests.helper import METRIC_FACTORIES, XRELNUM, GRADES
+
+@pytest.mark.parametrize('factory', METRIC_FACTORIES)
+@pytest.mark.parametrize('cutoff', [None, 10])
+def test_extend(factory, cutoff):
+    metric = factory(XRELNUM, GRADES, cutoff)
+    rng = random.Random(0)
+    for _ in range(20):
+        ranked_list = [(i, rng.choice([0, 0, 0, 1, 2, 3, None]))
+            for i in range(rng.randint(0, 40))]
+        incremental = IncrementalMetric(metric)
+        pos = 0
+        while pos < len(ranked_list):
+            size = rng.randint(0, 5)
+            score = incremental.extend(ranked_list[pos:pos + size])
+            pos += size
+            assert score == metric.compute(ranked_list[:pos])
+        assert len(incremental) == len(ranked_list)
+
+def test_extend_labelled_list():
+    qrels = {0: 1, 1: 0, 2: 3, 4: 2}
+    labeler = Labeler(qrels)
+    metric = PPlusMeasure(labeler.compute_per_level_doc_num(4), GRADES, 1.0)
+    incremental = IncrementalMetric(metric)
+    assert incremental.score() == 0.0
+    incremental.extend(labeler.label([0, 1]))
+    score = incremental.extend(labeler.label([3, 2, 4]))
+    assert score == metric.compute(labeler.label([0, 1, 3, 2, 4]))
@@ -0,0 +1,21 @@
+# -*- coding:utf-8 -*-
+import pytest
+from pyNTCIREVAL import Labeler
+
+class TestLabeler(object):
+
+    def test_iter_label(self, qrels):
+        labeler = Labeler(qrels, is_condensed=True)
+        result = labeler.iter_label(iter(['a', 'x', 'b', 'c']))
+        assert list(result) == [('a', 1), ('b', 0), ('c', 2)]
+
+    def test_iter_label_truncate(self, qrels):
+        labeler = Labeler(qrels, truncate=2)
+        sysdocs = iter(['a', 'x', 'b', 'c'])
+        assert list(labeler.iter_label(sysdocs)) == [('a', 1), ('x', None)]
+        # the input is not read beyond the truncation depth
+        assert list(sysdocs) == ['b', 'c']
+
+    @pytest.fixture
+    def qrels(self):
+        return {'a': 1, 'b': 0, 'c': 2}
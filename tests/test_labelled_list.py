@@ -0,0 +1,73 @@
+# -*- coding:utf-8 -*-
+import pytest
+from pyNTCIREVAL import Labeler
+from pyNTCIREVAL.labelled_list import LabelledList, DocIdDictionary, UNJUDGED
+from pyNTCIREVAL.metrics import QMeasure, nERR, PPlusMeasure, RR, Metric
+from pyNTCIREVAL.metrics.metric import MetricState
+
+class TestLabelledList(object):
+
+    def test_label(self, qrels):
+        labeler = Labeler(qrels)
+        result = labeler.label(['a', 'x', 'b', 'c'])
+        assert isinstance(result, LabelledList)
+        assert result == [('a', 1), ('x', None), ('b', 0), ('c', 2)]
+        assert result.levels.typecode == 'b'
+        assert list(result.levels) == [1, UNJUDGED, 0, 2]
+        assert list(result.judged_levels()) == [1, 0, 0, 2]
+        assert result[1:3] == [('x', None), ('b', 0)]
+
+    def test_dictionary(self, qrels):
+        dictionary = DocIdDictionary()
+        labeler = Labeler(qrels, dictionary=dictionary)
+        first = labeler.label(['a', 'x'])
+        second = labeler.label(['x', 'c'])
+        assert len(dictionary) == 3
+        assert first.ids[1] == second.ids[0]
+
+    def test_scoped_dictionary(self, qrels):
+        labeler = Labeler(qrels)
+        first = labeler.label(['a', 'x'])
+        second = labeler.label(['x', 'c'])
+        assert labeler.dictionary is None
+        assert first.dictionary is not second.dictionary
+        assert len(second.dictionary) == 2
+        assert second == [('x', None), ('c', 2)]
+
+    def test_without_ids(self, qrels):
+        labeler = Labeler(qrels, keep_ids=False)
+        result = labeler.label(['a', 'x', 'c'])
+        assert result.ids is None
+        assert result == [(None, 1), (None, None), (None, 2)]
+
+    def test_level_typecode(self):
+        result = LabelledList.from_pairs([('a', 200), ('b', None)])
+        assert result.levels.typecode == 'h'
+        assert result == [('a', 200), ('b', None)]
+
+    def test_metrics(self, qrels):
+        ranked_list = [('x', None), ('b', 0), ('a', 1), ('c', 2), ('y', None)]
+        labelled = LabelledList.from_pairs(ranked_list)
+        xrelnum = [1, 1, 1]
+        grades = [1, 2]
+        metrics = [QMeasure(xrelnum, grades, 1.0), nERR(xrelnum, grades, 3),
+            PPlusMeasure(xrelnum, grades, 1.0), RR()]
+        for metric in metrics:
+            assert metric.compute(labelled) == metric.compute(ranked_list)
+
+    @pytest.fixture
+    def qrels(self):
+        return {'a': 1, 'b': 0, 'c': 2}
+
+    def test_rank_stats(self):
+        labelled = LabelledList.from_pairs(
+            [('x', None), ('b', 0), ('a', 1), ('d', 1), ('c', 2), ('e', 2)])
+        assert labelled.rank_stats() == (3, 5, 3)
+        assert labelled.rank_stats() is labelled.rank_stats()
+        assert Metric.find_first_rel_rank(labelled) == 3
+        assert Metric.find_first_max_rank(labelled) == 5
+        state = MetricState(labelled)
+        assert state.rank_stats is labelled.rank_stats()
+        assert state.first_max_relnum == 3
+        assert LabelledList.from_pairs([('b', 0)]).rank_stats()\
+            == (None, None, None)
@@ -1,5 +1,6 @@
 # -*- coding:utf-8 -*-
 import sys, os
+import json
 from click.testing import CliRunner
 from pyNTCIREVAL.main import cli
 from tests.helper import ntcireval_formatting
@@ -25,6 +26,17 @@ dummy12
 dummy04 L2
             '''.strip()
 
+    def test_label_truncate(self):
+        runner = CliRunner()
+        result = runner.invoke(cli, ['label',
+            '-r', self._p('sample.rel'), '--truncate', '2',
+            self._p('sample.res')])
+        assert result.output.strip() ==\
+            '''
+dummy11 L0
+dummy01 L3
+            '''.strip()
+
     def test_compute(self):
         runner = CliRunner()
         result = runner.invoke(cli, ['compute', 
@@ -34,6 +46,40 @@ dummy04 L2
         assert result.output.strip().replace(" ", "") ==\
             ntcireval_formatting(self._r("test_compute"))
 
+    def _runner(self):
+        # stderr is separated by default since click 8.2
+        try:
+            return CliRunner(mix_stderr=False)
+        except TypeError:
+            return CliRunner()
+
+    def test_compute_profile(self):
+        result = self._runner().invoke(cli, ['compute',
+            '-r', self._p('sample.rel'),
+            '-g', '1:2:3', '--profile',
+            self._p('sample.lab')])
+        assert result.stdout.strip().replace(" ", "") ==\
+            ntcireval_formatting(self._r("test_compute"))
+        line = result.stderr.rstrip("\n")
+        assert line.startswith(" # profile ")
+        profile = json.loads(line[len(" # profile "):])
+        assert list(profile['stages']) ==\
+            ['parse_rel', 'parse_ranked_list', 'evaluate']
+        assert len(profile['metrics']) == 19
+        for record in profile['metrics']:
+            assert record['calls'] == 1
+            assert record['gain_calls'] == record['discount_calls']
+
+    def test_label_profile(self):
+        args = ['label', '-r', self._p('sample.rel'), self._p('sample.res')]
+        result = self._runner().invoke(cli, args + ['--profile'])
+        assert result.stdout == self._runner().invoke(cli, args).stdout
+        line = result.stderr.strip()
+        assert line.startswith("# profile ")
+        profile = json.loads(line[len("# profile "):])
+        assert list(profile['stages']) == ['parse_rel', 'label']
+        assert self._runner().invoke(cli, args).stderr == ''
+
     def test_compute_grade(self):
         runner = CliRunner()
         result = runner.invoke(cli, ['compute', 
@@ -61,3 +107,98 @@ dummy04 L2
             self._p('sample-j.lab')])
         assert result.output.strip().replace(" ", "") ==\
             ntcireval_formatting(self._r("test_compute_label_j"))
+
+    def test_compute_numpy_backend(self):
+        runner = CliRunner()
+        result = runner.invoke(cli, ['compute',
+            '-r', self._p('sample.rel'),
+            '-g', '1:2:3',
+            '--cutoffs', '2',
+            '--backend', 'numpy',
+            self._p('sample.lab')])
+        assert result.output.strip().replace(" ", "") ==\
+            ntcireval_formatting(self._r("test_compute_cutoff"))
+
+    def test_batch(self):
+        runner = CliRunner()
+        result = runner.invoke(cli, ['batch',
+            '-r', self._p('sample-multi.rel'),
+            '-g', '1:2:3',
+            '--cutoffs', '2',
+            self._p('sample.run')])
+        lines = result.output.strip().split("\n")
+        # T3 has no relevant document
+        assert set([l.split()[0] for l in lines]) == set(['T1', 'T2', 'ALL'])
+        topic = [l[len('T1'):] for l in lines if l.startswith('T1 ')]
+        expected = self._r("test_compute_cutoff").strip().split("\n")[2:]
+        assert ntcireval_formatting("\n".join(topic)) ==\
+            ntcireval_formatting("\n".join(expected))
+        means = [l for l in lines if l.startswith('ALL ')]
+        assert len(means) == len(topic)
+        assert means[0].split() == ['ALL', 'RR=', '0.5000']
+
+    def test_batch_workers(self):
+        runner = CliRunner()
+        args = ['batch',
+            '-r', self._p('sample-multi.rel'),
+            '-g', '1:2:3',
+            '--cutoffs', '1,2',
+            self._p('sample.run'), self._p('sample-b.run')]
+        serial = runner.invoke(cli, args)
+        parallel = runner.invoke(cli, args + ['--workers', '2'])
+        assert parallel.exit_code == 0
+        assert parallel.output == serial.output
+        assert serial.output.startswith(self._p('sample.run') + ' T1 RR=')
+
+    def test_batch_test(self):
+        runner = CliRunner()
+        args = ['batch',
+            '-r', self._p('sample-multi.rel'),
+            '-g', '1:2:3',
+            '--cutoffs', '2',
+            self._p('sample.run'), self._p('sample-b.run'),
+            '--test', 'randomization', '--test-metric', 'AP@0002',
+            '--seed', '0']
+        result = runner.invoke(cli, args)
+        assert result.exit_code == 0
+        lines = result.output.strip().split("\n")
+        assert lines[-1].startswith("randomization AP@0002 %s %s diff=-0.5000 p="
+            % (self._p('sample.run'), self._p('sample-b.run')))
+        assert runner.invoke(cli, args).output == result.output
+        result = runner.invoke(cli, args[:-4] + ['--test-metric', 'unknown'])
+        assert result.exit_code != 0
+
+    def test_batch_store(self, tmpdir):
+        from pyNTCIREVAL.score_store import ScoreStore
+        runner = CliRunner()
+        path = str(tmpdir.join('store'))
+        result = runner.invoke(cli, ['batch',
+            '-r', self._p('sample-multi.rel'),
+            '-g', '1:2:3',
+            '--cutoffs', '2',
+            '--store', path,
+            self._p('sample.run')])
+        assert result.exit_code == 0
+        store = ScoreStore(path)
+        assert store.runs == [self._p('sample.run')]
+        assert store.topics == ['T1', 'T2']
+        means = [l for l in result.output.strip().split("\n")
+            if l.startswith('ALL ')]
+        assert ["ALL %s=%0.4f" % m for m in store.mean_scores(store.runs[0])]\
+            == [' '.join(l.split()).replace('= ', '=') for l in means]
+
+    def test_serve(self):
+        runner = CliRunner()
+        requests = [{'id': 1, 'op': 'label', 'topic': 'T1',
+            'docs': ['dummy01', 'dummy99']},
+            {'id': 2, 'op': 'compute', 'topic': 'T1',
+            'docs': ['dummy01', 'dummy99']}]
+        result = runner.invoke(cli, ['serve',
+            '-r', self._p('sample-multi.rel'),
+            '-g', '1:2:3', '--cutoffs', '2'],
+            input="\n".join([json.dumps(r) for r in requests]) + "\n")
+        responses = [json.loads(l) for l in result.output.splitlines()]
+        assert responses[0] == {'id': 1,
+            'labelled': [['dummy01', 3], ['dummy99', None]]}
+        assert responses[1]['scores']['RR'] == 1.0
+        assert responses[1]['scores']['Precision@0002'] == 0.5
@@ -1,6 +1,11 @@
 # -*- coding:utf-8 -*-
 import pytest
-from pyNTCIREVAL.metrics import Metric
+import random
+from concurrent.futures import ThreadPoolExecutor
+from pyNTCIREVAL import Labeler
+from pyNTCIREVAL.metrics import (Metric, MetricState, QMeasure, PPlusMeasure,
+    NCUguBR, nERR)
+from tests.helper import METRIC_FACTORIES, XRELNUM, GRADES
 
 class TestMetric(object):
 
@@ -12,6 +17,49 @@ class TestMetric(object):
         rank = Metric.find_first_max_rank(ranked_list)
         assert rank == 3
 
+    def test_state(self, ranked_list):
+        state = MetricState(ranked_list, 3)
+        assert state.first_rel_rank == 2
+        assert state.first_max_rank == 3
+        with pytest.raises(AttributeError):
+            state.gains = []
+
+    def test_shared_metric(self):
+        xrelnum = [20, 10, 5, 3]
+        grades = [1, 2, 3]
+        metrics = [QMeasure(xrelnum, grades, 1.0),
+            PPlusMeasure(xrelnum, grades, 1.0),
+            NCUguBR(xrelnum, grades, grades, 1.0), nERR(xrelnum, grades, 10)]
+        rng = random.Random(0)
+        ranked_lists = [[(i, rng.choice([0, 0, 0, 1, 2, 3, None]))
+            for i in range(rng.randint(1, 50))] for _ in range(200)]
+        expected = [[m.compute(l) for m in metrics] for l in ranked_lists]
+        attrs = [sorted(vars(m)) for m in metrics]
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            actual = list(executor.map(
+                lambda l: [m.compute(l) for m in metrics], ranked_lists))
+        assert actual == expected
+        assert [sorted(vars(m)) for m in metrics] == attrs
+
     @pytest.fixture
     def ranked_list(self):
         return [(1, 0), (2, 2), (3, 3), (2, 2)]
+
+    @pytest.mark.parametrize('factory', METRIC_FACTORIES)
+    def test_sparse(self, factory):
+        rng = random.Random(0)
+        for _ in range(50):
+            qrels = {i: rng.choice([0, 0, 0, 0, 1, 2, 3])
+                for i in range(rng.randint(0, 60))}
+            ranked_list = Labeler(qrels).label(
+                [rng.randint(0, 80) for _ in range(rng.randint(0, 60))])
+            for cutoff in [None, 5]:
+                sparse = factory(XRELNUM, GRADES, cutoff)
+                dense = factory(XRELNUM, GRADES, cutoff)
+                dense.sparse = False
+                assert sparse.sparse
+                assert sparse.compute(ranked_list) ==\
+                    dense.compute(ranked_list)
+                assert sparse.compute_cutoffs(ranked_list, [3, 1, 10, 100])\
+                    == dense.compute_cutoffs(ranked_list, [3, 1, 10, 100])
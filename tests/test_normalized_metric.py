@@ -0,0 +1,49 @@
+# -*- coding:utf-8 -*-
+import pytest
+from pyNTCIREVAL.metrics import nDCG, MSnDCG
+from pyNTCIREVAL.metrics.normalized_metric import IdealScoreCache
+
+class TestNormalizedMetric(object):
+
+    def test_ideal_cache(self, cache, ranked_list):
+        metric = nDCG([5, 2, 1], [1, 2], 2.0, 3)
+        first = metric.compute(ranked_list)
+        assert cache.cache_info()['misses'] == 1
+        assert metric.compute(ranked_list) == first
+        assert cache.cache_info()['hits'] == 1
+        # another instance with the same configuration
+        nDCG([5, 2, 1], [1, 2], 2.0, 3).compute(ranked_list)
+        assert cache.cache_info()['hits'] == 2
+        # different configurations
+        nDCG([5, 2, 1], [1, 2], 10.0, 3).compute(ranked_list)
+        MSnDCG([5, 2, 1], [1, 2], 3).compute(ranked_list)
+        assert cache.cache_info()['misses'] == 3
+
+    def test_invalidate_ideal(self, cache, ranked_list):
+        metric = MSnDCG([5, 2, 1], [1, 2], 3)
+        metric.compute(ranked_list)
+        metric.xrelnum = [5, 1, 0]
+        metric.invalidate_ideal()
+        assert len(cache) == 0
+        assert metric.compute(ranked_list) ==\
+            MSnDCG([5, 1, 0], [1, 2], 3).compute(ranked_list)
+
+    def test_maxsize(self):
+        cache = IdealScoreCache(maxsize=2)
+        for i in range(3):
+            cache.put(i, float(i))
+        assert cache.get(0) is None
+        assert cache.get(2) == 2.0
+        assert cache.cache_info() ==\
+            {'hits': 1, 'misses': 1, 'maxsize': 2, 'currsize': 2}
+
+    @pytest.fixture
+    def cache(self, monkeypatch):
+        from pyNTCIREVAL.metrics.normalized_metric import NormalizedMetric
+        cache = IdealScoreCache()
+        monkeypatch.setattr(NormalizedMetric, 'ideal_cache', cache)
+        return cache
+
+    @pytest.fixture
+    def ranked_list(self):
+        return [(1, 0), (2, 2), (3, 1), (4, 0)]
@@ -0,0 +1,81 @@
+# -*- coding:utf-8 -*-
+import pytest
+from pyNTCIREVAL.plan import EvaluationPlan, Intermediates
+from pyNTCIREVAL.labelled_list import LabelledList
+from pyNTCIREVAL.metrics import (NUMPY_BACKEND, RR, PPlusMeasure, AP, QMeasure,
+    NCUguBR, NCUrbP, ERR, nDCG, Precision)
+
+XRELNUM = [5, 3, 2, 2]
+GRADES = [1, 2, 3]
+CUTOFFS = [1, 3, 5]
+
+class TestEvaluationPlan(object):
+
+    def test_evaluate(self, ranked_list, plan):
+        results = plan.evaluate(ranked_list)
+        metrics, cutoff_metrics = self._metrics()
+        expected = [(str(m), m.compute(ranked_list)) for m in metrics]
+        for cutoff in CUTOFFS:
+            for metric in cutoff_metrics:
+                metric.cutoff = cutoff
+                expected.append((str(metric), metric.compute(ranked_list)))
+        assert [name for name, _ in results] == [name for name, _ in expected]
+        assert [score for _, score in results]\
+            == [score for _, score in expected]
+        # the plan can be reused
+        assert plan.evaluate(ranked_list) == results
+
+    def test_numpy(self, ranked_list):
+        metrics, cutoff_metrics = self._metrics()
+        plan = EvaluationPlan(metrics, cutoff_metrics, CUTOFFS, NUMPY_BACKEND)
+        expected = EvaluationPlan(*self._metrics(), cutoffs=CUTOFFS)\
+            .evaluate(ranked_list)
+        for (name, score), (e_name, e) in zip(plan.evaluate(ranked_list),
+            expected):
+            assert name == e_name
+            assert abs(score - e) < 1e-12
+
+    def test_tuples_scanned_once(self, ranked_list, plan, monkeypatch):
+        expected = plan.evaluate(LabelledList.from_pairs(ranked_list))
+        # the plan converts the list, so that no metric scans the tuples
+        def scan(levels):
+            raise AssertionError("the list of tuples is scanned by a metric")
+        monkeypatch.setattr('pyNTCIREVAL.metrics.metric.relevant_positions',
+            scan)
+        assert plan.evaluate(ranked_list) == expected
+
+    def test_shared_ideal(self, plan):
+        metrics = [m for m in plan.metrics + plan.cutoff_metrics
+            if hasattr(m, 'xrelnum')]
+        assert all([m.ideal_grade_prefix_sums
+            is metrics[0].ideal_grade_prefix_sums for m in metrics])
+
+    def test_intermediates(self, ranked_list, plan):
+        labelled = LabelledList.from_pairs(ranked_list)
+        shared = Intermediates(labelled, plan.keys)
+        ap, q = plan.metrics[2], plan.metrics[3]
+        assert shared.cumgains(ap) == [2, 3, 6, 9, 11]
+        assert shared.cumgains(ap) is shared.cumgains(q)
+        # beta = 0 for AP and NCUrbP
+        assert shared.blended_ratios(ap) is shared.blended_ratios(plan.metrics[5])
+        assert shared.blended_ratios(ap) is not shared.blended_ratios(q)
+        assert shared.blended_ratios(ap)[1] == 2.0 / 4
+        assert shared.cumgains(plan.metrics[0]) is None
+
+    def _metrics(self):
+        metrics = [RR(), PPlusMeasure(XRELNUM, GRADES, 1.0),
+            AP(XRELNUM, GRADES), QMeasure(XRELNUM, GRADES, 1.0),
+            NCUguBR(XRELNUM, GRADES, GRADES, 1.0), NCUrbP(XRELNUM, GRADES, 0.95),
+            ERR(XRELNUM, GRADES)]
+        cutoff_metrics = [AP(XRELNUM, GRADES), QMeasure(XRELNUM, GRADES, 1.0),
+            nDCG(XRELNUM, GRADES, 2.0, None), Precision(None)]
+        return metrics, cutoff_metrics
+
+    @pytest.fixture
+    def plan(self):
+        return EvaluationPlan(*self._metrics(), cutoffs=CUTOFFS)
+
+    @pytest.fixture
+    def ranked_list(self):
+        return [(1, 0), (2, None), (3, 2), (4, 1), (5, 3),
+            (6, 0), (7, 3), (8, None), (9, 2)]
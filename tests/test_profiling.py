@@ -0,0 +1,42 @@
+# -*- coding:utf-8 -*-
+import pytest
+from pyNTCIREVAL.profiling import Profiler
+from pyNTCIREVAL.evaluator import Evaluator
+from pyNTCIREVAL.metrics import nDCG
+
+class TestProfiling(object):
+
+    def test_instrument(self, ranked_list):
+        profiler = Profiler()
+        metric = nDCG([3, 2, 1], [1, 2], 2.0, 3)
+        record, = profiler.instrument(metric)
+        with profiler.measure(record):
+            score = metric.compute(ranked_list)
+        assert score == nDCG([3, 2, 1], [1, 2], 2.0, 3).compute(ranked_list)
+        assert record['calls'] == 1
+        # only the relevant document above the cutoff is walked (see Metric.sparse)
+        assert record['gain_calls'] == 1
+        assert record['discount_calls'] == 1
+        # the ideal ranked list of 3 relevant documents at cutoff 3
+        assert record['ideal_gain_calls'] == 3
+        assert record['ideal_time'] > 0.0
+
+    def test_evaluator(self, ranked_list):
+        profiler = Profiler()
+        evaluator = Evaluator([3, 2, 1], [1, 2], cutoffs=[1, 3],
+            profiler=profiler)
+        results = evaluator.evaluate(ranked_list)
+        assert results == Evaluator([3, 2, 1], [1, 2],
+            cutoffs=[1, 3]).evaluate(ranked_list)
+        records = profiler.report()['metrics']
+        # a record for each metric and each cutoff of the cutoff metrics
+        assert len(records) == 12 + 7 * 2
+        assert [r['cutoff'] for r in records[-14:]] == [1, 3] * 7
+        assert all([r['calls'] == 1 for r in records])
+        # only the relevant document at rank 2 is walked at cutoff 1 and 3
+        ap1, ap3 = records[12:14]
+        assert (ap1['gain_calls'], ap3['gain_calls']) == (0, 1)
+
+    @pytest.fixture
+    def ranked_list(self):
+        return [('a', 0), ('b', 2), ('c', None), ('d', 1), ('e', 0)]
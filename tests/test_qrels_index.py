@@ -0,0 +1,51 @@
+# -*- coding:utf-8 -*-
+import io
+import pytest
+from pyNTCIREVAL.qrels_index import QrelsIndex
+from pyNTCIREVAL.evaluator import evaluate_run
+from pyNTCIREVAL.metrics import nDCG
+
+class TestQrelsIndex(object):
+
+    def test_get_xrelnum(self, index):
+        assert index.get_xrelnum('T1', 4) == [1, 1, 1, 1]
+        assert index.get_xrelnum('T2', 4) == [1, 1, 0, 0]
+        with pytest.raises(Exception):
+            index.get_xrelnum('T1', 3)
+
+    def test_precompute(self, index):
+        index.precompute([1, 2, 3], 2.0, [1, 3])
+        precomputed = index.get_precomputed('T1', [1, 2, 3], 2.0)
+        assert precomputed['ideal_grade_ranked_list'] == [3, 2, 1]
+        assert precomputed['ideal_grade_prefix_sums'] == [0, 3, 5, 6]
+        ndcg = nDCG([1, 1, 1, 1], [1, 2, 3], 2.0, None)
+        assert precomputed['ideal_scores']['nDCG'] ==\
+            dict(zip([1, 3], ndcg.compute_ideal_cutoffs([1, 3])))
+        assert index.get_precomputed('T1', [1, 2, 3], 10.0) is None
+        # T3 has no relevant document
+        assert index.get_precomputed('T3', [1, 2, 3], 2.0) is None
+
+    def test_save_and_load(self, index, qrels):
+        index.precompute([1, 2, 3], 2.0, [1, 3])
+        f = io.BytesIO()
+        index.save(f)
+        f.seek(0)
+        loaded = QrelsIndex.load(f)
+        assert loaded.topics == index.topics
+        assert loaded.precomputed == index.precomputed
+        run = {'T1': ['d3', 'd0', 'd2'], 'T2': ['d1']}
+        assert evaluate_run(run, loaded, [1, 2, 3], cutoffs=[1, 3])\
+            == evaluate_run(run, qrels, [1, 2, 3], cutoffs=[1, 3])
+
+    def test_load_invalid(self):
+        with pytest.raises(Exception):
+            QrelsIndex.load(io.BytesIO(b'T1 d1 L1\n'))
+
+    @pytest.fixture
+    def qrels(self):
+        return {'T1': {'d0': 0, 'd1': 1, 'd2': 2, 'd3': 3},
+            'T2': {'d0': 0, 'd1': 1}, 'T3': {'d0': 0}}
+
+    @pytest.fixture
+    def index(self, qrels):
+        return QrelsIndex(qrels)
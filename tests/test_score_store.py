@@ -0,0 +1,56 @@
+# -*- coding:utf-8 -*-
+import math
+import os
+import pytest
+from collections import OrderedDict
+from pyNTCIREVAL.score_store import ScoreStore, INDEX_FILE
+from pyNTCIREVAL.evaluator import mean_scores
+from pyNTCIREVAL.significance import pairwise_tests, score_matrix
+
+@pytest.fixture
+def run_results():
+    return OrderedDict([
+        ('runA', OrderedDict([('T1', [('AP', 0.5), ('RR', 1.0)]),
+            ('T2', [('AP', 0.25), ('RR', 0.5)]),
+            ('T3', [('AP', 0.1), ('RR', 0.2)])])),
+        ('runB', OrderedDict([('T2', [('AP', 0.75), ('RR', 1.0)]),
+            ('T3', [('AP', 0.0), ('RR', 0.0)])])),
+    ])
+
+class TestScoreStore(object):
+
+    def test_write_and_read(self, tmpdir, run_results):
+        path = str(tmpdir.join('store'))
+        ScoreStore.write(path, run_results)
+        store = ScoreStore(path)
+        assert store.runs == ['runA', 'runB']
+        assert store.topics == ['T1', 'T2', 'T3']
+        assert store.metrics == ['AP', 'RR']
+        assert store.scores.shape == (2, 3, 2)
+        assert store.get('runA', 'T2', 'RR') == 0.5
+        assert list(store.get('runB', metric='AP')[1:]) == [0.75, 0.0]
+        assert math.isnan(store.get('runB', 'T1', 'AP'))
+        with pytest.raises(ValueError):
+            store.get(topic='T4')
+
+    def test_mean_scores(self, tmpdir, run_results):
+        store = ScoreStore.write(str(tmpdir), run_results)
+        for run, topic_results in run_results.items():
+            assert store.mean_scores(run) == mean_scores(topic_results)
+
+    def test_score_matrix(self, tmpdir, run_results):
+        store = ScoreStore.write(str(tmpdir), run_results)
+        names, topics, matrix = score_matrix(store, 'AP')
+        expected = score_matrix(run_results, 'AP')
+        assert (names, topics) == (expected[0], expected[1]) == \
+            (['runA', 'runB'], ['T2', 'T3'])
+        assert (matrix == expected[2]).all()
+        assert pairwise_tests(store, 'RR', 'ttest') ==\
+            pairwise_tests(run_results, 'RR', 'ttest')
+
+    def test_invalid(self, tmpdir, run_results):
+        ScoreStore.write(str(tmpdir), run_results)
+        with open(os.path.join(str(tmpdir), INDEX_FILE), 'w') as f:
+            f.write('{"format": "other"}')
+        with pytest.raises(ValueError):
+            ScoreStore(str(tmpdir))
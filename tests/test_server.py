@@ -0,0 +1,127 @@
+# -*- coding:utf-8 -*-
+import io
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+import pytest
+from pyNTCIREVAL.server import EvaluationServer, _remove_stale_socket
+from pyNTCIREVAL.evaluator import evaluate_run
+from pyNTCIREVAL.qrels_index import QrelsIndex
+
+class TestServer(object):
+
+    def test_label(self, server):
+        response = server.handle({'id': 1, 'op': 'label', 'topic': 'T1',
+            'docs': ['a', 'x', 'c'], 'truncate': 2})
+        assert response == {'id': 1, 'labelled': [['a', 1], ['x', None]]}
+        # T3 cannot be evaluated, but can be labelled
+        response = server.handle({'id': 2, 'op': 'label', 'topic': 'T3',
+            'docs': ['e']})
+        assert response == {'id': 2, 'labelled': [['e', 0]]}
+
+    def test_compute(self, server, qrels, run):
+        expected = evaluate_run(run, qrels, [1, 2, 3], cutoffs=[1, 3])
+        for topic, results in expected.items():
+            response = server.handle({'id': topic, 'op': 'compute',
+                'topic': topic, 'docs': run[topic]})
+            assert list(response['scores'].items()) == results
+        labelled = [[d, qrels['T1'].get(d)] for d in run['T1']]
+        response = server.handle({'op': 'compute', 'topic': 'T1',
+            'labelled': labelled})
+        assert list(response['scores'].items()) == expected['T1']
+
+    def test_errors(self, server):
+        assert 'error' in server.handle({'id': 1, 'op': 'compute',
+            'topic': 'T3', 'docs': ['e']})
+        assert 'error' in server.handle({'id': 1, 'op': 'x', 'topic': 'T1'})
+        assert 'error' in server.handle({'id': 1, 'op': 'label',
+            'topic': 'T9', 'docs': []})
+        response = json.loads(server.handle_line('['))
+        assert response['id'] is None and 'error' in response
+        # the op is validated before the topic
+        assert server.handle({'op': 'x', 'topic': 'T9'})['error']\
+            == "Unknown op: x"
+
+    @pytest.mark.parametrize("labelled", [
+        [['a', 1], ['b']], [['a', 1], 'b'], [['a', 4]], [['a', -1]],
+        [['a', '1']], [['a', 1.0]], [['a', True]]])
+    def test_invalid_labelled(self, server, labelled):
+        response = server.handle({'op': 'compute', 'topic': 'T1',
+            'labelled': labelled})
+        assert response['error'].startswith("Invalid")
+
+    def test_serve_stream(self, qrels, run):
+        requests = [json.dumps({'id': i, 'op': 'compute', 'topic': topic,
+            'docs': run[topic]}) for i, topic in enumerate(['T1', 'T2'] * 20)]
+        outputs = []
+        for workers in [1, 4]:
+            server = EvaluationServer(qrels, [1, 2, 3], workers=workers,
+                queue_size=2, cutoffs=[1, 3])
+            out = io.StringIO()
+            server.serve_stream(io.StringIO("\n".join(requests) + "\n"), out)
+            responses = [json.loads(l) for l in out.getvalue().splitlines()]
+            outputs.append(sorted(responses, key=lambda r: r['id']))
+        assert len(outputs[0]) == 40
+        assert outputs[0] == outputs[1]
+
+    def test_index(self, qrels, run):
+        index = QrelsIndex(qrels)
+        index.precompute([1, 2, 3], 2.0, [1, 3])
+        server = EvaluationServer(index, [1, 2, 3], cutoffs=[1, 3])
+        expected = evaluate_run(run, qrels, [1, 2, 3], cutoffs=[1, 3])
+        response = server.handle({'op': 'compute', 'topic': 'T1',
+            'docs': run['T1']})
+        assert list(response['scores'].items()) == expected['T1']
+
+    @pytest.mark.skipif(not hasattr(socket, 'AF_UNIX'),
+        reason="Unix sockets are not available")
+    def test_serve_unix(self, server, run):
+        path = os.path.join(tempfile.mkdtemp(), 'server.sock')
+        thread = threading.Thread(target=server.serve_unix, args=(path,))
+        thread.daemon = True
+        thread.start()
+        for _ in range(100):
+            if os.path.exists(path):
+                break
+            time.sleep(0.05)
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        client.connect(path)
+        client.sendall((json.dumps({'id': 1, 'op': 'label', 'topic': 'T2',
+            'docs': ['b', 'x']}) + "\n").encode('utf-8'))
+        response = json.loads(client.makefile('r').readline())
+        client.close()
+        assert response == {'id': 1, 'labelled': [['b', 1], ['x', None]]}
+        # the path is used by the running server
+        with pytest.raises(ValueError):
+            server.serve_unix(path)
+
+    @pytest.mark.skipif(not hasattr(socket, 'AF_UNIX'),
+        reason="Unix sockets are not available")
+    def test_stale_socket(self, server):
+        path = os.path.join(tempfile.mkdtemp(), 'server.sock')
+        # a socket file left by a crashed server
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        stale.bind(path)
+        stale.close()
+        _remove_stale_socket(path)
+        assert not os.path.exists(path)
+        with open(path, 'w') as f:
+            f.write('')
+        with pytest.raises(ValueError):
+            server.serve_unix(path)
+
+    @pytest.fixture
+    def server(self, qrels):
+        return EvaluationServer(qrels, [1, 2, 3], cutoffs=[1, 3])
+
+    @pytest.fixture
+    def qrels(self):
+        return {'T1': {'a': 1, 'b': 0, 'c': 3, 'd': 2},
+            'T2': {'a': 0, 'b': 1}, 'T3': {'e': 0}}
+
+    @pytest.fixture
+    def run(self):
+        return {'T1': ['b', 'x', 'c', 'a'], 'T2': ['a', 'b'], 'T3': ['e']}
@@ -0,0 +1,69 @@
+# -*- coding:utf-8 -*-
+import pytest
+import numpy as np
+from collections import OrderedDict
+from pyNTCIREVAL.significance import (betainc, paired_t_test,
+    randomization_test, bootstrap_test, tukey_hsd_test, pairwise_tests,
+    score_matrix)
+
+def run_results(matrix):
+    return OrderedDict([("run%d" % i, OrderedDict([("T%d" % j,
+        [('AP', s), ('RR', 1.0)]) for j, s in enumerate(row)]))
+        for i, row in enumerate(matrix)])
+
+@pytest.fixture
+def matrix():
+    rng = np.random.default_rng(1)
+    x = rng.random(30)
+    return np.vstack([x, x - 0.05 + rng.normal(0, 0.1, 30),
+        x + rng.normal(0, 0.3, 30)])
+
+def test_betainc():
+    # two-sided p-value of t=2.0 with 10 degrees of freedom
+    assert abs(betainc(5.0, 0.5, 10 / 14.0) - 0.0733880347707) < 1e-10
+    assert abs(betainc(2.0, 3.0, 0.4) - 0.5248) < 1e-12
+    assert betainc(1.0, 1.0, 0.0) == 0.0 and betainc(1.0, 1.0, 1.0) == 1.0
+
+def test_paired_t_test(matrix):
+    t, p = paired_t_test(matrix[0], matrix[1])
+    d = matrix[0] - matrix[1]
+    assert abs(t - d.mean() / (d.std(ddof=1) / np.sqrt(len(d)))) < 1e-12
+    assert 0.0 < p < 0.05
+    assert paired_t_test([0.1, 0.2], [0.1, 0.2]) == (0.0, 1.0)
+
+@pytest.mark.parametrize('test', [randomization_test, bootstrap_test])
+def test_resampling(matrix, test):
+    p = test(matrix[0], matrix[1], 2000, 0)
+    assert p == test(matrix[0], matrix[1], 2000, np.random.default_rng(0))
+    # agrees with the t-test roughly
+    assert abs(p - paired_t_test(matrix[0], matrix[1])[1]) < 0.01
+    assert test(matrix[0], matrix[0], 100, 0) == 1.0
+
+def test_tukey_hsd_test(matrix):
+    p = tukey_hsd_test(matrix, 2000, 0)
+    assert p.shape == (3, 3)
+    assert (p == p.T).all() and (np.diag(p) == 1.0).all()
+    # more conservative than the pairwise randomization test
+    assert p[0, 1] >= randomization_test(matrix[0], matrix[1], 2000, 0)
+
+@pytest.mark.parametrize('test', ['ttest', 'randomization', 'bootstrap',
+    'tukey'])
+def test_pairwise_tests(matrix, test):
+    results = run_results(matrix)
+    serial = pairwise_tests(results, 'AP', test, 500, seed=3)
+    parallel = pairwise_tests(results, 'AP', test, 500, seed=3, workers=3)
+    assert serial == parallel
+    assert [(r['run_a'], r['run_b']) for r in serial] ==\
+        [('run0', 'run1'), ('run0', 'run2'), ('run1', 'run2')]
+    assert abs(serial[0]['diff']
+        - (matrix[0].mean() - matrix[1].mean())) < 1e-12
+
+def test_score_matrix(matrix):
+    results = run_results(matrix)
+    del results['run1']['T0']
+    names, topics, scores = score_matrix(results, 'AP')
+    assert names == ['run0', 'run1', 'run2']
+    assert topics == ["T%d" % j for j in range(1, 30)]
+    assert (scores == matrix[:, 1:]).all()
+    with pytest.raises(ValueError):
+        score_matrix(results, 'nDCG')
@@ -0,0 +1,68 @@
+# -*- coding:utf-8 -*-
+import os
+import subprocess
+import sys
+import time
+import pytest
+
+# the median cold-start time of the CLI in seconds, excluding the Python startup.
+# The budgets are generous for shared machines (about 0.1 s is typical),
+# while the import tests below catch heavy imports precisely.
+STARTUP_BUDGET = {'label': 0.5, 'compute': 0.75}
+STARTUP_RUNS = 7
+
+class TestStartup(object):
+
+    def _p(self, path):
+        return os.path.join(os.path.dirname(__file__), 'dat', path)
+
+    def _run(self, code, *args):
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env = dict(os.environ)
+        env['PYTHONPATH'] = root + os.pathsep + env.get('PYTHONPATH', '')
+        result = subprocess.run([sys.executable, '-c', code] + list(args),
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env)
+        assert result.returncode == 0, result.stderr
+        return result.stdout.decode()
+
+    def _time(self, code, *args):
+        times = []
+        for _ in range(STARTUP_RUNS):
+            start = time.perf_counter()
+            self._run(code, *args)
+            times.append(time.perf_counter() - start)
+        return sorted(times)[len(times) // 2]
+
+    def _modules(self, *args):
+        code = '''import sys
+from pyNTCIREVAL.main import cli
+try:
+    cli(standalone_mode=False)
+finally:
+    print(",".join(sorted(sys.modules)))
+'''
+        return self._run(code, *args).strip().split("\n")[-1].split(",")
+
+    def test_label_imports(self):
+        modules = self._modules('label', '-r', self._p('sample.rel'),
+            self._p('sample.res'))
+        assert not 'numpy' in modules
+        assert not 'pyNTCIREVAL.metrics' in modules
+        assert not 'pyNTCIREVAL.evaluator' in modules
+
+    def test_compute_imports(self):
+        modules = self._modules('compute', '-r', self._p('sample.rel'),
+            '-g', '1:2:3', self._p('sample.lab'))
+        assert 'pyNTCIREVAL.metrics' in modules
+        assert not 'numpy' in modules
+
+    @pytest.mark.parametrize("command", ['label', 'compute'])
+    def test_startup_time(self, command):
+        args = {
+            'label': ['label', '-h'],
+            'compute': ['compute', '-r', self._p('sample.rel'),
+                '-g', '1:2:3', self._p('sample.lab')],
+        }[command]
+        python = self._time('pass')
+        cli = self._time('from pyNTCIREVAL.main import cli; cli()', *args)
+        assert cli - python < STARTUP_BUDGET[command]
@@ -0,0 +1,45 @@
+# -*- coding:utf-8 -*-
+import io
+import pytest
+from pyNTCIREVAL.utils import (read_rel_file, read_labelled_ranked_list,
+    read_run_file, RUN_ORDER_RANK)
+
+class TestUtils(object):
+
+    def test_read_rel_file(self):
+        result = read_rel_file(io.StringIO("d1 L0\nd2 L12\nd3 L1\n"), ' ')
+        assert result == {'d1': 0, 'd2': 12, 'd3': 1}
+        result = read_rel_file(io.StringIO('"d 1"\tL1\nd2\tL0'), '\t')
+        assert result == {'d 1': 1, 'd2': 0}
+
+    @pytest.mark.parametrize("data,message", [
+        ("d1 L0\nd2 L1 x\nd3 L1\n", "invalid line at Line 2"),
+        ("d1 L0\n\nd3 L1\n", "invalid line at Line 2"),
+        ("d1 L0\nd2 1\n", "An invalid relevance level at Line 2"),
+        ("d1 L0\nd1 L1\n", "different relevance levels for the same document"),
+    ])
+    def test_read_rel_file_error(self, data, message):
+        with pytest.raises(Exception) as e:
+            read_rel_file(io.StringIO(data), ' ')
+        assert message in str(e.value)
+
+    def test_read_labelled_ranked_list(self):
+        result = read_labelled_ranked_list(
+            io.StringIO("d1 L0\nd2\nd3 L2 x\n"))
+        assert result == [('d1', 0), ('d2', None), ('d3', 2)]
+        with pytest.raises(Exception) as e:
+            read_labelled_ranked_list(io.StringIO("d1 L0\nd2 2\n"))
+        assert "An invalid relevance level at Line 2" in str(e.value)
+
+    def test_read_run_file(self):
+        data = ("T1 Q0 d1 1 0.5 run\nT2 Q0 d9 1 1.0 run\n"
+            "T1 Q0 d2 2 0.9 run\nT1 Q0 d3 3 0.5 run\nT1 Q0 d4 3 1e-1 run\n")
+        result = read_run_file(io.StringIO(data))
+        # by score, and by document ID if tied
+        assert result == {'T1': ['d2', 'd3', 'd1', 'd4'], 'T2': ['d9']}
+        assert list(result) == ['T1', 'T2']
+        result = read_run_file(io.StringIO(data), RUN_ORDER_RANK)
+        assert result == {'T1': ['d1', 'd2', 'd3', 'd4'], 'T2': ['d9']}
+        with pytest.raises(Exception) as e:
+            read_run_file(io.StringIO("T1 Q0 d1 1 x run\n"))
+        assert "An invalid score at Line 1" in str(e.value)